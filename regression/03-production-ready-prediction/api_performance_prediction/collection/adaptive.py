@@ -0,0 +1,103 @@
+import logging
+from typing import Dict, List, Optional, Union
+import numpy as np
+from ..domain.models import PredictionBatch, PredictionResult
+from .store import MetricStore
+
+logger = logging.getLogger(__name__)
+
+class AdaptiveIntervals:
+    """Per-endpoint collection intervals that follow volatility and predicted risk
+
+    Every endpoint gets a score in [0, 1]: the larger of its latency
+    coefficient of variation over the recent window, relative to
+    volatile_cv, and its predicted risk. Endpoints with fewer than two
+    samples score 1 so they are learned quickly. Intervals go geometrically
+    from max_interval at score 0 to min_interval at score 1. If the total
+    rate would exceed max_scrapes_per_second, rates are scaled down, with
+    endpoints at max_interval held there, until the budget is met.
+    """
+
+    def __init__(self,
+                 min_interval: float = 10.0,
+                 max_interval: float = 300.0,
+                 max_scrapes_per_second: Optional[float] = None,  # Global budget
+                 window: int = 12,  # Recent samples the volatility is measured on
+                 volatile_cv: float = 0.5,  # Coefficient of variation scoring 1
+                 risk_ratio: float = 0.5,  # Predicted rise over the recent mean scoring 1
+                 update_interval: float = 60.0):  # Seconds between recomputations
+        if not 0 < min_interval <= max_interval:
+            raise ValueError("Need 0 < min_interval <= max_interval")
+        if max_scrapes_per_second is not None and max_scrapes_per_second <= 0:
+            raise ValueError("max_scrapes_per_second must be positive")
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.max_scrapes_per_second = max_scrapes_per_second
+        self.window = window
+        self.volatile_cv = volatile_cv
+        self.risk_ratio = risk_ratio
+        self.update_interval = update_interval
+        self._risk: Dict[str, float] = {}
+
+    def observe_predictions(self,
+                            predictions: Union[List[PredictionResult], PredictionBatch],
+                            store: MetricStore):
+        """Turn predicted latency above the recent mean into per-endpoint risk"""
+        if isinstance(predictions, PredictionBatch):
+            pairs = zip(predictions.endpoint_names(), predictions.predicted_latency.tolist())
+        else:
+            pairs = ((p.endpoint, p.predicted_latency) for p in predictions)
+        for endpoint, predicted in pairs:
+            if store.count(endpoint) == 0:
+                continue
+            recent = store.window(endpoint, self.window).latency_ms.mean()
+            if recent <= 0:
+                continue
+            rise = predicted / recent - 1
+            self._risk[endpoint] = float(np.clip(rise / self.risk_ratio, 0, 1))
+
+    def scores(self, endpoints: List[str], store: MetricStore) -> np.ndarray:
+        """Score per endpoint, 0 for stable and 1 for volatile or at risk"""
+        batch = store.recent(self.window)
+        codes = batch.endpoint_code.astype(np.int64)
+        n_codes = len(store.endpoints)
+        counts = np.bincount(codes, minlength=n_codes)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = np.bincount(codes, weights=batch.latency_ms, minlength=n_codes) / counts
+            deviations = batch.latency_ms - means[codes]
+            stds = np.sqrt(np.bincount(codes, weights=deviations**2, minlength=n_codes) / counts)
+            cv = np.where(means > 0, stds / means, 0.0)
+        volatility = np.clip(cv / self.volatile_cv, 0, 1)
+        volatility[counts < 2] = 1.0
+
+        scores = volatility[store.codes(endpoints)]
+        risk = np.array([self._risk.get(e, 0.0) for e in endpoints])
+        return np.maximum(scores, risk)
+
+    def intervals(self, endpoints: List[str], store: MetricStore) -> np.ndarray:
+        """Interval per endpoint within the bounds and the global budget"""
+        scores = self.scores(endpoints, store)
+        intervals = self.max_interval * (self.min_interval / self.max_interval) ** scores
+        return self._fit_budget(intervals)
+
+    def _fit_budget(self, intervals: np.ndarray) -> np.ndarray:
+        budget = self.max_scrapes_per_second
+        rates = 1 / intervals
+        if budget is None or rates.sum() <= budget:
+            return intervals
+        floor, ceiling = 1 / self.max_interval, 1 / self.min_interval
+        if len(rates) * floor > budget:
+            logger.warning(
+                "Scrape budget of %.1f/s is below %d endpoints at max_interval, "
+                "stretching every interval to %.0fs", budget, len(rates), len(rates) / budget
+            )
+            return np.full(len(rates), len(rates) / budget)
+        # The clipped total is monotonic in the scale, so bisect for it
+        low, high = 0.0, 1.0
+        for _ in range(50):
+            scale = (low + high) / 2
+            if np.clip(rates * scale, floor, ceiling).sum() > budget:
+                high = scale
+            else:
+                low = scale
+        return 1 / np.clip(rates * low, floor, ceiling)
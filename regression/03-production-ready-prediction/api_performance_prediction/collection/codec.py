@@ -0,0 +1,78 @@
+import struct
+from typing import Tuple
+import numpy as np
+from ..domain.models import MetricBatch, METRIC_COLUMNS, endpoint_code_dtype
+
+MAGIC = b'APMB'
+# Magic, endpoint count, record count, endpoint table size. The table is
+# the newline-joined UTF-8 endpoint names.
+HEADER = struct.Struct('<4sHII')
+
+# Fixed-width little-endian record, 52 bytes. Timestamps are naive
+# microseconds, the same clock as the rest of the store.
+RECORD_DTYPE = np.dtype([
+    ('endpoint_code', '<u2'),
+    ('timestamp', '<M8[us]'),
+    ('latency_ms', '<f8'),
+    ('status_code', '<i2'),
+    ('cpu_usage', '<f8'),
+    ('memory_usage', '<f8'),
+    ('request_count', '<i8'),
+    ('error_count', '<i8')
+])
+
+MAX_ENDPOINTS = np.iinfo(np.uint16).max
+
+def encode_records(batch: MetricBatch) -> bytes:
+    """Fixed-width records alone, codes index the batch's endpoint table"""
+    records = np.empty(len(batch), dtype=RECORD_DTYPE)
+    records['endpoint_code'] = batch.endpoint_code
+    for name in METRIC_COLUMNS:
+        records[name] = getattr(batch, name)
+    return records.tobytes()
+
+def decode_records(data: bytes, 
+                   endpoints: Tuple[str, ...], 
+                   count: int = -1, 
+                   offset: int = 0) -> MetricBatch:
+    """Batch over records whose codes index endpoints, all by default"""
+    records = np.frombuffer(data, dtype=RECORD_DTYPE, count=count, offset=offset)
+    if len(records) and records['endpoint_code'].max() >= len(endpoints):
+        raise ValueError("Endpoint code out of range")
+    return MetricBatch(
+        endpoint_code=records['endpoint_code'].astype(endpoint_code_dtype(len(endpoints))),
+        endpoints=tuple(endpoints),
+        **{name: records[name].astype(dtype) for name, dtype in METRIC_COLUMNS.items()}
+    )
+
+def encode_batch(batch: MetricBatch) -> bytes:
+    """Binary frame: header, endpoint table, then fixed-width records"""
+    if len(batch.endpoints) > MAX_ENDPOINTS:
+        raise ValueError(f"At most {MAX_ENDPOINTS} endpoints per frame")
+    if any('\n' in endpoint for endpoint in batch.endpoints):
+        raise ValueError("Endpoint names cannot contain newlines")
+    table = '\n'.join(batch.endpoints).encode()
+    header = HEADER.pack(MAGIC, len(batch.endpoints), len(batch), len(table))
+    return b''.join([header, table, encode_records(batch)])
+
+def decode_batch(data: bytes, offset: int = 0) -> Tuple[MetricBatch, int]:
+    """Batch read from a frame at offset and the offset just past it"""
+    if len(data) - offset < HEADER.size:
+        raise ValueError("Truncated frame header")
+    magic, n_endpoints, n_records, table_size = HEADER.unpack_from(data, offset)
+    if magic != MAGIC:
+        raise ValueError("Not a metric batch frame")
+    offset += HEADER.size
+
+    if len(data) - offset < table_size:
+        raise ValueError("Truncated endpoint table")
+    table = bytes(data[offset:offset + table_size]).decode()
+    endpoints = table.split('\n') if n_endpoints else []
+    if len(endpoints) != n_endpoints:
+        raise ValueError("Endpoint table does not match the header")
+    offset += table_size
+
+    size = n_records * RECORD_DTYPE.itemsize
+    if len(data) - offset < size:
+        raise ValueError("Truncated records")
+    return decode_records(data, tuple(endpoints), n_records, offset), offset + size
@@ -1,51 +1,269 @@
 import asyncio
+import logging
+import math
 from datetime import datetime
-from typing import List, Dict
+from typing import Callable, List, Dict, Optional, Tuple
 import aiohttp
-from ..domain.models import APIMetric
+from ..domain.models import APIMetric, MetricBatch, METRIC_COLUMNS
+from ..monitoring.instrumentation import Instrumentation
+from .adaptive import AdaptiveIntervals
+from .prometheus import PrometheusMapper
+from .scheduler import ScrapeReport, ScrapeScheduler, StaggeredSchedule
+from .store import MetricStore
+from .wal import MetricLog, ReplayReport
+
+logger = logging.getLogger(__name__)
+
+# Fields read from an endpoint's metrics payload
+PAYLOAD_FIELDS = ['latency_ms', 'cpu_usage', 'memory_usage', 'request_count', 'error_count']
+PROMETHEUS_CHUNK_SIZE = 256 * 1024
 
 class MetricsCollector:
     """Collects metrics from various API endpoints"""
     
-    def __init__(self, endpoints: List[str], collection_interval: int = 60):
+    def __init__(self, 
+                 endpoints: List[str], 
+                 collection_interval: int = 60,
+                 connection_limit: int = 100,  # Open connections across all hosts
+                 connection_limit_per_host: int = 10,
+                 keepalive_timeout: float = 75.0,  # Seconds an idle connection is kept
+                 dns_cache_ttl: int = 300,
+                 trace_configs: Optional[List[aiohttp.TraceConfig]] = None,
+                 max_concurrency: Optional[int] = None,  # Defaults to connection_limit
+                 request_timeout: float = 10.0,
+                 cycle_deadline: Optional[float] = None,  # Defaults to collection_interval
+                 history_size: int = 1000,  # Samples kept per endpoint
+                 endpoint_intervals: Optional[Dict[str, float]] = None,  # Overrides collection_interval
+                 schedule_resolution: float = 0.05,  # Endpoints due this close are scraped together
+                 max_endpoints: Optional[int] = None,  # Store room, including pushed endpoints
+                 wal: Optional[MetricLog] = None,  # Persist collected metrics for restarts
+                 on_batch: Optional[Callable[[MetricBatch], None]] = None,  # Sees every recorded batch
+                 adaptive: Optional[AdaptiveIntervals] = None,  # Overrides the fixed intervals
+                 prometheus: Optional[PrometheusMapper] = None,  # Maps text expositions to payloads
+                 instrumentation: Optional[Instrumentation] = None):  # Times cycles, counts per endpoint
         self.endpoints = endpoints
         self.collection_interval = collection_interval
+        self.endpoint_intervals = endpoint_intervals or {}
+        self.schedule_resolution = schedule_resolution
+        self.connection_limit = connection_limit
+        self.connection_limit_per_host = connection_limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self.trace_configs = trace_configs
+        self.scheduler = ScrapeScheduler(
+            max_concurrency=max_concurrency or connection_limit,
+            request_timeout=request_timeout,
+            cycle_deadline=cycle_deadline if cycle_deadline is not None else collection_interval
+        )
+        self.last_report: Optional[ScrapeReport] = None
+        self.schedule: Optional[StaggeredSchedule] = None
         self._running = False
-        self._metrics_buffer: List[APIMetric] = []
+        self.store = MetricStore(endpoints, capacity=history_size, max_endpoints=max_endpoints)
+        self.wal = wal
+        self.on_batch = on_batch
+        self.adaptive = adaptive
+        self.instrumentation = instrumentation
+        self.prometheus = prometheus or PrometheusMapper()
+        missing = [field for field in PAYLOAD_FIELDS if field not in self.prometheus.rules]
+        if missing:
+            raise ValueError(f"Prometheus rules are missing fields {missing}")
+        self._wal_sync: Optional[asyncio.Task] = None
+        self._session: Optional[aiohttp.ClientSession] = None
         
     async def start_collection(self):
-        """Start the metrics collection process"""
+        """Start the metrics collection process
+        
+        Every endpoint is scraped on its own fixed cadence at a hash-based
+        offset within its interval, so requests are spread evenly instead
+        of the whole fleet firing at once. With `adaptive` set, intervals
+        are recomputed from the store every `adaptive.update_interval`.
+        """
         self._running = True
-        while self._running:
-            metrics = await self._collect_current_metrics()
-            self._metrics_buffer.extend(metrics)
-            await asyncio.sleep(self.collection_interval)
+        self._start_wal_sync()
+        if not self.endpoints:
+            logger.warning("No endpoints to collect from")
+            return
+        loop = asyncio.get_running_loop()
+        intervals = [self.interval_for(endpoint) for endpoint in self.endpoints]
+        self.schedule = StaggeredSchedule(self.endpoints, intervals, now=loop.time())
+        next_adapt = loop.time() if self.adaptive is not None else math.inf
+        cycles = set()
+        try:
+            while self._running:
+                now = loop.time()
+                if now >= next_adapt:
+                    self.schedule.set_intervals(
+                        self.adaptive.intervals(self.endpoints, self.store), now
+                    )
+                    next_adapt = now + self.adaptive.update_interval
+                delay = min(self.schedule.next_due(), next_adapt) - now
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                    continue
+                codes = self.schedule.pop_due(now + self.schedule_resolution)
+                deadline = min(
+                    self.scheduler.cycle_deadline, 
+                    *(self.schedule.intervals[code] for code in codes)
+                )
+                # Cycles overlap, the scheduler's semaphore bounds them together
+                cycle = asyncio.create_task(self._collect_into_store(codes, deadline))
+                cycles.add(cycle)
+                cycle.add_done_callback(cycles.discard)
+        finally:
+            for cycle in list(cycles):
+                cycle.cancel()
+            await asyncio.gather(*cycles, return_exceptions=True)
+    
+    def _start_wal_sync(self):
+        if self.wal is not None and self._wal_sync is None:
+            self._wal_sync = asyncio.create_task(self.wal.sync_periodically())
+    
+    def interval_for(self, endpoint: str) -> float:
+        """Collection interval of an endpoint"""
+        return self.endpoint_intervals.get(endpoint, self.collection_interval)
+    
+    async def _collect_into_store(self, codes: List[int], deadline: float):
+        batch = await self.collect_batch(codes, deadline)
+        self.record(batch)
+    
+    async def stop(self):
+        """Stop collecting, close pooled connections and sync the log"""
+        self._running = False
+        await self.close()
+        if self._wal_sync is not None:
+            task, self._wal_sync = self._wal_sync, None
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        if self.wal is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self.wal.close)
+    
+    def restore(self) -> Optional[ReplayReport]:
+        """Rebuild the store from the log, call before collection starts"""
+        if self.wal is None:
+            return None
+        return self.wal.replay(self.store)
+    
+    def record(self, batch: MetricBatch):
+        """Log a batch, then add it to the store and pass it on"""
+        if self.instrumentation is not None:
+            with self.instrumentation.span('record', len(batch)):
+                self._record(batch)
+            # Collected batches are coded like the store's first endpoints
+            self.instrumentation.count('samples', batch.endpoint_code)
+        else:
+            self._record(batch)
+    
+    def _record(self, batch: MetricBatch):
+        if self.wal is not None:
+            self.wal.append(batch)
+        self.store.append_batch(batch)
+        if self.on_batch is not None:
+            self.on_batch(batch)
+    
+    async def close(self):
+        """Close the shared session, a later scrape opens a new one"""
+        if self._session is not None:
+            session, self._session = self._session, None
+            await session.close()
+    
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Long-lived session whose connections are reused across cycles"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.connection_limit,
+                limit_per_host=self.connection_limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                use_dns_cache=True,
+                ttl_dns_cache=self.dns_cache_ttl
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector, 
+                trace_configs=self.trace_configs
+            )
+        return self._session
     
     async def _collect_current_metrics(self) -> List[APIMetric]:
         """Collect current metrics from all endpoints"""
-        async with aiohttp.ClientSession() as session:
-            tasks = [self._collect_endpoint_metrics(session, endpoint) 
-                    for endpoint in self.endpoints]
-            return await asyncio.gather(*tasks)
+        responses = await self._scrape_all()
+        metrics = []
+        for endpoint in self.endpoints:
+            if endpoint not in responses:
+                continue
+            timestamp, status, data = responses[endpoint]
+            metrics.append(APIMetric(
+                timestamp=timestamp,
+                endpoint=endpoint,
+                status_code=status,
+                **{field: data[field] for field in PAYLOAD_FIELDS}
+            ))
+        return metrics
         
-    async def _collect_endpoint_metrics(self, 
-                                     session: aiohttp.ClientSession, 
-                                     endpoint: str) -> APIMetric:
-        """Collect metrics for a single endpoint"""
-        try:
-            async with session.get(f"{endpoint}/metrics") as response:
-                data = await response.json()
-                return APIMetric(
-                    timestamp=datetime.now(),
-                    endpoint=endpoint,
-                    latency_ms=data["latency_ms"],
-                    status_code=response.status,
-                    cpu_usage=data["cpu_usage"],
-                    memory_usage=data["memory_usage"],
-                    request_count=data["request_count"],
-                    error_count=data["error_count"]
-                )
-        except Exception as e:
-            # In production, we'd want proper error handling and logging
-            print(f"Error collecting metrics for {endpoint}: {e}")
-            return None
\ No newline at end of file
+    async def collect_batch(self, 
+                            codes: Optional[List[int]] = None,
+                            deadline: Optional[float] = None) -> MetricBatch:
+        """Collect current metrics as one columnar batch
+        
+        `codes` index into `endpoints` and default to all of them.
+        """
+        if codes is None:
+            codes = range(len(self.endpoints))
+        responses = await self._scrape_all([self.endpoints[code] for code in codes], deadline)
+        
+        columns = {name: [] for name in METRIC_COLUMNS}
+        columns['endpoint_code'] = []
+        for code in codes:
+            endpoint = self.endpoints[code]
+            if endpoint not in responses:
+                continue
+            timestamp, status, data = responses[endpoint]
+            columns['endpoint_code'].append(code)
+            columns['timestamp'].append(timestamp)
+            columns['status_code'].append(status)
+            for field in PAYLOAD_FIELDS:
+                columns[field].append(data[field])
+        return MetricBatch.from_columns(self.endpoints, **columns)
+    
+    async def _scrape_all(self, 
+                          endpoints: Optional[List[str]] = None,
+                          deadline: Optional[float] = None) -> Dict[str, Tuple[datetime, int, dict]]:
+        """Run one scrape cycle, only successful endpoints are returned"""
+        session = self._get_session()
+        responses, report = await self.scheduler.run_cycle(
+            self.endpoints if endpoints is None else endpoints, 
+            lambda endpoint: self._fetch_endpoint(session, endpoint),
+            deadline
+        )
+        self.last_report = report
+        if self.instrumentation is not None:
+            self.instrumentation.record('collect', report.duration, report.total)
+            failed = report.timed_out + report.failed
+            if failed:
+                self.instrumentation.count('scrape_errors', self.store.codes(failed))
+        # Prometheus endpoints give no payload until their counters have a baseline
+        responses = {e: response for e, response in responses.items() if response[2] is not None}
+        if report.timed_out or report.failed:
+            logger.warning(
+                "Collection cycle: %d succeeded, %d timed out, %d failed in %.2fs%s",
+                len(report.succeeded), len(report.timed_out), len(report.failed),
+                report.duration, " (deadline hit)" if report.deadline_hit else ""
+            )
+            for endpoint, error in report.errors.items():
+                logger.debug("Error collecting metrics for %s: %s", endpoint, error)
+        return responses
+    
+    async def _fetch_endpoint(self, 
+                              session: aiohttp.ClientSession, 
+                              endpoint: str) -> Tuple[datetime, int, Optional[dict]]:
+        """Fetch the metrics payload of a single endpoint, JSON or Prometheus text"""
+        async with session.get(f"{endpoint}/metrics") as response:
+            if response.content_type in ('text/plain', 'application/openmetrics-text'):
+                parser = self.prometheus.parser()
+                async for chunk in response.content.iter_chunked(PROMETHEUS_CHUNK_SIZE):
+                    parser.feed(chunk)
+                return datetime.now(), response.status, self.prometheus.payload(endpoint, parser)
+            data = await response.json()
+            # Fail here rather than later when the payload is used
+            missing = [field for field in PAYLOAD_FIELDS if field not in data]
+            if missing:
+                raise KeyError(f"missing fields {missing}")
+            return datetime.now(), response.status, data
@@ -0,0 +1,49 @@
+import asyncio
+import time
+from typing import Optional, Tuple
+import numpy as np
+
+class SampleEvents:
+    """Coalesced notifications of which endpoints received new samples
+
+    Subscribed to a MetricStore, it marks the codes of every appended
+    batch. A consumer waits for the first mark, then takes the union of
+    everything marked since it last looked, so any number of batches
+    between two passes costs one pass. Publishing must happen on the
+    consumer's event loop.
+    """
+
+    def __init__(self, max_endpoints: int):
+        self._pending = np.zeros(max_endpoints, dtype=bool)
+        self._event = asyncio.Event()
+        self._closed = False
+        self.first_published: Optional[float] = None  # Monotonic time of the oldest pending batch
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def publish(self, codes: np.ndarray):
+        """Mark endpoints as having new samples"""
+        self._pending[codes] = True
+        if self.first_published is None:
+            self.first_published = time.monotonic()
+        self._event.set()
+
+    async def wait(self):
+        """Return once something is pending or the events are closed"""
+        await self._event.wait()
+
+    def take(self) -> Tuple[np.ndarray, Optional[float]]:
+        """Pending codes and when the oldest of them was published, then reset"""
+        codes = np.flatnonzero(self._pending)
+        published, self.first_published = self.first_published, None
+        self._pending[codes] = False
+        if not self._closed:
+            self._event.clear()
+        return codes, published
+
+    def close(self):
+        """Wake the consumer for good, e.g. on shutdown"""
+        self._closed = True
+        self._event.set()
@@ -0,0 +1,192 @@
+import asyncio
+import json
+import logging
+import math
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import numpy as np
+from aiohttp import web
+from ..domain.models import MetricBatch, METRIC_COLUMNS
+from .codec import decode_batch
+from .store import MetricStore
+from .wal import MetricLog
+
+logger = logging.getLogger(__name__)
+
+BINARY_CONTENT_TYPE = 'application/octet-stream'
+FLOAT_FIELDS = ['latency_ms', 'cpu_usage', 'memory_usage']
+INT_FIELDS = ['status_code', 'request_count', 'error_count']
+
+@dataclass
+class IngestStats:
+    """Counters since the server started"""
+    accepted_batches: int = 0
+    accepted_samples: int = 0
+    written_samples: int = 0
+    rejected_batches: int = 0  # Answered 429
+    invalid_batches: int = 0  # Answered 400 or 422
+
+def _parse_timestamp(value: Any) -> datetime:
+    """ISO 8601 string or epoch seconds, as naive local time like the collector"""
+    if isinstance(value, str):
+        timestamp = datetime.fromisoformat(value)
+        if timestamp.tzinfo is not None:
+            timestamp = timestamp.astimezone().replace(tzinfo=None)
+        return timestamp
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return datetime.fromtimestamp(value)
+    raise ValueError("timestamp must be an ISO 8601 string or epoch seconds")
+
+def parse_json_metrics(records: Any) -> MetricBatch:
+    """Validate a decoded JSON array of metric objects into a batch"""
+    if not isinstance(records, list):
+        raise ValueError("Expected a JSON array of metrics")
+    codes: Dict[str, int] = {}
+    columns: Dict[str, List[Any]] = {name: [] for name in METRIC_COLUMNS}
+    columns['endpoint_code'] = []
+    for i, record in enumerate(records):
+        if not isinstance(record, dict):
+            raise ValueError(f"Metric {i}: expected an object")
+        missing = [field for field in ['endpoint', *METRIC_COLUMNS] if field not in record]
+        if missing:
+            raise ValueError(f"Metric {i}: missing fields {missing}")
+        endpoint = record['endpoint']
+        if not isinstance(endpoint, str) or not endpoint:
+            raise ValueError(f"Metric {i}: endpoint must be a non-empty string")
+        for field in FLOAT_FIELDS:
+            value = record[field]
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+                raise ValueError(f"Metric {i}: {field} must be a finite number")
+        for field in INT_FIELDS:
+            value = record[field]
+            if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+                raise ValueError(f"Metric {i}: {field} must be a non-negative integer")
+        try:
+            timestamp = _parse_timestamp(record['timestamp'])
+        except (ValueError, OverflowError, OSError) as e:
+            raise ValueError(f"Metric {i}: {e}") from None
+
+        columns['endpoint_code'].append(codes.setdefault(endpoint, len(codes)))
+        columns['timestamp'].append(timestamp)
+        for field in FLOAT_FIELDS + INT_FIELDS:
+            columns[field].append(record[field])
+    try:
+        return MetricBatch.from_columns(list(codes), **columns)
+    except OverflowError as e:
+        raise ValueError(str(e)) from None
+
+def validate_batch(batch: MetricBatch):
+    """The checks parse_json_metrics makes per record, over a decoded batch's arrays"""
+    if not all(batch.endpoints):
+        raise ValueError("endpoint must be a non-empty string")
+    if np.isnat(batch.timestamp).any():
+        raise ValueError("timestamp must be set")
+    for field in FLOAT_FIELDS:
+        bad = np.flatnonzero(~np.isfinite(getattr(batch, field)))
+        if len(bad):
+            raise ValueError(f"Metric {bad[0]}: {field} must be a finite number")
+    for field in INT_FIELDS:
+        bad = np.flatnonzero(getattr(batch, field) < 0)
+        if len(bad):
+            raise ValueError(f"Metric {bad[0]}: {field} must be a non-negative integer")
+
+class IngestServer:
+    """Accepts pushed metric batches over HTTP and appends them to a store
+
+    ``POST /ingest`` takes a JSON array of metric objects or, sent as
+    application/octet-stream, a frame from ``codec.encode_batch``. Parsed
+    batches wait in a bounded queue for a single writer task. When the
+    queue is full the request gets 429 with Retry-After, so memory is
+    bounded by max_pending * max_body_size whatever the clients do.
+    """
+
+    def __init__(self,
+                 store: MetricStore,
+                 host: str = '127.0.0.1',
+                 port: int = 9091,
+                 max_pending: int = 256,  # Batches waiting for the writer
+                 max_body_size: int = 16 * 2**20,
+                 retry_after: float = 1.0,
+                 log: Optional[MetricLog] = None):  # Written before the store
+        self.store = store
+        self.log = log
+        self.host = host
+        self.port = port
+        self.retry_after = retry_after
+        self.stats = IngestStats()
+        self.app = web.Application(client_max_size=max_body_size)
+        self.app.router.add_post('/ingest', self._handle_ingest)
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self._runner: Optional[web.AppRunner] = None
+        self._writer: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Start the writer and listen for pushes"""
+        self._writer = asyncio.create_task(self._write_loop())
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        logger.info("Ingesting pushed metrics on %s:%d", self.host, self.port)
+
+    async def stop(self):
+        """Stop listening, then write out whatever is still queued"""
+        if self._runner is not None:
+            runner, self._runner = self._runner, None
+            await runner.cleanup()
+        if self._writer is not None:
+            await self._queue.join()
+            writer, self._writer = self._writer, None
+            writer.cancel()
+            await asyncio.gather(writer, return_exceptions=True)
+
+    async def _handle_ingest(self, request: web.Request) -> web.Response:
+        body = await request.read()
+        try:
+            if request.content_type == BINARY_CONTENT_TYPE:
+                batch, end = decode_batch(body)
+                if end != len(body):
+                    raise ValueError("Trailing bytes after frame")
+                validate_batch(batch)
+            else:
+                batch = parse_json_metrics(json.loads(body))
+        except (ValueError, UnicodeDecodeError) as e:
+            self.stats.invalid_batches += 1
+            return web.json_response({'error': str(e)}, status=400)
+
+        if not self.store.has_room(batch.endpoints):
+            self.stats.invalid_batches += 1
+            return web.json_response(
+                {'error': f"Store is full ({self.store.max_endpoints} endpoints)"}, status=422
+            )
+
+        if len(batch):
+            try:
+                self._queue.put_nowait(batch)
+            except asyncio.QueueFull:
+                self.stats.rejected_batches += 1
+                return web.json_response(
+                    {'error': 'Ingest queue is full'},
+                    status=429,
+                    headers={'Retry-After': f"{self.retry_after:g}"}
+                )
+            # Only accepted batches take store slots, has_room() saw no await since
+            for endpoint in batch.endpoints:
+                self.store.register(endpoint)
+        self.stats.accepted_batches += 1
+        self.stats.accepted_samples += len(batch)
+        return web.json_response({'accepted': len(batch)}, status=202)
+
+    async def _write_loop(self):
+        while True:
+            batch = await self._queue.get()
+            try:
+                if self.log is not None:
+                    self.log.append(batch)
+                self.store.append_batch(batch)
+                self.stats.written_samples += len(batch)
+            except Exception as e:
+                logger.error("Error writing pushed batch: %s", e)
+            finally:
+                self._queue.task_done()
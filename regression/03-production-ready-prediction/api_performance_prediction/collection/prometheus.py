@@ -0,0 +1,188 @@
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Pattern, Tuple
+from ..domain.models import APIMetric
+
+LABEL_PAIR = re.compile(rb'([a-zA-Z_][a-zA-Z0-9_]*)\s*=\s*"((?:[^"\\]|\\.)*)"')
+ESCAPES = {b'\\\\': b'\\', b'\\"': b'"', b'\\n': b'\n'}
+ESCAPE = re.compile(rb'\\[\\"n]')
+
+@dataclass(frozen=True)
+class Selector:
+    """Samples of one name whose labels fully match the given regexes"""
+    name: str
+    labels: Tuple[Tuple[str, str], ...] = ()
+
+    @classmethod
+    def of(cls, name: str, **labels: str) -> 'Selector':
+        return cls(name, tuple(sorted(labels.items())))
+
+@dataclass(frozen=True)
+class FieldRule:
+    """How one payload field is computed from selected totals"""
+    numerator: Selector
+    denominator: Optional[Selector] = None
+    scale: float = 1.0
+    counter: bool = False  # Cumulative totals, use the change since the last scrape
+
+# Conventional names, replace them to match what a fleet exposes
+DEFAULT_RULES = {
+    'latency_ms': FieldRule(
+        Selector.of('http_request_duration_seconds_sum'),
+        Selector.of('http_request_duration_seconds_count'),
+        scale=1000.0, counter=True
+    ),
+    'cpu_usage': FieldRule(Selector.of('process_cpu_usage'), scale=100.0),
+    'memory_usage': FieldRule(Selector.of('process_memory_usage'), scale=100.0),
+    'request_count': FieldRule(Selector.of('http_requests_total'), counter=True),
+    'error_count': FieldRule(Selector.of('http_requests_total', status='5..'), counter=True)
+}
+
+class PrometheusParser:
+    """Sums selected samples out of a text exposition, fed chunk by chunk
+
+    Only lines starting with a selected sample name are looked at: each
+    name is located with bytes.find, so the rest of the body is skipped
+    at memchr speed and nothing is built for unselected families.
+    """
+
+    def __init__(self, selectors: Iterable[Selector]):
+        self.totals: Dict[Selector, float] = {}
+        self.matched: Dict[Selector, int] = {}
+        self.seen: Dict[str, int] = {}  # Samples per selected name, whatever their labels
+        self._by_name: Dict[bytes, List[Tuple[Selector, List[Tuple[bytes, Pattern]]]]] = {}
+        for selector in selectors:
+            if selector in self.totals:
+                continue
+            self.totals[selector] = 0.0
+            self.matched[selector] = 0
+            self.seen[selector.name] = 0
+            matchers = [(key.encode(), re.compile(value.encode())) for key, value in selector.labels]
+            self._by_name.setdefault(selector.name.encode(), []).append((selector, matchers))
+        self._tail = b''
+
+    def feed(self, chunk: bytes):
+        """Parse the complete lines seen so far, keep the partial last one"""
+        data = self._tail + chunk if self._tail else chunk
+        end = data.rfind(b'\n') + 1
+        if end == 0:
+            self._tail = data
+            return
+        self._tail = data[end:]
+        self._scan(data, end)
+
+    def close(self) -> Dict[Selector, float]:
+        """Parse whatever is left and return the totals"""
+        if self._tail:
+            tail, self._tail = self._tail, b''
+            self._scan(tail, len(tail))
+        return self.totals
+
+    def _scan(self, data: bytes, end: int):
+        for name, selectors in self._by_name.items():
+            if data.startswith(name):
+                self._sample(data, 0, name, selectors, end)
+            needle = b'\n' + name
+            pos = data.find(needle, 0, end)
+            while pos != -1:
+                self._sample(data, pos + 1, name, selectors, end)
+                pos = data.find(needle, pos + 1, end)
+
+    def _sample(self, data: bytes, start: int, name: bytes, selectors, end: int):
+        line_end = data.find(b'\n', start, end)
+        if line_end == -1:
+            line_end = end
+        line = data[start + len(name):line_end]
+        labels = {}
+        if line[:1] == b'{':
+            close = line.rfind(b'}')
+            if close == -1:
+                return
+            labels = {
+                key: ESCAPE.sub(lambda m: ESCAPES[m.group()], value)
+                for key, value in LABEL_PAIR.findall(line, 1, close)
+            }
+            line = line[close + 1:]
+        elif line[:1] not in (b' ', b'\t'):
+            return  # A longer name sharing this prefix
+        fields = line.split()
+        if not fields:
+            return
+        try:
+            value = float(fields[0])
+        except ValueError:
+            return
+        self.seen[selectors[0][0].name] += 1
+        for selector, matchers in selectors:
+            if all(key in labels and pattern.fullmatch(labels[key]) for key, pattern in matchers):
+                self.totals[selector] += value
+                self.matched[selector] += 1
+
+def parse_exposition(body: bytes, selectors: Iterable[Selector]) -> Dict[Selector, float]:
+    """Totals of the selected samples in a whole exposition body"""
+    parser = PrometheusParser(selectors)
+    parser.feed(body)
+    return parser.close()
+
+class PrometheusMapper:
+    """Turns selected exposition totals into the collector's payload fields
+
+    Counter fields use the change since the endpoint's previous scrape, so
+    the first scrape of an endpoint only records a baseline. A counter
+    that went down is taken as a restart and its new value used as is.
+    A ratio whose denominator did not move falls back to the cumulative
+    ratio. A labeled selector matching no samples of a family that is
+    exposed totals 0, only a family missing altogether is an error.
+    """
+
+    def __init__(self, rules: Optional[Dict[str, FieldRule]] = None):
+        self.rules = dict(DEFAULT_RULES if rules is None else rules)
+        self.selectors = list(dict.fromkeys(
+            selector
+            for rule in self.rules.values()
+            for selector in (rule.numerator, rule.denominator) if selector is not None
+        ))
+        self._previous: Dict[str, Dict[Selector, float]] = {}
+
+    def parser(self) -> PrometheusParser:
+        return PrometheusParser(self.selectors)
+
+    def payload(self, endpoint: str, parser: PrometheusParser) -> Optional[Dict[str, float]]:
+        """Field values for an endpoint, None on its first scrape if counters are used"""
+        totals = parser.close()
+        missing = [name for name, count in parser.seen.items() if count == 0]
+        if missing:
+            raise KeyError(f"missing metrics {missing}")
+
+        previous = self._previous.get(endpoint)
+        self._previous[endpoint] = dict(totals)
+        if previous is None and any(rule.counter for rule in self.rules.values()):
+            return None
+
+        def value(selector: Selector, counter: bool) -> float:
+            if not counter or totals[selector] < previous[selector]:
+                return totals[selector]
+            return totals[selector] - previous[selector]
+
+        payload = {}
+        for field, rule in self.rules.items():
+            numerator = value(rule.numerator, rule.counter)
+            if rule.denominator is not None:
+                denominator = value(rule.denominator, rule.counter)
+                if denominator == 0:
+                    numerator, denominator = totals[rule.numerator], totals[rule.denominator]
+                numerator = numerator / denominator if denominator else 0.0
+            payload[field] = numerator * rule.scale
+        for field in ('request_count', 'error_count'):
+            if field in payload:
+                payload[field] = int(round(payload[field]))
+        return payload
+
+    def to_metric(self, endpoint: str, timestamp: datetime, status_code: int,
+                  parser: PrometheusParser) -> Optional[APIMetric]:
+        """APIMetric for one parsed scrape, None while counters have no baseline"""
+        payload = self.payload(endpoint, parser)
+        if payload is None:
+            return None
+        return APIMetric(timestamp=timestamp, endpoint=endpoint, status_code=status_code, **payload)
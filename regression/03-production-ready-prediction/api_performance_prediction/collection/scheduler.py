@@ -0,0 +1,176 @@
+import asyncio
+import hashlib
+import heapq
+import math
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+@dataclass
+class ScrapeReport:
+    """Outcome of one collection cycle"""
+    started_at: datetime
+    duration: float  # Seconds from the first request to the last result
+    succeeded: List[str] = field(default_factory=list)
+    timed_out: List[str] = field(default_factory=list)  # Includes endpoints cut off by the deadline
+    failed: List[str] = field(default_factory=list)
+    errors: Dict[str, str] = field(default_factory=dict)  # Endpoint -> error message
+    deadline_hit: bool = False
+
+    @property
+    def total(self) -> int:
+        return len(self.succeeded) + len(self.timed_out) + len(self.failed)
+
+def stagger_offset(endpoint: str, interval: float) -> float:
+    """Deterministic phase of an endpoint within its interval"""
+    digest = hashlib.blake2b(endpoint.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') / 2**64 * interval
+
+class StaggeredSchedule:
+    """Fixed-cadence due times with endpoints spread across their interval
+
+    Each endpoint fires at the wall-clock instants where time modulo its
+    interval equals its hash offset, so phases are the same in every
+    process and across restarts. Due times advance by exactly one interval
+    from the previous due time, never from when the scrape finished, so
+    the cadence does not drift. Slots missed while the loop was blocked
+    are skipped rather than fired in a burst.
+    """
+
+    def __init__(self,
+                 endpoints: Sequence[str],
+                 intervals: Sequence[float],
+                 now: float,  # Clock the due times are expressed in
+                 wall_now: Optional[float] = None):
+        if len(endpoints) != len(intervals):
+            raise ValueError("endpoints and intervals must have the same length")
+        if any(interval <= 0 for interval in intervals):
+            raise ValueError("intervals must be positive")
+        if wall_now is None:
+            wall_now = time.time()
+        self.endpoints = list(endpoints)
+        self.intervals = list(intervals)
+        self.skipped = 0
+        self._heap: List[Tuple[float, int]] = []
+        for code, (endpoint, interval) in enumerate(zip(endpoints, intervals)):
+            wait = (stagger_offset(endpoint, interval) - wall_now) % interval
+            self._heap.append((now + wait, code))
+        heapq.heapify(self._heap)
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def next_due(self) -> float:
+        return self._heap[0][0]
+
+    def set_intervals(self, intervals: Sequence[float], now: float,
+                      wall_now: Optional[float] = None):
+        """Change intervals, moving changed endpoints to their new phase"""
+        if len(intervals) != len(self.intervals):
+            raise ValueError("Expected one interval per endpoint")
+        if any(interval <= 0 for interval in intervals):
+            raise ValueError("intervals must be positive")
+        if wall_now is None:
+            wall_now = time.time()
+        changed = {code for code, interval in enumerate(intervals) if interval != self.intervals[code]}
+        if not changed:
+            return
+        self.intervals = list(intervals)
+        for i, (due, code) in enumerate(self._heap):
+            if code in changed:
+                interval = self.intervals[code]
+                wait = (stagger_offset(self.endpoints[code], interval) - wall_now) % interval
+                self._heap[i] = (now + wait, code)
+        heapq.heapify(self._heap)
+
+    def pop_due(self, now: float) -> List[int]:
+        """Codes due at or before now, each rescheduled for its next slot"""
+        codes = []
+        while self._heap and self._heap[0][0] <= now:
+            due, code = self._heap[0]
+            interval = self.intervals[code]
+            due += interval
+            if due <= now:
+                missed = math.floor((now - due) / interval) + 1
+                self.skipped += missed
+                due += missed * interval
+            heapq.heapreplace(self._heap, (due, code))
+            codes.append(code)
+        return codes
+
+class ScrapeScheduler:
+    """Scrapes a set of endpoints with a bounded pool of workers
+
+    Every request gets its own timeout and the cycle as a whole a deadline,
+    after which requests still running are cancelled, so the cycle time is
+    bounded by the deadline whatever the fleet size.
+    """
+
+    def __init__(self,
+                 max_concurrency: int = 100,
+                 request_timeout: float = 10.0,
+                 cycle_deadline: Optional[float] = None):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        self.max_concurrency = max_concurrency
+        self.request_timeout = request_timeout
+        self.cycle_deadline = cycle_deadline
+        # Shared by concurrent cycles, so the bound holds across all of them
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run_cycle(self,
+                        endpoints: List[str],
+                        scrape: Callable[[str], Awaitable[Any]],
+                        deadline: Optional[float] = None  # Overrides cycle_deadline
+                        ) -> Tuple[Dict[str, Any], ScrapeReport]:
+        """Scrape every endpoint once, returning results and a report"""
+        if deadline is None:
+            deadline = self.cycle_deadline
+        report = ScrapeReport(started_at=datetime.now(), duration=0.0)
+        results: Dict[str, Any] = {}
+        pending = deque(endpoints)
+        in_flight = set()
+        start = time.perf_counter()
+
+        async def scrape_one(endpoint: str):
+            try:
+                results[endpoint] = await asyncio.wait_for(
+                    scrape(endpoint), self.request_timeout
+                )
+                report.succeeded.append(endpoint)
+            except asyncio.TimeoutError:
+                report.timed_out.append(endpoint)
+            except Exception as e:
+                report.failed.append(endpoint)
+                report.errors[endpoint] = f"{type(e).__name__}: {e}"
+
+        async def worker():
+            # Workers pull from a shared queue, so only max_concurrency tasks exist
+            while pending:
+                endpoint = pending.popleft()
+                in_flight.add(endpoint)
+                try:
+                    async with self._semaphore:
+                        await scrape_one(endpoint)
+                finally:
+                    in_flight.discard(endpoint)
+
+        workers = [
+            asyncio.create_task(worker())
+            for _ in range(min(self.max_concurrency, len(endpoints)))
+        ]
+        if workers:
+            _, stragglers = await asyncio.wait(workers, timeout=deadline)
+            if stragglers:
+                report.deadline_hit = True
+                cut_off = list(in_flight) + list(pending)
+                pending.clear()
+                for task in stragglers:
+                    task.cancel()
+                await asyncio.gather(*stragglers, return_exceptions=True)
+                report.timed_out.extend(cut_off)
+
+        report.duration = time.perf_counter() - start
+        return results, report
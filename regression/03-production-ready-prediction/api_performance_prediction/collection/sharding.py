@@ -0,0 +1,196 @@
+import asyncio
+import bisect
+import hashlib
+import logging
+import multiprocessing
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import numpy as np
+from ..domain.models import MetricBatch, METRIC_COLUMNS
+from ..monitoring.instrumentation import Instrumentation
+from .codec import MAX_ENDPOINTS, decode_records, encode_records
+from .collector import MetricsCollector
+from .wal import MetricLog
+
+logger = logging.getLogger(__name__)
+
+def _hash64(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'big')
+
+class HashRing:
+    """Consistent hash ring with virtual nodes
+
+    Going from N to N + 1 shards moves about 1 / (N + 1) of the keys, and
+    only onto the new shard.
+    """
+
+    def __init__(self, shards: List[str], replicas: int = 128):  # Points per shard
+        if not shards:
+            raise ValueError("At least one shard is required")
+        points = sorted(
+            (_hash64(f"{shard}#{i}"), shard) for shard in shards for i in range(replicas)
+        )
+        self.shards = list(shards)
+        self._hashes = [point for point, _ in points]
+        self._owners = [shard for _, shard in points]
+
+    def shard_for(self, key: str) -> str:
+        i = bisect.bisect(self._hashes, _hash64(key)) % len(self._hashes)
+        return self._owners[i]
+
+    def assign(self, keys: List[str]) -> Dict[str, List[str]]:
+        """Keys per shard, in their original order"""
+        assignment: Dict[str, List[str]] = {shard: [] for shard in self.shards}
+        for key in keys:
+            assignment[self.shard_for(key)].append(key)
+        return assignment
+
+def _run_shard(endpoints: List[str], conn, options: Dict[str, Any]):
+    """Worker process entry point"""
+    asyncio.run(_collect_shard(endpoints, conn, options))
+
+async def _collect_shard(endpoints: List[str], conn, options: Dict[str, Any]):
+    def send(batch: MetricBatch):
+        if len(batch):
+            conn.send_bytes(encode_records(batch))
+
+    loop = asyncio.get_running_loop()
+    stopping = asyncio.Event()
+    # Any message from the parent, or its end closing, means stop
+    loop.add_reader(conn.fileno(), stopping.set)
+    collector = MetricsCollector(endpoints, history_size=1, on_batch=send, **options)
+    task = asyncio.create_task(collector.start_collection())
+    await stopping.wait()
+    loop.remove_reader(conn.fileno())
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    await collector.stop()
+    conn.close()
+
+class ShardedCollector(MetricsCollector):
+    """Collects through worker processes that each scrape one shard
+
+    Endpoints are spread over the workers by consistent hashing. Every
+    worker runs a regular MetricsCollector on its own event loop and
+    sends each batch back over a pipe as fixed-width records, so JSON
+    decoding and scraping use one core per worker while the parent only
+    logs and copies arrays into its store.
+    """
+
+    def __init__(self,
+                 endpoints: List[str],
+                 workers: Optional[int] = None,  # Defaults to the CPU count
+                 collection_interval: int = 60,
+                 history_size: int = 1000,
+                 max_endpoints: Optional[int] = None,
+                 wal: Optional[MetricLog] = None,
+                 on_batch: Optional[Callable[[MetricBatch], None]] = None,
+                 replicas: int = 128,
+                 stop_timeout: float = 10.0,
+                 instrumentation: Optional[Instrumentation] = None,  # Records in the parent only
+                 **scrape_options):  # Passed to every worker's MetricsCollector
+        if scrape_options.get('adaptive') is not None:
+            # Workers keep no history, so they could not score their endpoints
+            raise ValueError("Adaptive intervals are not supported with sharded collection")
+        super().__init__(
+            endpoints, collection_interval,
+            history_size=history_size,
+            max_endpoints=max_endpoints,
+            wal=wal,
+            on_batch=on_batch,
+            instrumentation=instrumentation,
+            **scrape_options
+        )
+        self.workers = workers or os.cpu_count() or 1
+        self.scrape_options = scrape_options
+        self.stop_timeout = stop_timeout
+        self.ring = HashRing([f"shard-{i}" for i in range(self.workers)], replicas)
+        self.shards = self.ring.assign(endpoints)
+        for shard, shard_endpoints in self.shards.items():
+            if len(shard_endpoints) > MAX_ENDPOINTS:
+                raise ValueError(f"{shard} has more than {MAX_ENDPOINTS} endpoints")
+        self._processes: List[Tuple[multiprocessing.Process, Any, threading.Thread]] = []
+        self._stopped: Optional[asyncio.Event] = None
+
+    async def start_collection(self):
+        """Start one worker per non-empty shard and take in batches until stopped"""
+        self._running = True
+        self._start_wal_sync()
+        self._stopped = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        ctx = multiprocessing.get_context('spawn')
+        options = {'collection_interval': self.collection_interval, **self.scrape_options}
+        for shard, endpoints in self.shards.items():
+            if not endpoints:
+                continue
+            codes = np.array([self.store.register(e) for e in endpoints], dtype=np.int64)
+            conn, child_conn = ctx.Pipe()
+            process = ctx.Process(
+                target=_run_shard, args=(endpoints, child_conn, options),
+                name=f"collector-{shard}", daemon=True
+            )
+            process.start()
+            child_conn.close()
+            reader = threading.Thread(
+                target=self._read_shard, args=(loop, conn, tuple(endpoints), codes),
+                name=f"reader-{shard}", daemon=True
+            )
+            reader.start()
+            self._processes.append((process, conn, reader))
+        logger.info("Collecting %d endpoints with %d workers",
+                    len(self.endpoints), len(self._processes))
+        await self._stopped.wait()
+
+    async def stop(self):
+        """Stop the workers, take in their last batches, then sync the log"""
+        self._running = False
+        loop = asyncio.get_running_loop()
+        processes, self._processes = self._processes, []
+        for _, conn, _ in processes:
+            try:
+                conn.send_bytes(b'stop')
+            except OSError:
+                pass  # The worker is already gone
+        for process, conn, reader in processes:
+            await loop.run_in_executor(None, process.join, self.stop_timeout)
+            if process.is_alive():
+                logger.warning("Terminating %s after %.0fs", process.name, self.stop_timeout)
+                process.terminate()
+            await loop.run_in_executor(None, reader.join)
+            conn.close()
+        # Record the batches the readers handed over last
+        await asyncio.sleep(0)
+        if self._stopped is not None:
+            self._stopped.set()
+        await super().stop()
+
+    def _read_shard(self, loop: asyncio.AbstractEventLoop, conn,
+                    endpoints: Tuple[str, ...], codes: np.ndarray):
+        """Reader thread, decodes a worker's batches until its pipe closes"""
+        while True:
+            try:
+                data = conn.recv_bytes()
+            except (EOFError, OSError):
+                return
+            batch = decode_records(data, endpoints)
+            loop.call_soon_threadsafe(self._record_shard, batch, codes)
+
+    def _record_shard(self, batch: MetricBatch, codes: np.ndarray):
+        if self.instrumentation is not None:
+            with self.instrumentation.span('record', len(batch)):
+                self._append_shard(batch, codes)
+            self.instrumentation.count('samples', codes[batch.endpoint_code])
+        else:
+            self._append_shard(batch, codes)
+
+    def _append_shard(self, batch: MetricBatch, codes: np.ndarray):
+        if self.wal is not None:
+            self.wal.append(batch)
+        # Shard codes map straight to store codes, no per-batch lookups
+        self.store.append_columns(
+            codes[batch.endpoint_code],
+            {name: getattr(batch, name) for name in METRIC_COLUMNS}
+        )
+        if self.on_batch is not None:
+            self.on_batch(batch)
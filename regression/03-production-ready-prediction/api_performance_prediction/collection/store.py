@@ -0,0 +1,186 @@
+import numpy as np
+from typing import Callable, Dict, List, Optional
+from ..domain.models import APIMetric, MetricBatch, METRIC_COLUMNS, endpoint_code_dtype
+
+class MetricStore:
+    """Fixed-size columnar ring buffer of metrics, one ring per endpoint
+
+    Every field is a preallocated (max_endpoints, 2 * capacity) array.
+    Each sample is written twice, at its slot and one capacity further,
+    so the last N samples of an endpoint are always one contiguous slice
+    and can be handed out as views without copying.
+    """
+
+    def __init__(self,
+                 endpoints: List[str],
+                 capacity: int = 1000,  # Samples kept per endpoint
+                 max_endpoints: Optional[int] = None):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.max_endpoints = max(max_endpoints or 0, len(endpoints), 1)
+        self._endpoints: List[str] = []
+        self._codes: Dict[str, int] = {}
+        self._columns = {
+            name: np.zeros((self.max_endpoints, 2 * capacity), dtype=dtype)
+            for name, dtype in METRIC_COLUMNS.items()
+        }
+        self._head = np.zeros(self.max_endpoints, dtype=np.int64)  # Next slot per endpoint
+        self._count = np.zeros(self.max_endpoints, dtype=np.int64)
+        self._listeners: List[Callable[[np.ndarray], None]] = []
+        for endpoint in endpoints:
+            self.register(endpoint)
+
+    @property
+    def endpoints(self) -> List[str]:
+        return list(self._endpoints)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the buffers, fixed at construction"""
+        return sum(column.nbytes for column in self._columns.values())
+
+    def __len__(self) -> int:
+        return int(self._count.sum())
+
+    def count(self, endpoint: str) -> int:
+        """Samples currently held for an endpoint"""
+        code = self._codes.get(endpoint)
+        return 0 if code is None else int(self._count[code])
+
+    def codes(self, endpoints: List[str]) -> np.ndarray:
+        """Store codes of known endpoints, for indexing per-endpoint arrays"""
+        try:
+            return np.array([self._codes[e] for e in endpoints], dtype=np.int64)
+        except KeyError as e:
+            raise KeyError(f"Unknown endpoint {e}") from None
+
+    def register(self, endpoint: str) -> int:
+        """Reserve a ring for an endpoint and return its code"""
+        code = self._codes.get(endpoint)
+        if code is None:
+            if len(self._endpoints) >= self.max_endpoints:
+                raise ValueError(f"Store is full ({self.max_endpoints} endpoints)")
+            code = len(self._endpoints)
+            self._codes[endpoint] = code
+            self._endpoints.append(endpoint)
+        return code
+
+    def has_room(self, endpoints: List[str]) -> bool:
+        """Whether the unknown endpoints among these could all be registered"""
+        unknown = {e for e in endpoints if e not in self._codes}
+        return len(self._endpoints) + len(unknown) <= self.max_endpoints
+
+    def subscribe(self, listener: Callable[[np.ndarray], None]):
+        """Call listener with the codes that received samples after every append"""
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener: Callable[[np.ndarray], None]):
+        self._listeners.remove(listener)
+
+    def _notify(self, codes: np.ndarray):
+        for listener in self._listeners:
+            listener(codes)
+
+    def append(self, metric: APIMetric):
+        """Add one metric in O(1)"""
+        code = self.register(metric.endpoint)
+        slot = self._head[code]
+        for name in METRIC_COLUMNS:
+            value = getattr(metric, name)
+            self._columns[name][code, slot] = value
+            self._columns[name][code, slot + self.capacity] = value
+        self._head[code] = (slot + 1) % self.capacity
+        self._count[code] = min(self._count[code] + 1, self.capacity)
+        if self._listeners:
+            self._notify(np.array([code]))
+
+    def append_batch(self, batch: MetricBatch):
+        """Add a batch in one vectorized pass, in batch order per endpoint"""
+        if len(batch) == 0:
+            return
+        if batch.endpoints == tuple(self._endpoints):
+            codes = batch.endpoint_code.astype(np.int64)
+        else:
+            mapping = np.array([self.register(e) for e in batch.endpoints], dtype=np.int64)
+            codes = mapping[batch.endpoint_code]
+
+        self.append_columns(codes, {name: getattr(batch, name) for name in METRIC_COLUMNS})
+
+    def append_columns(self, codes: np.ndarray, columns: Dict[str, np.ndarray]):
+        """Add rows given store codes from register() and one array per field"""
+        if len(codes) == 0:
+            return
+        added = np.bincount(codes, minlength=self.max_endpoints)
+        if added.max() == 1:
+            # One row per endpoint, the usual shape of a collection cycle
+            slots = self._head[codes]
+        else:
+            # Position of each row among the rows for the same endpoint
+            order = np.argsort(codes, kind='stable')
+            sorted_codes = codes[order]
+            idx = np.arange(len(codes))
+            group_start = np.r_[True, sorted_codes[1:] != sorted_codes[:-1]]
+            rank = np.empty_like(idx)
+            rank[order] = idx - np.maximum.accumulate(np.where(group_start, idx, 0))
+            slots = (self._head[codes] + rank) % self.capacity
+
+        # Flat positions computed once, then reused for every field
+        flat = codes * (2 * self.capacity) + slots
+        mirror = flat + self.capacity
+        for name in METRIC_COLUMNS:
+            values = columns[name]
+            column = self._columns[name].reshape(-1)
+            column[flat] = values
+            column[mirror] = values
+
+        self._head = (self._head + added) % self.capacity
+        self._count = np.minimum(self._count + added, self.capacity)
+        if self._listeners:
+            self._notify(np.flatnonzero(added))
+
+    def window(self, endpoint: str, n: Optional[int] = None) -> MetricBatch:
+        """Last n samples of an endpoint (all held by default) as views"""
+        code = self._codes.get(endpoint)
+        if code is None:
+            raise KeyError(f"Unknown endpoint '{endpoint}'")
+        held = int(self._count[code])
+        n = held if n is None else min(n, held)
+        end = int(self._head[code]) + self.capacity
+        columns = {name: column[code, end - n:end] for name, column in self._columns.items()}
+        return MetricBatch(
+            endpoint_code=np.broadcast_to(
+                np.asarray(code, dtype=endpoint_code_dtype(len(self._endpoints))), (n,)
+            ),
+            endpoints=tuple(self._endpoints),
+            **columns
+        )
+
+    def recent(self, n: Optional[int] = None, codes: Optional[np.ndarray] = None) -> MetricBatch:
+        """Last n samples of every endpoint, or of the given codes, grouped by endpoint in time order"""
+        n_endpoints = len(self._endpoints)
+        selected = np.arange(n_endpoints) if codes is None else np.unique(codes)
+        counts = self._count[selected]
+        if n is not None:
+            counts = np.minimum(counts, n)
+        total = int(counts.sum())
+
+        rows = np.repeat(selected, counts)
+        first = np.repeat(self._head[selected] + self.capacity - counts, counts)
+        offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        cols = first + offsets
+        return MetricBatch(
+            endpoint_code=rows.astype(endpoint_code_dtype(n_endpoints)),
+            endpoints=tuple(self._endpoints),
+            **{name: column[rows, cols] for name, column in self._columns.items()}
+        )
+
+    def history(self) -> MetricBatch:
+        """Every sample held, grouped by endpoint in time order"""
+        return self.recent()
+
+    def latest(self, endpoint: str) -> Optional[APIMetric]:
+        """Most recent metric of an endpoint, None if it has none"""
+        if self.count(endpoint) == 0:
+            return None
+        return self.window(endpoint, 1).to_metrics()[0]
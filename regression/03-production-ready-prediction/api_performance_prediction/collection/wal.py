@@ -0,0 +1,252 @@
+import asyncio
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Optional, Tuple
+import numpy as np
+from ..domain.models import MetricBatch, METRIC_COLUMNS
+from .codec import RECORD_DTYPE as FRAME_RECORD_DTYPE
+from .store import MetricStore
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_PATTERN = 'wal-*.log'
+# Entry type, item count, payload size, payload CRC32
+ENTRY_HEADER = struct.Struct('<BIII')
+ENDPOINTS_ENTRY = 1  # Newline-joined names, taking the next ids in order
+RECORDS_ENTRY = 2
+
+# Same fixed-width layout as pushed frames, with room for more endpoint ids
+RECORD_DTYPE = np.dtype([('endpoint_code', '<u4')] + FRAME_RECORD_DTYPE.descr[1:])
+
+@dataclass(frozen=True)
+class ReplayReport:
+    """Outcome of rebuilding a store from the log"""
+    segments: int
+    samples: int
+    bytes_read: int
+    seconds: float
+    corrupt_segments: int  # Segments whose tail was torn or failed its CRC
+    skipped_endpoints: int  # Logged endpoints the store had no room for
+
+class MetricLog:
+    """Append-only, segment-rotated log of collected metrics
+
+    Each segment is a sequence of CRC-checked entries: endpoint tables
+    and runs of fixed-width records. A segment starts with the full
+    endpoint table, so it can be replayed on its own, and a new segment
+    is opened on every start, so old segments are never written again.
+
+    Writes go to the OS on append; ``sync`` fsyncs them, and is meant to
+    be called periodically from a thread, so a crash loses at most one
+    sync interval of data. A full segment is fsynced and closed on a
+    writer thread, so appends from the event loop never wait on the disk.
+    """
+
+    def __init__(self,
+                 directory: str,
+                 segment_size: int = 64 * 2**20,  # Bytes before rotating
+                 fsync_interval: float = 1.0,
+                 retention: float = 86400.0):  # Seconds a closed segment is kept
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_size = segment_size
+        self.fsync_interval = fsync_interval
+        self.retention = retention
+        self._lock = threading.Lock()
+        self._file: Optional[BinaryIO] = None
+        self._size = 0
+        self._dirty = False
+        self._ids: Dict[str, int] = {}
+        self._names: List[str] = []
+        self._cached: Tuple[Tuple[str, ...], Optional[np.ndarray]] = ((), None)
+        self._writer: Optional[ThreadPoolExecutor] = None  # Closes full segments
+
+    def segments(self) -> List[Path]:
+        """Segment files, oldest first"""
+        return sorted(self.directory.glob(SEGMENT_PATTERN))
+
+    def append(self, batch: MetricBatch):
+        """Write a batch as one records entry, rotating the segment if full"""
+        if len(batch) == 0:
+            return
+        with self._lock:
+            if self._file is None:
+                self._open_segment()
+            ids = self._endpoint_ids(batch.endpoints)
+            records = np.empty(len(batch), dtype=RECORD_DTYPE)
+            records['endpoint_code'] = ids[batch.endpoint_code]
+            for name in METRIC_COLUMNS:
+                records[name] = getattr(batch, name)
+            self._write_entry(RECORDS_ENTRY, len(batch), records.tobytes())
+            if self._size >= self.segment_size:
+                self._rotate()
+
+    def sync(self):
+        """Flush and fsync everything appended so far, safe from any thread"""
+        with self._lock:
+            if not self._dirty:
+                return
+            self._file.flush()
+            # fsync a duplicate so rotation can close the segment meanwhile
+            fd = os.dup(self._file.fileno())
+            self._dirty = False
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    async def sync_periodically(self):
+        """Run sync every fsync_interval off the event loop until cancelled"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.fsync_interval)
+            await loop.run_in_executor(None, self.sync)
+
+    def close(self):
+        """Close the current segment and wait for full ones still closing"""
+        with self._lock:
+            if self._file is not None:
+                self._rotate()
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            writer.shutdown(wait=True)
+
+    def replay(self, store: MetricStore) -> ReplayReport:
+        """Rebuild a store from every segment on disk, oldest first"""
+        start = time.perf_counter()
+        current = Path(self._file.name) if self._file is not None else None
+        segments = [path for path in self.segments() if path != current]
+        samples = bytes_read = corrupt = 0
+        skipped: set = set()
+        for path in segments:
+            data = path.read_bytes()
+            bytes_read += len(data)
+            segment_samples, intact = self._replay_segment(memoryview(data), store, skipped)
+            samples += segment_samples
+            if not intact:
+                corrupt += 1
+                logger.warning("Stopped replaying %s at a torn or corrupt entry", path.name)
+        report = ReplayReport(
+            segments=len(segments),
+            samples=samples,
+            bytes_read=bytes_read,
+            seconds=time.perf_counter() - start,
+            corrupt_segments=corrupt,
+            skipped_endpoints=len(skipped)
+        )
+        if skipped:
+            logger.warning("Skipped %d logged endpoints beyond the store's %d",
+                           len(skipped), store.max_endpoints)
+        logger.info("Replayed %d samples from %d segments (%.1f MB) in %.2fs",
+                    report.samples, report.segments, report.bytes_read / 2**20, report.seconds)
+        return report
+
+    @staticmethod
+    def _replay_segment(data: memoryview, store: MetricStore, skipped: set) -> Tuple[int, bool]:
+        """Samples replayed from one segment and whether it was read to the end
+
+        Endpoints the store has no room for are added to skipped and
+        their records dropped.
+        """
+        offset = samples = 0
+        mapping = np.empty(0, dtype=np.int64)  # Log id -> store code
+        while offset < len(data):
+            if len(data) - offset < ENTRY_HEADER.size:
+                return samples, False
+            kind, count, size, crc = ENTRY_HEADER.unpack_from(data, offset)
+            offset += ENTRY_HEADER.size
+            payload = data[offset:offset + size]
+            if len(payload) < size or zlib.crc32(payload) != crc:
+                return samples, False
+            offset += size
+
+            if kind == ENDPOINTS_ENTRY:
+                names = bytes(payload).decode().split('\n')
+                codes = []
+                for name in names:
+                    if store.has_room([name]):
+                        codes.append(store.register(name))
+                    else:
+                        codes.append(-1)
+                        skipped.add(name)
+                mapping = np.concatenate([mapping, np.array(codes, dtype=np.int64)])
+            elif kind == RECORDS_ENTRY:
+                records = np.frombuffer(payload, dtype=RECORD_DTYPE, count=count)
+                codes = mapping[records['endpoint_code']]
+                kept = codes >= 0
+                if not kept.all():
+                    codes, records = codes[kept], records[kept]
+                store.append_columns(codes, {name: records[name] for name in METRIC_COLUMNS})
+                samples += len(codes)
+            else:
+                return samples, False
+        return samples, True
+
+    def _endpoint_ids(self, endpoints: Tuple[str, ...]) -> np.ndarray:
+        """Log ids for a batch's endpoint table, declaring new endpoints first"""
+        cached_endpoints, cached_ids = self._cached
+        if cached_ids is not None and endpoints == cached_endpoints:
+            return cached_ids
+        new = [name for name in dict.fromkeys(endpoints) if name not in self._ids]
+        if new:
+            self._declare(new)
+        ids = np.array([self._ids[name] for name in endpoints], dtype=np.uint32)
+        self._cached = (endpoints, ids)
+        return ids
+
+    def _declare(self, names: List[str]):
+        for name in names:
+            if '\n' in name:
+                raise ValueError("Endpoint names cannot contain newlines")
+            self._ids[name] = len(self._names)
+            self._names.append(name)
+        self._write_entry(ENDPOINTS_ENTRY, len(names), '\n'.join(names).encode())
+
+    def _write_entry(self, kind: int, count: int, payload: bytes):
+        header = ENTRY_HEADER.pack(kind, count, len(payload), zlib.crc32(payload))
+        self._file.write(header + payload)
+        self._size += len(header) + len(payload)
+        self._dirty = True
+
+    def _open_segment(self):
+        segments = self.segments()
+        sequence = int(segments[-1].stem.split('-')[1]) + 1 if segments else 0
+        path = self.directory / f"wal-{sequence:08d}.log"
+        self._file = open(path, 'xb')
+        self._size = 0
+        # Ids are per segment, so each segment restates the endpoints it may use
+        names, self._names, self._ids = self._names, [], {}
+        self._cached = ((), None)
+        if names:
+            self._declare(names)
+
+    def _rotate(self):
+        """Hand the segment to the writer thread to sync and close, the next append opens a new one"""
+        if self._writer is None:
+            self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='wal-writer')
+        file, self._file = self._file, None
+        self._dirty = False
+        self._writer.submit(self._close_segment, file)
+
+    def _close_segment(self, file: BinaryIO):
+        try:
+            file.flush()
+            os.fsync(file.fileno())
+            file.close()
+            self._prune()
+        except OSError:
+            logger.exception("Failed to close segment %s", file.name)
+
+    def _prune(self):
+        """Drop closed segments older than the retention period"""
+        cutoff = time.time() - self.retention
+        for path in self.segments():
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
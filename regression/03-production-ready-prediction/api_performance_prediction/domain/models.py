@@ -1,6 +1,8 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
+import numpy as np
+import pandas as pd
 
 @dataclass(frozen=True)
 class APIMetric:
@@ -28,4 +30,320 @@ class PredictionResult:
         if self.confidence_interval[0] > self.confidence_interval[1]:
             raise ValueError("Invalid confidence interval")
         if any(not isinstance(v, (int, float)) for v in self.features_used.values()):
-            raise TypeError("Features must be numeric")
\ No newline at end of file
+            raise TypeError("Features must be numeric")
+
+@dataclass(frozen=True, slots=True)
+class CompactAPIMetric:
+    """APIMetric without a per-instance __dict__"""
+    timestamp: datetime
+    endpoint: str
+    latency_ms: float
+    status_code: int
+    cpu_usage: float
+    memory_usage: float
+    request_count: int
+    error_count: int
+
+@dataclass(frozen=True, slots=True)
+class CompactPredictionResult:
+    """PredictionResult that keeps its features as a row of a shared matrix
+
+    features_used builds the dict only when asked for. Instances built
+    directly are validated, the row views of a PredictionBatch are not,
+    the batch has checked all of its rows at once.
+    """
+    timestamp: datetime
+    endpoint: str
+    predicted_latency: float
+    confidence_interval: tuple[float, float]
+    features: np.ndarray
+    feature_names: Tuple[str, ...]
+    model_version: str
+
+    def __post_init__(self):
+        if self.confidence_interval[0] > self.confidence_interval[1]:
+            raise ValueError("Invalid confidence interval")
+        if not np.issubdtype(self.features.dtype, np.number):
+            raise TypeError("Features must be numeric")
+
+    @property
+    def features_used(self) -> Dict[str, float]:
+        return dict(zip(self.feature_names, self.features.tolist()))
+
+    @classmethod
+    def _unchecked(cls, *values) -> 'CompactPredictionResult':
+        """Instance from field values in order, skipping __post_init__"""
+        result = object.__new__(cls)
+        for name, value in zip(_COMPACT_PREDICTION_FIELDS, values):
+            object.__setattr__(result, name, value)
+        return result
+
+_COMPACT_PREDICTION_FIELDS = tuple(f.name for f in fields(CompactPredictionResult))
+
+# Column name -> dtype for the columnar metric representation
+METRIC_COLUMNS = {
+    'timestamp': np.dtype('datetime64[us]'),
+    'latency_ms': np.dtype(np.float64),
+    'status_code': np.dtype(np.int16),
+    'cpu_usage': np.dtype(np.float64),
+    'memory_usage': np.dtype(np.float64),
+    'request_count': np.dtype(np.int64),
+    'error_count': np.dtype(np.int64)
+}
+
+def endpoint_code_dtype(n_endpoints: int) -> np.dtype:
+    """Smallest code type pandas keeps as-is for a categorical of this size"""
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_endpoints < np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+@dataclass(frozen=True)
+class MetricBatch:
+    """Columnar batch of API metrics, one typed array per field
+
+    Endpoints are stored as integer codes into ``endpoints``.
+    """
+    timestamp: np.ndarray
+    endpoint_code: np.ndarray
+    latency_ms: np.ndarray
+    status_code: np.ndarray
+    cpu_usage: np.ndarray
+    memory_usage: np.ndarray
+    request_count: np.ndarray
+    error_count: np.ndarray
+    endpoints: Tuple[str, ...]
+
+    def __post_init__(self):
+        n = len(self.endpoint_code)
+        if self.endpoint_code.dtype != endpoint_code_dtype(len(self.endpoints)):
+            raise TypeError("endpoint_code must use endpoint_code_dtype(len(endpoints))")
+        for name, dtype in METRIC_COLUMNS.items():
+            column = getattr(self, name)
+            if column.dtype != dtype:
+                raise TypeError(f"{name} must be {dtype}, got {column.dtype}")
+            if len(column) != n:
+                raise ValueError("All columns must have the same length")
+
+    def __len__(self) -> int:
+        return len(self.endpoint_code)
+
+    @classmethod
+    def from_metrics(cls, 
+                     metrics: List[APIMetric], 
+                     endpoints: Optional[List[str]] = None) -> 'MetricBatch':
+        """Build a batch from APIMetric instances"""
+        if endpoints is None:
+            endpoints = list(dict.fromkeys(m.endpoint for m in metrics))
+        codes = {endpoint: i for i, endpoint in enumerate(endpoints)}
+        return cls.from_columns(
+            endpoints,
+            endpoint_code=[codes[m.endpoint] for m in metrics],
+            **{name: [getattr(m, name) for m in metrics] for name in METRIC_COLUMNS}
+        )
+
+    @classmethod
+    def from_columns(cls, endpoints: List[str], **columns) -> 'MetricBatch':
+        """Build a batch from per-field sequences, cast to the column types"""
+        return cls(
+            endpoint_code=np.asarray(
+                columns.pop('endpoint_code'), 
+                dtype=endpoint_code_dtype(len(endpoints))
+            ),
+            endpoints=tuple(endpoints),
+            **{name: np.asarray(columns[name], dtype=dtype) 
+               for name, dtype in METRIC_COLUMNS.items()}
+        )
+
+    @classmethod
+    def empty(cls, endpoints: List[str]) -> 'MetricBatch':
+        return cls.from_columns(
+            endpoints, 
+            endpoint_code=[], 
+            **{name: [] for name in METRIC_COLUMNS}
+        )
+
+    def to_frame(self) -> pd.DataFrame:
+        """DataFrame view over the batch's arrays, without copying them"""
+        endpoint = pd.Categorical.from_codes(
+            self.endpoint_code, 
+            dtype=pd.CategoricalDtype(list(self.endpoints)),
+            validate=False
+        )
+        return pd.DataFrame({
+            'timestamp': self.timestamp,
+            'endpoint': endpoint,
+            'latency_ms': self.latency_ms,
+            'status_code': self.status_code,
+            'cpu_usage': self.cpu_usage,
+            'memory_usage': self.memory_usage,
+            'request_count': self.request_count,
+            'error_count': self.error_count
+        }, copy=False)
+
+    def to_metrics(self, compact: bool = False) -> List[APIMetric]:
+        """Materialize APIMetric instances, for callers that need them"""
+        metric_type = CompactAPIMetric if compact else APIMetric
+        return [
+            metric_type(
+                timestamp=timestamp,
+                endpoint=self.endpoints[code],
+                latency_ms=latency,
+                status_code=status,
+                cpu_usage=cpu,
+                memory_usage=memory,
+                request_count=requests,
+                error_count=errors
+            )
+            for timestamp, code, latency, status, cpu, memory, requests, errors in zip(
+                self.timestamp.tolist(), self.endpoint_code.tolist(),
+                self.latency_ms.tolist(), self.status_code.tolist(),
+                self.cpu_usage.tolist(), self.memory_usage.tolist(),
+                self.request_count.tolist(), self.error_count.tolist()
+            )
+        ]
+
+# Column name -> dtype for the per-row arrays of a PredictionBatch
+PREDICTION_COLUMNS = {
+    'timestamp': np.dtype('datetime64[us]'),
+    'predicted_latency': np.dtype(np.float64),
+    'lower': np.dtype(np.float64),
+    'upper': np.dtype(np.float64)
+}
+
+@dataclass(frozen=True)
+class PredictionBatch:
+    """Columnar batch of predictions, one array per field
+
+    Endpoints are stored as integer codes into ``endpoints``. Row i was
+    predicted from ``features[i]``, the matrix is shared with the model
+    input rather than copied into per-row dicts. Validation runs once
+    over the arrays. Iterating yields CompactPredictionResult views.
+    """
+    timestamp: np.ndarray
+    endpoint_code: np.ndarray
+    predicted_latency: np.ndarray
+    lower: np.ndarray  # Confidence interval bounds
+    upper: np.ndarray
+    features: np.ndarray  # (rows, len(feature_names))
+    feature_names: Tuple[str, ...]
+    endpoints: Tuple[str, ...]
+    model_version: str
+
+    def __post_init__(self):
+        n = len(self.endpoint_code)
+        if self.endpoint_code.dtype != endpoint_code_dtype(len(self.endpoints)):
+            raise TypeError("endpoint_code must use endpoint_code_dtype(len(endpoints))")
+        for name, dtype in PREDICTION_COLUMNS.items():
+            column = getattr(self, name)
+            if column.dtype != dtype:
+                raise TypeError(f"{name} must be {dtype}, got {column.dtype}")
+            if len(column) != n:
+                raise ValueError("All columns must have the same length")
+        if self.features.shape != (n, len(self.feature_names)):
+            raise ValueError("features must have one row per prediction and one column per name")
+        if not np.issubdtype(self.features.dtype, np.number):
+            raise TypeError("Features must be numeric")
+        if np.any(self.lower > self.upper):
+            raise ValueError("Invalid confidence interval")
+
+    def __len__(self) -> int:
+        return len(self.endpoint_code)
+
+    def __getitem__(self, i: int) -> CompactPredictionResult:
+        # Validated with the whole batch in __post_init__
+        return CompactPredictionResult._unchecked(
+            self.timestamp[i].item(),
+            self.endpoints[self.endpoint_code[i]],
+            float(self.predicted_latency[i]),
+            (float(self.lower[i]), float(self.upper[i])),
+            self.features[i],
+            self.feature_names,
+            self.model_version
+        )
+
+    def __iter__(self) -> Iterator[CompactPredictionResult]:
+        return (self[i] for i in range(len(self)))
+
+    def endpoint_names(self) -> List[str]:
+        """Endpoint of every row"""
+        endpoints = self.endpoints
+        return [endpoints[code] for code in self.endpoint_code.tolist()]
+
+    @classmethod
+    def from_columns(cls,
+                     endpoints: List[str],
+                     feature_names: List[str],
+                     model_version: str,
+                     **columns) -> 'PredictionBatch':
+        """Build a batch from per-field sequences, cast to the column types"""
+        return cls(
+            endpoint_code=np.asarray(
+                columns.pop('endpoint_code'),
+                dtype=endpoint_code_dtype(len(endpoints))
+            ),
+            features=np.asarray(columns.pop('features'), dtype=np.float64).reshape(-1, len(feature_names)),
+            feature_names=tuple(feature_names),
+            endpoints=tuple(endpoints),
+            model_version=model_version,
+            **{name: np.asarray(columns[name], dtype=dtype)
+               for name, dtype in PREDICTION_COLUMNS.items()}
+        )
+
+    @classmethod
+    def from_predictions(cls, predictions: List[PredictionResult]) -> 'PredictionBatch':
+        """Build a batch from PredictionResult instances of one model version
+
+        Feature names are those of the first prediction, missing ones are NaN.
+        """
+        if not predictions:
+            raise ValueError("Cannot build a PredictionBatch from no predictions")
+        endpoints = list(dict.fromkeys(p.endpoint for p in predictions))
+        codes = {endpoint: i for i, endpoint in enumerate(endpoints)}
+        feature_names = list(predictions[0].features_used)
+        return cls.from_columns(
+            endpoints,
+            feature_names,
+            predictions[0].model_version,
+            endpoint_code=[codes[p.endpoint] for p in predictions],
+            timestamp=pd.to_datetime([p.timestamp for p in predictions]).to_numpy(),
+            predicted_latency=[p.predicted_latency for p in predictions],
+            lower=[p.confidence_interval[0] for p in predictions],
+            upper=[p.confidence_interval[1] for p in predictions],
+            features=[[p.features_used.get(name, np.nan) for name in feature_names] for p in predictions]
+        )
+
+    def to_predictions(self) -> List[PredictionResult]:
+        """Materialize PredictionResult instances, for callers that need them"""
+        feature_names = self.feature_names
+        return [
+            PredictionResult(
+                timestamp=timestamp,
+                endpoint=endpoint,
+                predicted_latency=predicted,
+                confidence_interval=(low, high),
+                features_used=dict(zip(feature_names, values)),
+                model_version=self.model_version
+            )
+            for timestamp, endpoint, predicted, low, high, values in zip(
+                self.timestamp.tolist(), self.endpoint_names(),
+                self.predicted_latency.tolist(), self.lower.tolist(),
+                self.upper.tolist(), self.features.tolist()
+            )
+        ]
+
+    def to_frame(self) -> pd.DataFrame:
+        """DataFrame view over the batch's arrays and features"""
+        endpoint = pd.Categorical.from_codes(
+            self.endpoint_code,
+            dtype=pd.CategoricalDtype(list(self.endpoints)),
+            validate=False
+        )
+        frame = pd.DataFrame({
+            'timestamp': self.timestamp,
+            'endpoint': endpoint,
+            'predicted_latency': self.predicted_latency,
+            'lower': self.lower,
+            'upper': self.upper
+        }, copy=False)
+        return frame.join(pd.DataFrame(self.features, columns=list(self.feature_names), copy=False))
@@ -0,0 +1,77 @@
+import math
+from typing import Iterator, List, Optional
+
+class RollingMean:
+    """Fixed-window mean over a ring buffer, O(1) per update
+
+    Mirrors the compensated add/remove update pandas uses for
+    ``rolling(window, min_periods=1).mean()`` so both give the same floats.
+    """
+
+    def __init__(self, window: int):
+        self.window = window
+        self._values: List[float] = [0.0] * window
+        self._head = 0  # Next slot to write
+        self._nobs = 0
+        self._sum = 0.0
+        self._compensation_add = 0.0
+        self._compensation_remove = 0.0
+        self._neg_count = 0
+        self._same_count = 0  # Length of the current run of equal values
+        self._prev = math.nan
+
+    def update(self, value: float) -> float:
+        """Add a value, dropping the oldest once the window is full"""
+        if self._nobs == self.window:
+            self._remove(self._values[self._head])
+        self._values[self._head] = value
+        self._head = (self._head + 1) % self.window
+        self._add(value)
+        return self.mean
+
+    @property
+    def oldest(self) -> Optional[float]:
+        """Value the next update drops, None until the window is full"""
+        return self._values[self._head] if self._nobs == self.window else None
+
+    def __iter__(self) -> Iterator[float]:
+        """Values in the window, oldest first"""
+        start = (self._head - self._nobs) % self.window
+        for i in range(self._nobs):
+            yield self._values[(start + i) % self.window]
+
+    @property
+    def mean(self) -> float:
+        if self._nobs == 0:
+            return math.nan
+        result = self._sum / self._nobs
+        if self._same_count >= self._nobs:
+            result = self._prev
+        elif self._neg_count == 0 and result < 0:
+            result = 0.0
+        elif self._neg_count == self._nobs and result > 0:
+            result = 0.0
+        return result
+
+    def _add(self, value: float):
+        self._nobs += 1
+        y = value - self._compensation_add
+        t = self._sum + y
+        self._compensation_add = t - self._sum - y
+        self._sum = t
+        if math.copysign(1.0, value) < 0:
+            self._neg_count += 1
+        if value == self._prev:
+            self._same_count += 1
+        else:
+            self._same_count = 1
+        self._prev = value
+
+    def _remove(self, value: float):
+        self._nobs -= 1
+        y = -value - self._compensation_remove
+        t = self._sum + y
+        self._compensation_remove = t - self._sum - y
+        self._sum = t
+        if math.copysign(1.0, value) < 0:
+            self._neg_count -= 1
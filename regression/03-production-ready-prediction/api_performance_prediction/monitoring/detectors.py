@@ -0,0 +1,228 @@
+import math
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Union
+from .statistics import RunningStats
+
+class ChangeDetector(ABC):
+    """Streaming change-point detector fed one value at a time
+
+    Detectors watch for the mean of a series, prediction error here,
+    going up. Page-Hinkley and CUSUM start over after every change they
+    report, ADWIN keeps the part of its window after the change.
+    """
+
+    @abstractmethod
+    def update(self, value: float) -> bool:
+        """Add a value, True when it completes a change"""
+
+    @abstractmethod
+    def reset(self):
+        """Forget every value seen"""
+
+class PageHinkley(ChangeDetector):
+    """Page-Hinkley test for an increase in the mean
+
+    Accumulates each value's excess over the running mean, less delta,
+    and reports a change once the sum rises threshold above its minimum.
+    Both are in the units of the series, percentage points for MAPE.
+    """
+
+    def __init__(self,
+                 delta: float = 2.0,  # Increase small enough to ignore
+                 threshold: float = 400.0,
+                 min_samples: int = 30):  # Values before a change can be reported
+        self.delta = delta
+        self.threshold = threshold
+        self.min_samples = min_samples
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.mean = 0.0
+        self.sum = 0.0
+        self.minimum = 0.0
+
+    def update(self, value: float) -> bool:
+        self.count += 1
+        self.mean += (value - self.mean) / self.count
+        self.sum += value - self.mean - self.delta
+        self.minimum = min(self.minimum, self.sum)
+        if self.count >= self.min_samples and self.sum - self.minimum > self.threshold:
+            self.reset()
+            return True
+        return False
+
+class Cusum(ChangeDetector):
+    """One-sided CUSUM on values standardized against a warm-up baseline
+
+    The first `warmup` values set the reference mean and spread, after
+    which drift and threshold are in standard deviations. Standardized
+    values are clipped, so a single outlier of a heavy-tailed error
+    cannot raise an alarm alone. Every value is scored, then added to the
+    reference, which forgets slowly enough that a shift is reported long
+    before it is absorbed.
+    """
+
+    def __init__(self,
+                 drift: float = 1.0,  # Shift ignored, in standard deviations
+                 threshold: float = 10.0,
+                 warmup: int = 50,
+                 half_life: float = 500.0,  # Values until the reference forgets one by half
+                 clip: float = 3.0):  # Largest standardized value counted
+        if warmup < 2:
+            raise ValueError("warmup must be at least 2")
+        self.drift = drift
+        self.threshold = threshold
+        self.clip = clip
+        self.warmup = warmup
+        self.half_life = half_life
+        self.reset()
+
+    def reset(self):
+        self.reference = RunningStats(self.half_life)
+        self.sum = 0.0
+
+    def update(self, value: float) -> bool:
+        reference = self.reference
+        if reference.count < self.warmup:
+            reference.update(value)
+            return False
+        std = reference.std or 1.0
+        score = min((value - reference.mean) / std, self.clip)
+        self.sum = max(0.0, self.sum + score - self.drift)
+        reference.update(value)
+        if self.sum > self.threshold:
+            self.reset()
+            return True
+        return False
+
+class Adwin(ChangeDetector):
+    """ADWIN over an exponential histogram of buckets
+
+    Keeps at most max_buckets buckets of each size 2 ** level and drops
+    the oldest part of the window whenever some split of it has means
+    further apart than the Hoeffding-style bound at confidence delta.
+    Reports a change only when the newer part has the higher mean. The
+    window is capped at max_window values and splits are checked every
+    `clock` updates. Updates are not O(1) though: the update that checks
+    walks every bucket, again after each cut, so it costs up to
+    O(window) and only the average over `clock` updates stays small.
+    """
+
+    def __init__(self,
+                 delta: float = 1e-9,  # Far below the textbook 0.002, which reads the daily error cycle as change
+                 max_buckets: int = 5,  # Buckets kept per size
+                 max_window: int = 10000,
+                 min_window: int = 10,  # Values each side of a split needs
+                 clock: int = 32):  # Updates between split checks
+        self.delta = delta
+        self.max_buckets = max_buckets
+        self.max_window = max_window
+        self.min_window = min_window
+        self.clock = clock
+        self.reset()
+
+    def reset(self):
+        # Bucket (total, squared deviations) lists per level, oldest first
+        self._levels: List[List[List[float]]] = []
+        self.width = 0
+        self.total = 0.0
+        self.variance = 0.0  # Sum of squared deviations over the window
+        self._ticks = 0
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.width if self.width else 0.0
+
+    def update(self, value: float) -> bool:
+        if self.width:
+            mean = self.total / self.width
+            self.variance += self.width * (value - mean) ** 2 / (self.width + 1)
+        self.width += 1
+        self.total += value
+        self._insert(value)
+        while self.width > self.max_window:
+            self._drop_oldest()
+        self._ticks += 1
+        if self._ticks % self.clock or self.width < 2 * self.min_window:
+            return False
+        return self._shrink()
+
+    def _insert(self, value: float):
+        if not self._levels:
+            self._levels.append([])
+        self._levels[0].append([value, 0.0])
+        level = 0
+        while len(self._levels[level]) > self.max_buckets:
+            (total_a, var_a), (total_b, var_b) = self._levels[level][:2]
+            del self._levels[level][:2]
+            size = 2 ** level
+            merged = [
+                total_a + total_b,
+                var_a + var_b + size * size * (total_a / size - total_b / size) ** 2 / (2 * size)
+            ]
+            if level + 1 == len(self._levels):
+                self._levels.append([])
+            self._levels[level + 1].append(merged)
+            level += 1
+
+    def _drop_oldest(self):
+        level = len(self._levels) - 1
+        total, variance = self._levels[level].pop(0)
+        size = 2 ** level
+        self.width -= size
+        self.total -= total
+        if self.width:
+            mean_rest = self.total / self.width
+            self.variance -= variance + size * self.width * (total / size - mean_rest) ** 2 / (size + self.width)
+            self.variance = max(self.variance, 0.0)
+        else:
+            self.variance = 0.0
+        while self._levels and not self._levels[-1]:
+            self._levels.pop()
+
+    def _shrink(self) -> bool:
+        """Drop the oldest buckets while a split shows a change"""
+        increased = False
+        cut = True
+        while cut and self.width >= 2 * self.min_window:
+            cut = False
+            bound = math.log(2 * math.log(self.width) / self.delta)
+            variance = self.variance / self.width
+            old_width, old_total = 0, 0.0
+            for level in range(len(self._levels) - 1, -1, -1):
+                size = 2 ** level
+                for total, _ in self._levels[level]:
+                    old_width += size
+                    old_total += total
+                    new_width = self.width - old_width
+                    if new_width < self.min_window:
+                        break
+                    if old_width < self.min_window:
+                        continue
+                    new_mean = (self.total - old_total) / new_width
+                    m = 1 / old_width + 1 / new_width
+                    epsilon = math.sqrt(2 * m * variance * bound) + 2 / 3 * bound * m
+                    if abs(old_total / old_width - new_mean) > epsilon:
+                        increased |= new_mean > old_total / old_width
+                        cut = True
+                        break
+                if cut or old_width >= self.width - self.min_window:
+                    break
+            if cut:
+                self._drop_oldest()
+        return increased
+
+DETECTORS: Dict[str, Callable[[], ChangeDetector]] = {
+    'page_hinkley': PageHinkley,
+    'cusum': Cusum,
+    'adwin': Adwin
+}
+
+def detector_factory(detector: Union[str, Callable[[], ChangeDetector]]) -> Callable[[], ChangeDetector]:
+    """Factory for a detector name from DETECTORS, or the factory given"""
+    if isinstance(detector, str):
+        if detector not in DETECTORS:
+            raise ValueError(f"Unknown detector '{detector}', expected one of {tuple(DETECTORS)}")
+        return DETECTORS[detector]
+    return detector
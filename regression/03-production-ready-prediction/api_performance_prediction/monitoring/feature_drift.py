@@ -0,0 +1,360 @@
+import threading
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+from ..domain.models import MetricBatch
+
+NUMERIC_FEATURES = ('latency_ms', 'cpu_usage', 'memory_usage', 'request_count', 'error_rate')
+CATEGORICAL_FEATURES = {'hour': 24, 'day_of_week': 7}
+CATEGORICAL_PERIODS = {'hour': 86_400_000_000, 'day_of_week': 7 * 86_400_000_000}  # Microseconds
+FEATURES = NUMERIC_FEATURES + tuple(CATEGORICAL_FEATURES)
+
+SUB_BUCKETS = 8  # Log-linear sub-buckets per power of two, under 7% relative error
+MIN_EXPONENT, MAX_EXPONENT = -16, 32  # frexp exponents kept, about 1.5e-5 to 4.3e9
+N_SKETCH_BUCKETS = (MAX_EXPONENT - MIN_EXPONENT + 1) * SUB_BUCKETS + 1  # Bucket 0 holds zero and below
+PSI_EPSILON = 1e-4  # Floor on bin proportions, so empty bins keep PSI finite
+
+def sketch_bucket(values: np.ndarray) -> np.ndarray:
+    """Log-linear sketch bucket of each value, in value order"""
+    mantissa, exponent = np.frexp(values)
+    with np.errstate(invalid='ignore'):  # NaN rows get a bucket their caller masks out
+        sub = ((mantissa - 0.5) * (2 * SUB_BUCKETS)).astype(np.int64)
+    buckets = (exponent.astype(np.int64) - MIN_EXPONENT) * SUB_BUCKETS + sub + 1
+    buckets = np.where(exponent < MIN_EXPONENT, 1, buckets)
+    buckets = np.where(exponent > MAX_EXPONENT, N_SKETCH_BUCKETS - 1, buckets)
+    return np.where(values > 0, buckets, 0)
+
+def sketch_value(buckets: np.ndarray) -> np.ndarray:
+    """Midpoint of the values falling into each sketch bucket"""
+    buckets = np.asarray(buckets, dtype=np.int64)
+    exponent = (buckets - 1) // SUB_BUCKETS + MIN_EXPONENT
+    sub = (buckets - 1) % SUB_BUCKETS
+    values = np.ldexp(0.5 + (sub + 0.5) / (2 * SUB_BUCKETS), exponent)
+    return np.where(buckets > 0, values, 0.0)
+
+class FeatureDriftMonitor:
+    """PSI and KS distance of each endpoint's live input features from a reference
+
+    The first reference_size samples of an endpoint fill its reference: a
+    fixed-size log-linear quantile sketch per numeric feature and exact
+    counts for hour and day_of_week. Once full, the sketch's quantiles
+    become n_bins bin edges, and live samples are counted into those bins
+    in two panes of live_size / 2 samples, the older pane being cleared as
+    the newer one fills. Sketches and counts are plain arrays, so
+    monitors merge by adding them. Only samples newer than the last one
+    seen per endpoint are counted, so overlapping windows can be fed
+    again, and the distances are recomputed for the endpoints a call
+    touched only. Hour and day of week are scored only while the live
+    window spans a whole day or week, a shorter one would always differ.
+
+    Sampling noise alone gives a PSI of about (bins - 1) * (1 / live +
+    1 / reference), which is subtracted before comparing to a threshold.
+    min_live keeps what is left of the noise small: at 30 live samples
+    the expected PSI of 10 bins is already 0.3.
+
+    Reference sketches take about 8 KB per endpoint, so they are grown
+    with the endpoints registered instead of allocated for max_endpoints.
+    """
+
+    def __init__(self,
+                 max_endpoints: int,
+                 reference_size: int = 2016,  # A week of 5-minute samples
+                 live_size: int = 576,  # Two days of 5-minute samples
+                 n_bins: int = 10,  # Reference quantile bins per numeric feature
+                 min_live: int = 200):  # Live samples before an endpoint is scored
+        if live_size < 2:
+            raise ValueError("live_size must be at least 2")
+        if n_bins < 2 or n_bins > N_SKETCH_BUCKETS:
+            raise ValueError(f"n_bins must be between 2 and {N_SKETCH_BUCKETS}")
+        self.max_endpoints = max_endpoints
+        self.reference_size = reference_size
+        self.live_size = live_size
+        self.n_bins = n_bins
+        self.min_live = min_live
+        self._codes: Dict[str, int] = {}
+        self.endpoints: List[str] = []
+        self._lock = threading.RLock()
+
+        n, f = max_endpoints, len(NUMERIC_FEATURES)
+        self.last_seen = np.full(n, np.iinfo(np.int64).min)  # Microseconds since the epoch
+        self.reference_count = np.zeros(n, dtype=np.int64)
+        self.reference_sketch = np.zeros((0, f, N_SKETCH_BUCKETS), dtype=np.uint32)  # Grown by register
+        self.edges = np.zeros((n, f, n_bins - 1), dtype=np.int64)  # Sketch buckets ending each bin
+        self.reference_bins = np.zeros((n, f, n_bins), dtype=np.int64)
+        self.reference_categories = {
+            name: np.zeros((n, size), dtype=np.int64) for name, size in CATEGORICAL_FEATURES.items()
+        }
+        self.live_bins = np.zeros((2, n, f, n_bins), dtype=np.int32)
+        self.live_categories = {
+            name: np.zeros((2, n, size), dtype=np.int32) for name, size in CATEGORICAL_FEATURES.items()
+        }
+        self.pane = np.zeros(n, dtype=np.int64)  # Pane filling now
+        self.pane_count = np.zeros(n, dtype=np.int64)
+        self.pane_start = np.full((2, n), np.iinfo(np.int64).max)  # First timestamp in each pane
+        # Per endpoint and feature in FEATURES order, NaN until scored.
+        # Updates only mark endpoints stale, they are scored when read.
+        self.psi = np.full((n, len(FEATURES)), np.nan)
+        self.ks = np.full((n, len(FEATURES)), np.nan)
+        self.psi_floor = np.full((n, len(FEATURES)), np.nan)  # Expected PSI without drift
+        self.stale = np.zeros(n, dtype=bool)
+        self.flagged = np.zeros((n, len(FEATURES)), dtype=bool)  # Drifted as of the last drifted()
+
+    def register(self, endpoint: str) -> int:
+        code = self._codes.get(endpoint)
+        if code is not None:
+            return code
+        with self._lock:
+            code = self._codes.get(endpoint)
+            if code is not None:
+                return code
+            if len(self.endpoints) >= self.max_endpoints:
+                raise ValueError(f"Feature drift monitor is full ({self.max_endpoints} endpoints)")
+            code = len(self.endpoints)
+            if code >= len(self.reference_sketch):
+                size = min(max(2 * code, 64), self.max_endpoints)
+                grown = np.zeros((size,) + self.reference_sketch.shape[1:], dtype=np.uint32)
+                grown[:code] = self.reference_sketch[:code]
+                self.reference_sketch = grown
+            self._codes[endpoint] = code
+            self.endpoints.append(endpoint)
+        return code
+
+    def update(self, features: pd.DataFrame):
+        """Count new rows of a create_feature_vector frame"""
+        endpoint_codes, uniques = pd.factorize(features['endpoint'])
+        mapping = np.array([self.register(e) for e in uniques], dtype=np.int64)
+        codes = mapping[endpoint_codes]
+        timestamps = features['timestamp'].to_numpy().astype('datetime64[us]').view(np.int64)
+        # Overlapping windows repeat most rows, drop them before copying columns.
+        # last_seen only grows, so _update would drop them under the lock too.
+        new = np.flatnonzero(timestamps > self.last_seen[codes])
+        if len(new) == 0:
+            return
+        self._update(
+            codes[new], timestamps[new],
+            np.column_stack([features[name].to_numpy(dtype=np.float64)[new] for name in NUMERIC_FEATURES]),
+            features['hour'].to_numpy()[new], features['day_of_week'].to_numpy()[new]
+        )
+
+    def update_batch(self, batch: MetricBatch):
+        """Count new rows of a raw batch, deriving the same features"""
+        if len(batch) == 0:
+            return
+        mapping = np.array([self.register(e) for e in batch.endpoints], dtype=np.int64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            error_rate = batch.error_count / batch.request_count
+        timestamps = batch.timestamp.astype('datetime64[us]').view(np.int64)
+        seconds = timestamps // 1_000_000
+        self._update(
+            mapping[batch.endpoint_code], timestamps,
+            np.column_stack([
+                batch.latency_ms, batch.cpu_usage, batch.memory_usage, batch.request_count, error_rate
+            ]).astype(np.float64),
+            (seconds // 3600) % 24,
+            (seconds // 86400 + 3) % 7  # 1970-01-01 was a Thursday
+        )
+
+    def _update(self, codes: np.ndarray, timestamps: np.ndarray, values: np.ndarray,
+                hour: np.ndarray, day_of_week: np.ndarray):
+        with self._lock:
+            new = timestamps > self.last_seen[codes]
+            if not new.any():
+                return
+            codes, timestamps, values = codes[new], timestamps[new], values[new]
+            categories = {'hour': hour[new].astype(np.int64), 'day_of_week': day_of_week[new].astype(np.int64)}
+            np.maximum.at(self.last_seen, codes, timestamps)
+
+            to_reference = self.reference_count[codes] + _ranks(codes) < self.reference_size
+
+            buckets = sketch_bucket(values)
+            valid = np.isfinite(values)
+            if to_reference.any():
+                self._add_reference(codes[to_reference], buckets[to_reference], valid[to_reference],
+                                    {name: c[to_reference] for name, c in categories.items()})
+            live = ~to_reference
+            if live.any():
+                self._add_live(codes[live], timestamps[live], buckets[live], valid[live],
+                               {name: c[live] for name, c in categories.items()})
+
+    def _add_reference(self, codes: np.ndarray, buckets: np.ndarray, valid: np.ndarray,
+                       categories: Dict[str, np.ndarray]):
+        n_features = len(NUMERIC_FEATURES)
+        flat = (codes[:, None] * n_features + np.arange(n_features)) * N_SKETCH_BUCKETS + buckets
+        np.add.at(self.reference_sketch.reshape(-1), flat[valid], 1)
+        for name, values in categories.items():
+            np.add.at(self.reference_categories[name], (codes, values), 1)
+        before = self.reference_count.copy()
+        np.add.at(self.reference_count, codes, 1)
+        filled = np.flatnonzero((before < self.reference_size) & (self.reference_count >= self.reference_size))
+        if len(filled):
+            self._freeze(filled)
+
+    def _freeze(self, codes: np.ndarray):
+        """Turn full reference sketches into quantile bin edges"""
+        for f in range(len(NUMERIC_FEATURES)):
+            sketch = self.reference_sketch[codes, f].astype(np.int64)
+            cumulative = np.cumsum(sketch, axis=1)
+            ranks = cumulative[:, -1:] * np.arange(1, self.n_bins) / self.n_bins
+            edges = (cumulative[:, :, None] < ranks[:, None, :]).sum(axis=1)
+            self.edges[codes, f] = edges
+            # A bucket falls into the bin of the edges below it, like live values
+            bins = (np.arange(N_SKETCH_BUCKETS)[None, :, None] > edges[:, None, :]).sum(axis=2)
+            reference = np.zeros((len(codes), self.n_bins), dtype=np.int64)
+            np.add.at(reference, (np.repeat(np.arange(len(codes)), N_SKETCH_BUCKETS), bins.ravel()),
+                      sketch.ravel())
+            self.reference_bins[codes, f] = reference
+
+    def _add_live(self, codes: np.ndarray, timestamps: np.ndarray, buckets: np.ndarray,
+                  valid: np.ndarray, categories: Dict[str, np.ndarray]):
+        # Rows fill the current pane up to half the window, then the other
+        # one, which starts over each time it is turned to
+        half = max(self.live_size // 2, 1)
+        turns = (self.pane_count[codes] + _ranks(codes)) // half
+        last_turn = np.zeros(self.max_endpoints, dtype=np.int64)
+        np.maximum.at(last_turn, codes, turns)
+        touched = np.unique(codes)
+        turned = touched[last_turn[touched] >= 1]
+        self._clear(turned, self.pane[turned] ^ (last_turn[turned] % 2))
+        # After two turns the other pane holds rows of this call only
+        twice = touched[last_turn[touched] >= 2]
+        self._clear(twice, self.pane[twice] ^ ((last_turn[twice] - 1) % 2))
+
+        np.add.at(self.pane_count, codes, 1)
+        self.pane_count[touched] -= last_turn[touched] * half
+        kept = turns >= last_turn[codes] - 1
+        panes = (self.pane[codes] ^ (turns % 2))[kept]
+        self.pane[touched] ^= last_turn[touched] % 2
+        codes, timestamps, buckets, valid = codes[kept], timestamps[kept], buckets[kept], valid[kept]
+        categories = {name: values[kept] for name, values in categories.items()}
+        np.minimum.at(self.pane_start, (panes, codes), timestamps)
+        for f in range(len(NUMERIC_FEATURES)):
+            rows = valid[:, f]
+            bins = (buckets[rows, f, None] > self.edges[codes[rows], f]).sum(axis=1)
+            np.add.at(self.live_bins, (panes[rows], codes[rows], f, bins), 1)
+        for name, values in categories.items():
+            np.add.at(self.live_categories[name], (panes, codes, values), 1)
+        self.stale[touched] = True
+
+    def _clear(self, codes: np.ndarray, panes: np.ndarray):
+        self.live_bins[panes, codes] = 0
+        for counts in self.live_categories.values():
+            counts[panes, codes] = 0
+        self.pane_start[panes, codes] = np.iinfo(np.int64).max
+
+    def _score(self):
+        """Recompute PSI and KS of the stale endpoints from their bin counts"""
+        codes = np.flatnonzero(self.stale)
+        if len(codes) == 0:
+            return
+        self.stale[codes] = False
+        live_numeric = self.live_bins[:, codes].sum(axis=0)
+        distances = [_distances(live_numeric, self.reference_bins[codes])]
+        for name in CATEGORICAL_FEATURES:
+            live = self.live_categories[name][:, codes].sum(axis=0)
+            distances.append(_distances(live[:, None], self.reference_categories[name][codes][:, None]))
+        psi, ks, floor = (np.concatenate([d[i] for d in distances], axis=1) for i in range(3))
+        count = self.live_categories['hour'][:, codes].sum(axis=(0, 2))
+        scored = np.repeat((count >= self.min_live)[:, None], len(FEATURES), axis=1)
+        # Spacing between samples is added, a day of them spans a day less one interval
+        span = (self.last_seen[codes] - self.pane_start[:, codes].min(axis=0)) * count / np.maximum(count - 1, 1)
+        for f, name in enumerate(CATEGORICAL_FEATURES, start=len(NUMERIC_FEATURES)):
+            scored[:, f] &= span >= CATEGORICAL_PERIODS[name]
+        self.psi[codes] = np.where(scored, psi, np.nan)
+        self.ks[codes] = np.where(scored, ks, np.nan)
+        self.psi_floor[codes] = np.where(scored, floor, np.nan)
+
+    def drifted(self, psi_threshold: float = 0.25) -> Dict[str, List[str]]:
+        """Features per endpoint whose PSI, less its noise floor, went above the threshold
+
+        Only features that crossed it since the last call are returned, a
+        feature still drifting is not reported again until it recovers.
+        """
+        with self._lock:
+            self._score()
+            n = len(self.endpoints)
+            flagged = self.psi[:n] - self.psi_floor[:n] > psi_threshold
+            new = flagged & ~self.flagged[:n]
+            self.flagged[:n] = flagged
+        return {
+            self.endpoints[code]: [FEATURES[f] for f in np.flatnonzero(new[code])]
+            for code in np.flatnonzero(new.any(axis=1))
+        }
+
+    def report(self, endpoint: str) -> Optional[Dict[str, Dict[str, float]]]:
+        """PSI, its noise floor and KS per feature of one endpoint, None until it is scored"""
+        code = self._codes.get(endpoint)
+        if code is None:
+            return None
+        with self._lock:
+            self._score()
+            if np.isnan(self.psi[code, 0]):
+                return None
+            return {
+                name: {
+                    'psi': float(self.psi[code, f]),
+                    'psi_floor': float(self.psi_floor[code, f]),
+                    'ks': float(self.ks[code, f])
+                }
+                for f, name in enumerate(FEATURES)
+            }
+
+    def merge(self, other: 'FeatureDriftMonitor'):
+        """Add another monitor's sketches and counts for the endpoints both know
+
+        Live counts are only comparable over the same bin edges, so they are
+        added where both references were full with the same edges.
+        """
+        if other.n_bins != self.n_bins:
+            raise ValueError("Cannot merge monitors with different n_bins")
+        with self._lock:
+            theirs = np.array([other._codes[e] for e in other.endpoints], dtype=np.int64)
+            ours = np.array([self.register(e) for e in other.endpoints], dtype=np.int64)
+            if len(ours) == 0:
+                return
+            filling = self.reference_count[ours] < self.reference_size
+            self.reference_sketch[ours] += other.reference_sketch[theirs]
+            for name, counts in self.reference_categories.items():
+                counts[ours] += other.reference_categories[name][theirs]
+            before = self.reference_count[ours].copy()
+            self.reference_count[ours] += other.reference_count[theirs]
+            self.last_seen[ours] = np.maximum(self.last_seen[ours], other.last_seen[theirs])
+            filled = ours[filling & (self.reference_count[ours] >= self.reference_size)]
+            if len(filled):
+                self._freeze(filled)
+            same = (before >= self.reference_size) & (other.reference_count[theirs] >= other.reference_size) \
+                & (self.edges[ours] == other.edges[theirs]).all(axis=(1, 2))
+            same_ours, same_theirs = ours[same], theirs[same]
+            live = other.live_bins[:, same_theirs].sum(axis=0)
+            self.live_bins[self.pane[same_ours], same_ours] += live
+            self.pane_start[self.pane[same_ours], same_ours] = np.minimum(
+                self.pane_start[self.pane[same_ours], same_ours], other.pane_start[:, same_theirs].min(axis=0)
+            )
+            np.add.at(self.pane_count, same_ours, other.pane_count[same_theirs])
+            for name, counts in self.live_categories.items():
+                counts[self.pane[same_ours], same_ours] += other.live_categories[name][:, same_theirs].sum(axis=0)
+            self.stale[same_ours] = True
+
+def _ranks(codes: np.ndarray) -> np.ndarray:
+    """Position of each row among the earlier rows with the same code"""
+    n = len(codes)
+    order = np.argsort(codes, kind='stable')
+    sorted_codes = codes[order]
+    starts = np.r_[True, sorted_codes[1:] != sorted_codes[:-1]]
+    first = np.maximum.accumulate(np.where(starts, np.arange(n), 0))
+    ranks = np.empty(n, dtype=np.int64)
+    ranks[order] = np.arange(n) - first
+    return ranks
+
+def _distances(live: np.ndarray, reference: np.ndarray):
+    """PSI, its expected value without drift and KS over the last axis of bin counts"""
+    live_total = np.maximum(live.sum(axis=-1, keepdims=True), 1)
+    reference_total = np.maximum(reference.sum(axis=-1, keepdims=True), 1)
+    p, q = live / live_total, reference / reference_total
+    ks = np.abs(np.cumsum(p - q, axis=-1)).max(axis=-1)
+    # PSI of two samples of one distribution is about chi-squared, with
+    # a degree of freedom per bin either of them reaches, less one
+    bins = ((live > 0) | (reference > 0)).sum(axis=-1)
+    floor = np.maximum(bins - 1, 0) * (1 / live_total + 1 / reference_total)[..., 0]
+    p, q = np.maximum(p, PSI_EPSILON), np.maximum(q, PSI_EPSILON)
+    psi = ((p - q) * np.log(p / q)).sum(axis=-1)
+    return psi, ks, floor
@@ -0,0 +1,154 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Union
+import numpy as np
+import pandas as pd
+from ..domain.models import MetricBatch, PredictionBatch, PredictionResult
+
+@dataclass(frozen=True)
+class JoinReport:
+    """Errors of the predictions one batch of actuals resolved"""
+    matched: int
+    expired: int  # Evicted without ever meeting their actual
+    pending: int  # Still waiting after this join
+    mape: float  # Fleet-wide over the matched pairs, NaN if none
+    endpoint_mapes: Dict[str, float] = field(default_factory=dict)
+
+class PendingPredictions:
+    """Predictions held until the actual at their target time arrives
+
+    Each prediction is keyed by (endpoint, target timestamp) with a
+    tolerance, and matches the first actual of its endpoint within
+    target +- tolerance. Joins run in bulk over columnar arrays. A
+    prediction is evicted once a later actual of its endpoint has passed
+    its window, or once the data clock is ttl past its target.
+    """
+
+    def __init__(self,
+                 ttl: float = 3600.0,  # Seconds past the target a prediction is kept
+                 max_pending: int = 1_000_000):  # Oldest are dropped beyond this
+        self.ttl = np.timedelta64(int(ttl * 1e6), 'us')
+        self.max_pending = max_pending
+        self._codes: Dict[str, int] = {}
+        self._endpoints: List[str] = []
+        self._columns = self._empty()
+        self._added: List[Dict[str, np.ndarray]] = []
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return len(self._columns['code']) + sum(len(chunk['code']) for chunk in self._added)
+
+    @staticmethod
+    def _empty() -> Dict[str, np.ndarray]:
+        return {
+            'code': np.empty(0, dtype=np.int64),
+            'target': np.empty(0, dtype='datetime64[us]'),
+            'tolerance': np.empty(0, dtype='timedelta64[us]'),
+            'predicted': np.empty(0, dtype=np.float64)
+        }
+
+    def _code(self, endpoint: str) -> int:
+        code = self._codes.get(endpoint)
+        if code is None:
+            code = self._codes[endpoint] = len(self._endpoints)
+            self._endpoints.append(endpoint)
+        return code
+
+    def add(self,
+            predictions: Union[List[PredictionResult], PredictionBatch],
+            horizons: np.ndarray,  # Seconds from each prediction's timestamp to its target
+            tolerances: np.ndarray):  # Seconds an actual may be off the target
+        if len(predictions) == 0:
+            return
+        if isinstance(predictions, PredictionBatch):
+            mapping = np.array([self._code(e) for e in predictions.endpoints], dtype=np.int64)
+            codes = mapping[predictions.endpoint_code]
+            timestamps = predictions.timestamp
+            predicted = predictions.predicted_latency.copy()
+        else:
+            codes = np.array([self._code(p.endpoint) for p in predictions], dtype=np.int64)
+            # pandas converts datetimes several times faster than np.array
+            timestamps = pd.to_datetime([p.timestamp for p in predictions]).to_numpy().astype('datetime64[us]')
+            predicted = np.array([p.predicted_latency for p in predictions], dtype=np.float64)
+        self._added.append({
+            'code': codes,
+            'target': timestamps + (np.asarray(horizons) * 1e6).astype('timedelta64[us]'),
+            'tolerance': (np.asarray(tolerances) * 1e6).astype('timedelta64[us]'),
+            'predicted': predicted
+        })
+
+    def _consolidate(self) -> Dict[str, np.ndarray]:
+        if self._added:
+            chunks = [self._columns] + self._added
+            self._columns = {
+                name: np.concatenate([chunk[name] for chunk in chunks]) for name in self._columns
+            }
+            self._added = []
+            excess = len(self._columns['code']) - self.max_pending
+            if excess > 0:
+                self.dropped += excess
+                self._columns = {name: column[excess:] for name, column in self._columns.items()}
+        return self._columns
+
+    def join(self, actuals: MetricBatch) -> JoinReport:
+        """Match pending predictions against a batch of actuals and evict stale ones"""
+        pending = self._consolidate()
+        n = len(pending['code'])
+        if n == 0 or len(actuals) == 0:
+            return JoinReport(0, 0, n, float('nan'))
+
+        lower = pending['target'] - pending['tolerance']
+        upper = pending['target'] + pending['tolerance']
+        # Actual endpoints in this index's codes, -1 for ones never predicted.
+        # Rows before every window can neither match nor evict anything
+        mapping = np.array([self._codes.get(e, -1) for e in actuals.endpoints], dtype=np.int64)
+        codes = mapping[actuals.endpoint_code]
+        timestamps = actuals.timestamp.astype('datetime64[us]')
+        usable = np.flatnonzero((codes >= 0) & (timestamps >= lower.min()))
+        codes, timestamps = codes[usable], timestamps[usable]
+        order = np.argsort(timestamps, kind='stable')
+        right = pd.DataFrame({
+            'code': codes[order],
+            'actual_time': timestamps[order],
+            'actual': actuals.latency_ms[usable][order]
+        })
+        order = np.argsort(lower, kind='stable')
+        left = pd.DataFrame({'code': pending['code'][order], 'lower': lower[order], 'row': order})
+        joined = pd.merge_asof(
+            left, right, left_on='lower', right_on='actual_time', by='code', direction='forward'
+        )
+        rows = joined['row'].to_numpy()
+        actual_time = joined['actual_time'].to_numpy().astype('datetime64[us]')
+        hit = ~np.isnat(actual_time) & (actual_time <= upper[rows])
+        matched_rows = rows[hit]
+        actual = joined['actual'].to_numpy()[hit]
+
+        # Actuals per endpoint arrive in time order, so a window a later actual
+        # has passed can no longer match; the ttl covers endpoints gone quiet
+        newest = np.full(len(self._endpoints), np.iinfo(np.int64).min)
+        np.maximum.at(newest, codes, timestamps.view(np.int64))
+        passed = newest[pending['code']] > upper.view(np.int64)
+        stale = (pending['target'] + self.ttl) < actuals.timestamp.max()
+        keep = ~(passed | stale)
+        keep[matched_rows] = False
+        expired = int(n - len(matched_rows) - keep.sum())
+        self._columns = {name: column[keep] for name, column in pending.items()}
+
+        if len(matched_rows) == 0:
+            return JoinReport(0, expired, int(keep.sum()), float('nan'))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            errors = np.abs((pending['predicted'][matched_rows] - actual) / actual) * 100
+        valid = np.isfinite(errors)
+        matched_codes = pending['code'][matched_rows][valid]
+        errors = errors[valid]
+        sums = np.bincount(matched_codes, weights=errors, minlength=len(self._endpoints))
+        counts = np.bincount(matched_codes, minlength=len(self._endpoints))
+        endpoint_mapes = {
+            self._endpoints[code]: float(sums[code] / counts[code]) for code in np.flatnonzero(counts)
+        }
+        return JoinReport(
+            matched=int(len(matched_rows)),
+            expired=expired,
+            pending=int(keep.sum()),
+            mape=float(errors.mean()) if len(errors) else float('nan'),
+            endpoint_mapes=endpoint_mapes
+        )
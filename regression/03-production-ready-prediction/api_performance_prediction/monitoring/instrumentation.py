@@ -0,0 +1,185 @@
+import logging
+import time
+from typing import Callable, Dict, List, Optional
+import numpy as np
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+SUB_BUCKET_BITS = 7  # 64 linear sub-buckets per power of two, under 1% relative error
+HALF = 1 << (SUB_BUCKET_BITS - 1)
+N_BUCKETS = (64 - SUB_BUCKET_BITS + 2) * HALF
+
+def bucket_index(value: int) -> int:
+    """HDR-style log-linear bucket of a non-negative integer"""
+    shift = value.bit_length() - SUB_BUCKET_BITS
+    if shift <= 0:
+        return value
+    return shift * HALF + (value >> shift)
+
+def bucket_value(index: int) -> float:
+    """Midpoint of the values falling into a bucket"""
+    if index < 2 * HALF:
+        return float(index)
+    shift = index // HALF - 1
+    return float(((index - shift * HALF) << shift) + (1 << shift) / 2)
+
+class LatencyHistogram:
+    """Fixed-size HDR-style histogram of durations in nanoseconds
+
+    Buckets are linear within each power of two, so relative precision
+    is the same from microseconds to minutes and recording is one index
+    computation and one increment.
+    """
+
+    def __init__(self):
+        self._counts = [0] * N_BUCKETS
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def record_ns(self, duration_ns: int):
+        duration_ns = max(duration_ns, 0)
+        self._counts[bucket_index(duration_ns)] += 1
+        self.count += 1
+        self.total_ns += duration_ns
+        if duration_ns > self.max_ns:
+            self.max_ns = duration_ns
+
+    def merge(self, other: 'LatencyHistogram'):
+        self._counts = [a + b for a, b in zip(self._counts, other._counts)]
+        self.count += other.count
+        self.total_ns += other.total_ns
+        self.max_ns = max(self.max_ns, other.max_ns)
+
+    def percentiles(self, quantiles: List[float]) -> List[float]:
+        """Durations in seconds at the given quantiles, 0 when empty"""
+        if self.count == 0:
+            return [0.0] * len(quantiles)
+        cumulative = np.cumsum(self._counts)
+        ranks = np.ceil(np.asarray(quantiles) * self.count).clip(1, self.count)
+        indices = np.searchsorted(cumulative, ranks)
+        return [min(bucket_value(int(i)), self.max_ns) / 1e9 for i in indices]
+
+class StageStats:
+    """Spans, items and latency of one pipeline stage"""
+
+    def __init__(self):
+        self.histogram = LatencyHistogram()
+        self.items = 0
+
+    def record_ns(self, duration_ns: int, items: int = 1):
+        self.histogram.record_ns(duration_ns)
+        self.items += items
+
+    def summary(self, elapsed: float) -> Dict[str, float]:
+        histogram = self.histogram
+        p50, p99, p999 = histogram.percentiles([0.5, 0.99, 0.999])
+        return {
+            'spans': histogram.count,
+            'items': self.items,
+            'items_per_second': self.items / elapsed if elapsed > 0 else 0.0,
+            'mean': histogram.total_ns / histogram.count / 1e9 if histogram.count else 0.0,
+            'p50': p50,
+            'p99': p99,
+            'p999': p999,
+            'max': histogram.max_ns / 1e9
+        }
+
+class Span:
+    """Times a block on the monotonic clock into a stage"""
+    __slots__ = ('_stats', '_start', 'items')
+
+    def __init__(self, stats: StageStats, items: int = 1):
+        self._stats = stats
+        self.items = items  # Can be set inside the block once known
+
+    def __enter__(self) -> 'Span':
+        self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stats.record_ns(time.perf_counter_ns() - self._start, self.items)
+        return False
+
+class Instrumentation:
+    """Per-stage latency histograms and per-endpoint counters
+
+    Stages and counters are created on first use. Spans are recorded on
+    the event loop; work done in executors is timed there and recorded
+    once back on the loop. Components take an Optional[Instrumentation]
+    and skip all of this when it is None.
+    """
+
+    def __init__(self, max_endpoints: int):
+        self.max_endpoints = max_endpoints
+        self.stages: Dict[str, StageStats] = {}
+        self.counters: Dict[str, np.ndarray] = {}
+        self.started = time.monotonic()
+
+    def stage(self, name: str) -> StageStats:
+        stats = self.stages.get(name)
+        if stats is None:
+            stats = self.stages[name] = StageStats()
+        return stats
+
+    def span(self, name: str, items: int = 1) -> Span:
+        return Span(self.stage(name), items)
+
+    def record(self, name: str, seconds: float, items: int = 1):
+        """Add a duration measured elsewhere"""
+        self.stage(name).record_ns(int(seconds * 1e9), items)
+
+    def count(self, name: str, codes: np.ndarray):
+        """Add one per occurrence of each endpoint code"""
+        counter = self.counters.get(name)
+        if counter is None:
+            counter = self.counters[name] = np.zeros(self.max_endpoints, dtype=np.int64)
+        np.add.at(counter, codes, 1)
+
+    def snapshot(self, endpoints: Optional[List[str]] = None) -> dict:
+        """Stage summaries and counters, per endpoint when names are given"""
+        elapsed = time.monotonic() - self.started
+        counters = {}
+        for name, counter in self.counters.items():
+            if endpoints is None:
+                counters[name] = int(counter.sum())
+            else:
+                counters[name] = {
+                    endpoints[code]: int(counter[code])
+                    for code in np.flatnonzero(counter[:len(endpoints)])
+                }
+        return {
+            'uptime': elapsed,
+            'stages': {name: stats.summary(elapsed) for name, stats in self.stages.items()},
+            'counters': counters
+        }
+
+class InstrumentationServer:
+    """Serves a snapshot as JSON on GET /internal/metrics"""
+
+    def __init__(self,
+                 snapshot: Callable[[], dict],
+                 host: str = '127.0.0.1',  # Local only by default
+                 port: int = 9092):
+        self.snapshot = snapshot
+        self.host = host
+        self.port = port
+        self.app = web.Application()
+        self.app.router.add_get('/internal/metrics', self._handle_metrics)
+        self._runner: Optional[web.AppRunner] = None
+
+    async def start(self):
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        logger.info("Serving internal metrics on %s:%d", self.host, self.port)
+
+    async def stop(self):
+        if self._runner is not None:
+            runner, self._runner = self._runner, None
+            await runner.cleanup()
+
+    async def _handle_metrics(self, request: web.Request) -> web.Response:
+        return web.json_response(self.snapshot())
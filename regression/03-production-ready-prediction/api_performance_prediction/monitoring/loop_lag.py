@@ -0,0 +1,56 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Dict, Optional
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes a periodic timer
+
+    Lag is the time a sleep overshoots its interval, i.e. how long ready
+    callbacks such as scrape timers waited behind whatever held the loop.
+    """
+
+    def __init__(self,
+                 interval: float = 0.05,  # Seconds between probes
+                 history: int = 1200,  # Probes kept for the percentiles
+                 warn_threshold: Optional[float] = 0.5):  # Log lags longer than this
+        self.interval = interval
+        self.warn_threshold = warn_threshold
+        self._lags: deque = deque(maxlen=history)
+        self.max_lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._probe())
+
+    async def stop(self):
+        if self._task is not None:
+            task, self._task = self._task, None
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def _probe(self):
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(self.interval)
+            self.record(time.monotonic() - start - self.interval)
+
+    def record(self, lag: float):
+        lag = max(lag, 0.0)
+        self._lags.append(lag)
+        self.max_lag = max(self.max_lag, lag)
+        if self.warn_threshold is not None and lag > self.warn_threshold:
+            logger.warning("Event loop blocked for %.3fs", lag)
+
+    def summary(self) -> Dict[str, float]:
+        """Lag percentiles over the kept probes and the maximum seen, in seconds"""
+        if not self._lags:
+            return {'samples': 0, 'p50': 0.0, 'p99': 0.0, 'max': self.max_lag}
+        lags = np.fromiter(self._lags, dtype=np.float64)
+        p50, p99 = np.percentile(lags, [50, 99])
+        return {'samples': len(lags), 'p50': float(p50), 'p99': float(p99), 'max': self.max_lag}
@@ -1,8 +1,12 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
 import numpy as np
-from typing import List, Optional
-from ..domain.models import PredictionResult, APIMetric
+from typing import Callable, Dict, List, Optional, Union
+from ..domain.models import MetricBatch, PredictionBatch, PredictionResult, APIMetric
+from .detectors import ChangeDetector, detector_factory
+from .feature_drift import FeatureDriftMonitor
+from .ground_truth import PendingPredictions
+from .statistics import MapeHistory
 
 @dataclass
 class MonitoringMetrics:
@@ -12,6 +16,10 @@ class MonitoringMetrics:
     prediction_count: int
     drift_detected: bool
     alerts_triggered: List[str]
+    endpoint_mapes: Dict[str, float] = field(default_factory=dict)
+    expired_count: int = 0  # Predictions evicted without ground truth
+    changed_endpoints: List[str] = field(default_factory=list)  # Flagged by their detectors
+    drifted_features: Dict[str, List[str]] = field(default_factory=dict)  # Input features newly past the PSI threshold
 
 class ModelMonitor:
     """Monitors model performance and triggers alerts"""
@@ -19,11 +27,21 @@ class ModelMonitor:
     def __init__(self, 
                  mape_threshold: float = 15.0,  # 15% error threshold
                  drift_threshold: float = 2.0,   # 2 std deviations
-                 window_size: int = 100):
+                 window_size: int = 100,
+                 baseline_half_life: Optional[float] = None,  # Evaluations, None weighs all alike
+                 ground_truth_ttl: float = 3600.0,  # Seconds a prediction waits for its actual
+                 detector: Union[str, Callable[[], ChangeDetector], None] = None,  # Per-endpoint change detection
+                 feature_drift: Optional[FeatureDriftMonitor] = None,  # Input drift, ahead of ground truth
+                 psi_threshold: float = 0.25):
         self.mape_threshold = mape_threshold
         self.drift_threshold = drift_threshold
         self.window_size = window_size
-        self.historical_mapes: List[float] = []
+        self.historical_mapes = MapeHistory(window_size, baseline_half_life)
+        self.pending = PendingPredictions(ttl=ground_truth_ttl)
+        self.detector_factory = detector_factory(detector) if detector is not None else None
+        self.detectors: Dict[str, ChangeDetector] = {}
+        self.feature_drift = feature_drift
+        self.psi_threshold = psi_threshold
         
     def evaluate_predictions(self, 
                            predictions: List[PredictionResult], 
@@ -48,6 +66,69 @@ class ModelMonitor:
             alerts_triggered=alerts
         )
     
+    def track(self,
+              predictions: Union[List[PredictionResult], PredictionBatch],
+              horizons: np.ndarray,  # Seconds from each prediction's timestamp to its target
+              tolerances: np.ndarray):  # Seconds an actual may be off the target
+        """Hold predictions until the actuals for their target times arrive"""
+        self.pending.add(predictions, horizons, tolerances)
+
+    def evaluate_actuals(self, actuals: MetricBatch) -> MonitoringMetrics:
+        """Join new actuals with the tracked predictions they resolve and check for drift
+
+        Only batches that resolve a prediction add to the MAPE history and
+        are checked for model drift, the others return a NaN MAPE and no
+        drift instead of repeating the last verdict. With a detector selected, each
+        endpoint's MAPE in the batch feeds its own detector and drift means
+        some endpoint changed, instead of the fleet-wide check. Input drift
+        in the actuals is alerted on but does not count as model drift.
+        """
+        report = self.pending.join(actuals)
+        if report.matched:
+            self.historical_mapes.append(report.mape)
+        changed = []
+        if not report.matched:
+            drift_detected = False
+        elif self.detector_factory is None:
+            drift_detected = self._check_drift()
+        else:
+            changed = self._detect_changes(report.endpoint_mapes)
+            drift_detected = bool(changed)
+        alerts = self._generate_alerts(report.mape, drift_detected)
+        if changed:
+            alerts.append(f"Prediction error increased on {len(changed)} endpoint(s): {', '.join(changed[:5])}")
+        drifted_features = {}
+        if self.feature_drift is not None:
+            self.feature_drift.update_batch(actuals)
+            drifted_features = self.feature_drift.drifted(self.psi_threshold)
+            if drifted_features:
+                alerts.append(
+                    f"Input features drifted on {len(drifted_features)} endpoint(s): "
+                    f"{', '.join(list(drifted_features)[:5])}"
+                )
+        return MonitoringMetrics(
+            timestamp=datetime.now(),
+            mape=report.mape,
+            prediction_count=report.matched,
+            drift_detected=drift_detected,
+            alerts_triggered=alerts,
+            endpoint_mapes=report.endpoint_mapes,
+            expired_count=report.expired,
+            changed_endpoints=changed,
+            drifted_features=drifted_features
+        )
+
+    def _detect_changes(self, endpoint_mapes: Dict[str, float]) -> List[str]:
+        """Endpoints whose detector reports a change with this batch's MAPE"""
+        changed = []
+        for endpoint, mape in endpoint_mapes.items():
+            detector = self.detectors.get(endpoint)
+            if detector is None:
+                detector = self.detectors[endpoint] = self.detector_factory()
+            if detector.update(mape):
+                changed.append(endpoint)
+        return changed
+    
     def _calculate_mape(self, 
                        predictions: List[PredictionResult], 
                        actuals: List[APIMetric]) -> float:
@@ -63,16 +144,13 @@ class ModelMonitor:
         return np.mean(errors) if errors else 0.0
     
     def _check_drift(self) -> bool:
-        """Check for model drift using recent MAPEs"""
-        if len(self.historical_mapes) < self.window_size:
+        """Check for model drift using recent MAPEs, in O(1)"""
+        history = self.historical_mapes
+        if len(history) < self.window_size or history.baseline.count == 0:
             return False
-            
-        recent_mapes = self.historical_mapes[-self.window_size:]
-        mean_mape = np.mean(recent_mapes)
-        baseline_mape = np.mean(self.historical_mapes[:-self.window_size])  # Fix: Use earlier data as baseline
-        std_mape = np.std(self.historical_mapes)
         
-        return mean_mape > (baseline_mape + self.drift_threshold * std_mape)  # Fix: Compare to baseline
+        # Recent window against the MAPEs before it, in units of the overall spread
+        return history.recent_mean > history.baseline.mean + self.drift_threshold * history.overall.std
 
     def _generate_alerts(self, 
                         current_mape: float, 
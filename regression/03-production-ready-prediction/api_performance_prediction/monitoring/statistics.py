@@ -0,0 +1,71 @@
+import math
+from typing import Iterator, Optional
+from ..domain.rolling import RollingMean
+
+class RunningStats:
+    """Welford mean and population variance in O(1) memory
+
+    With a half-life, every update first scales the weight of what came
+    before by 0.5 ** (1 / half_life), so an old regime fades instead of
+    anchoring the statistics forever.
+    """
+
+    def __init__(self, half_life: Optional[float] = None):  # Updates until a value weighs half
+        if half_life is not None and half_life <= 0:
+            raise ValueError("half_life must be positive")
+        self.decay = 1.0 if half_life is None else 0.5 ** (1 / half_life)
+        self.count = 0
+        self.weight = 0.0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def update(self, value: float):
+        self.count += 1
+        self.weight = self.weight * self.decay + 1.0
+        delta = value - self.mean
+        self.mean += delta / self.weight
+        self._m2 = self._m2 * self.decay + delta * (value - self.mean)
+
+    @property
+    def variance(self) -> float:
+        if self.weight == 0:
+            return math.nan
+        return max(self._m2 / self.weight, 0.0)
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+class MapeHistory:
+    """Constant-memory MAPE history for drift checks
+
+    The last window_size values sit in a RollingMean's ring, whose mean is
+    kept in O(1). Values pushed out of the ring feed the baseline statistics, and every
+    value feeds the overall ones. len() counts every value seen, iteration
+    yields the ring, oldest first.
+    """
+
+    def __init__(self, window_size: int, half_life: Optional[float] = None):
+        self.window_size = window_size
+        self.recent = RollingMean(window_size)
+        self.baseline = RunningStats(half_life)
+        self.overall = RunningStats(half_life)
+        self._count = 0
+
+    def append(self, mape: float):
+        evicted = self.recent.oldest
+        if evicted is not None:
+            self.baseline.update(evicted)
+        self.recent.update(mape)
+        self.overall.update(mape)
+        self._count += 1
+
+    @property
+    def recent_mean(self) -> float:
+        return self.recent.mean
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[float]:
+        return iter(self.recent)
@@ -1,14 +1,26 @@
 # api_performance_prediction/orchestrator.py
 import asyncio
-from typing import List
+import math
+import time
+from typing import List, Optional, Set
 import logging
-from datetime import datetime, timedelta
+import numpy as np
 
+from .collection.adaptive import AdaptiveIntervals
 from .collection.collector import MetricsCollector
+from .collection.events import SampleEvents
+from .collection.ingest import IngestServer
+from .collection.sharding import ShardedCollector
+from .collection.wal import MetricLog
 from .prediction.preprocessor import DataPreprocessor
 from .prediction.model import ModelServer
+from .prediction.offload import PredictionStage
+from .prediction.registry import ModelRegistry
+from .prediction.retraining import ModelRetrainer
+from .monitoring.feature_drift import FeatureDriftMonitor
+from .monitoring.instrumentation import Instrumentation, InstrumentationServer
+from .monitoring.loop_lag import LoopLagMonitor
 from .monitoring.monitor import ModelMonitor
-from .domain.models import APIMetric, PredictionResult
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -20,18 +32,76 @@ class PredictionSystem:
                  endpoints: List[str],
                  model_path: str = None,
                  collection_interval: int = 300,  # 5 minutes
-                 prediction_interval: int = 300):  # 5 minutes
-        self.collector = MetricsCollector(endpoints, collection_interval)
-        self.preprocessor = DataPreprocessor()
-        self.model_server = ModelServer(model_path)
-        self.monitor = ModelMonitor()
+                 prediction_interval: float = 0.0,  # Minimum seconds between prediction passes
+                 registry: Optional[ModelRegistry] = None,
+                 ingest_port: Optional[int] = None,  # Also accept pushed metrics on this port
+                 max_endpoints: Optional[int] = None,  # Room for endpoints that push
+                 wal_dir: Optional[str] = None,  # Keep history across restarts
+                 collection_workers: Optional[int] = None,  # Scrape from this many processes
+                 adaptive: Optional[AdaptiveIntervals] = None,  # Adapt intervals per endpoint
+                 coalesce_window: float = 0.05,  # Seconds new samples are gathered into one pass
+                 offload: str = 'thread',  # Where inference runs: 'inline', 'thread' or 'process'
+                 offload_workers: int = 1,
+                 max_inflight: int = 1,  # Prediction passes running at once
+                 instrumentation: bool = False,  # Time every stage, count per endpoint
+                 metrics_port: Optional[int] = None,  # Serve /internal/metrics locally, implies instrumentation
+                 drift_detector: Optional[str] = None,  # 'page_hinkley', 'cusum' or 'adwin' per endpoint
+                 feature_drift: bool = False):  # Track input feature distributions per endpoint
+        wal = MetricLog(wal_dir) if wal_dir is not None else None
+        if collection_workers is not None:
+            self.collector = ShardedCollector(
+                endpoints, collection_workers, collection_interval,
+                max_endpoints=max_endpoints, wal=wal, adaptive=adaptive
+            )
+        else:
+            self.collector = MetricsCollector(
+                endpoints, collection_interval, 
+                max_endpoints=max_endpoints, wal=wal, adaptive=adaptive
+            )
+        self.instrumentation = None
+        self.metrics_server = None
+        if instrumentation or metrics_port is not None:
+            self.instrumentation = Instrumentation(self.collector.store.max_endpoints)
+            self.collector.instrumentation = self.instrumentation
+        if metrics_port is not None:
+            self.metrics_server = InstrumentationServer(self.metrics, port=metrics_port)
+        self.ingest_server = None
+        if ingest_port is not None:
+            self.ingest_server = IngestServer(
+                self.collector.store, port=ingest_port, log=self.collector.wal
+            )
+        # The store hands out samples grouped per endpoint
+        self.preprocessor = DataPreprocessor(grouped=True)
+        self.model_server = ModelServer(model_path, registry=registry)
+        self.monitor = ModelMonitor(
+            detector=drift_detector,
+            feature_drift=FeatureDriftMonitor(self.collector.store.max_endpoints) if feature_drift else None
+        )
+        self.retrainer = ModelRetrainer(self.model_server, self.preprocessor, registry)
+        self.prediction_stage = PredictionStage(
+            self.preprocessor, self.model_server, offload, offload_workers, self.instrumentation
+        )
+        self.loop_lag = LoopLagMonitor()
+        self._retraining_task: Optional[asyncio.Task] = None
         self.prediction_interval = prediction_interval
+        self.coalesce_window = coalesce_window
+        self.sample_events = SampleEvents(self.collector.store.max_endpoints)
+        self.last_prediction_lag: Optional[float] = None  # Seconds from new samples to their predictions
+        self._inflight = asyncio.Semaphore(max_inflight)
+        self._passes: Set[asyncio.Task] = set()
         self._running = False
         
     async def start(self):
         """Start the prediction system"""
         self._running = True
         logger.info("Starting prediction system...")
+        self.loop_lag.start()
+        # Rebuild the rolling windows before anything new is collected
+        await asyncio.get_running_loop().run_in_executor(None, self.collector.restore)
+        if self.ingest_server is not None:
+            await self.ingest_server.start()
+        if self.metrics_server is not None:
+            await self.metrics_server.start()
         
         # Start collection and prediction loops
         await asyncio.gather(
@@ -43,46 +113,111 @@ class PredictionSystem:
         """Stop the prediction system"""
         self._running = False
         logger.info("Stopping prediction system...")
+        self.sample_events.close()
+        if self.ingest_server is not None:
+            await self.ingest_server.stop()
+        await self.collector.stop()
+        if self.metrics_server is not None:
+            await self.metrics_server.stop()
+        await self.loop_lag.stop()
+    
+    def metrics(self) -> dict:
+        """Stage latencies, per-endpoint counters and event loop lag"""
+        snapshot = {'loop_lag': self.loop_lag.summary()}
+        if self.instrumentation is not None:
+            snapshot.update(self.instrumentation.snapshot(self.collector.store.endpoints))
+        return snapshot
+    
+    async def deploy_model(self, version: Optional[str] = None) -> str:
+        """Swap in a registry version while the prediction loop keeps running"""
+        return await self.model_server.swap_version(version)
     
     async def _collection_loop(self):
         """Run the metrics collection loop"""
         await self.collector.start_collection()
     
     async def _prediction_loop(self):
-        """Run the prediction and monitoring loop"""
-        while self._running:
-            try:
-                # Get recent metrics
-                recent_metrics = self.collector._metrics_buffer[-24:]  # Last 2 hours
-                if not recent_metrics:
-                    logger.warning("No metrics available for prediction")
+        """Predict for endpoints as soon as they have new samples"""
+        store = self.collector.store
+        events = self.sample_events
+        store.subscribe(events.publish)
+        # Samples restored from the log count as new
+        held = [endpoint for endpoint in store.endpoints if store.count(endpoint)]
+        if held:
+            events.publish(store.codes(held))
+        last_pass = -math.inf
+        try:
+            while self._running and not events.closed:
+                await events.wait()
+                # Batches arriving close together share one pass
+                await asyncio.sleep(max(
+                    self.coalesce_window, last_pass + self.prediction_interval - time.monotonic()
+                ))
+                # With every slot busy, new samples keep coalescing until one frees up
+                await self._inflight.acquire()
+                codes, published = events.take()
+                if len(codes) == 0:
+                    self._inflight.release()
                     continue
-                
-                # Preprocess data
-                features = self.preprocessor.create_feature_vector(recent_metrics)
-                
-                # Generate predictions
-                predictions = self.model_server.predict(features)
-                
-                # Monitor predictions
-                monitoring_results = self.monitor.evaluate_predictions(
-                    predictions[-1:],  # Latest prediction
-                    recent_metrics[-1:]  # Latest actual
-                )
-                
-                # Log monitoring results
-                if monitoring_results.alerts_triggered:
-                    logger.warning("Alerts triggered: %s", 
-                                 monitoring_results.alerts_triggered)
-                
-                # Clear old metrics to prevent memory buildup
-                if len(self.collector._metrics_buffer) > 1000:  # Keep last ~3 days
-                    self.collector._metrics_buffer = self.collector._metrics_buffer[-1000:]
-                
-            except Exception as e:
-                logger.error("Error in prediction loop: %s", e)
+                last_pass = time.monotonic()
+                task = asyncio.create_task(self._predict_for(codes, published))
+                self._passes.add(task)
+                task.add_done_callback(self._passes.discard)
+            await asyncio.gather(*self._passes, return_exceptions=True)
+        finally:
+            store.unsubscribe(events.publish)
+            self.prediction_stage.shutdown()
+    
+    def _intervals(self, endpoints: List[str]) -> np.ndarray:
+        """Current collection interval of each endpoint, adapted ones included"""
+        collector = self.collector
+        current = {}
+        if collector.schedule is not None:
+            current = dict(zip(collector.schedule.endpoints, collector.schedule.intervals))
+        return np.array([
+            current.get(endpoint, collector.interval_for(endpoint)) for endpoint in endpoints
+        ], dtype=np.float64)
+    
+    async def _predict_for(self, codes: np.ndarray, published: float):
+        """Run one prediction and monitoring pass over the given endpoints"""
+        start = time.perf_counter_ns()
+        try:
+            store = self.collector.store
+            # A copy, so the stage can work on it while collection goes on
+            recent_metrics = store.recent(24, codes)  # Last 2 hours per endpoint
+            
+            # Preprocess data and predict on the newest row of each endpoint
+            predictions = await self.prediction_stage.predict(recent_metrics)
+            self.last_prediction_lag = time.monotonic() - published
+            if self.instrumentation is not None:
+                self.instrumentation.record('prediction_lag', self.last_prediction_lag, len(predictions))
+                self.instrumentation.count('predictions', codes)
+            if self.collector.adaptive is not None:
+                self.collector.adaptive.observe_predictions(predictions, store)
+            
+            # Score earlier predictions whose actuals are in, then track these
+            intervals = self._intervals(predictions.endpoint_names())
+            monitoring_results = await self.prediction_stage.evaluate(
+                self.monitor, predictions, recent_metrics,
+                self.retrainer.horizon * intervals, intervals / 2
+            )
             
-            await asyncio.sleep(self.prediction_interval)
+            # Log monitoring results
+            if monitoring_results.alerts_triggered:
+                logger.warning("Alerts triggered: %s", 
+                             monitoring_results.alerts_triggered)
+            
+            # Retrain in the background, the loop keeps predicting meanwhile
+            if monitoring_results.drift_detected and not self.retrainer.running:
+                self._retraining_task = asyncio.create_task(
+                    self.retrainer.retrain(store.history())
+                )
+        except Exception as e:
+            logger.error("Error in prediction loop: %s", e)
+        finally:
+            self._inflight.release()
+            if self.instrumentation is not None:
+                self.instrumentation.stage('pass').record_ns(time.perf_counter_ns() - start, len(codes))
 
 # Example usage
 async def main():
@@ -0,0 +1,138 @@
+import json
+import os
+import numpy as np
+from typing import Dict, Optional, Tuple
+from sklearn.ensemble import GradientBoostingRegressor
+
+ARRAY_NAMES = ('roots', 'feature', 'threshold', 'left', 'right', 'value')
+PARAMS_FILE = 'compiled.json'
+
+class CompiledEnsemble:
+    """Flat-array evaluator for a fitted GradientBoostingRegressor
+
+    All trees are exported into contiguous NumPy arrays and every row is
+    pushed through every tree at once, one tree level per step.
+    """
+
+    def __init__(self,
+                 arrays: Dict[str, np.ndarray],
+                 learning_rate: float,
+                 n_features: int,
+                 max_depth: int,
+                 baseline: float = 0.0,
+                 init=None):
+        self.roots = arrays['roots']
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.left = arrays['left']
+        self.right = arrays['right']
+        self.value = arrays['value']
+        self.learning_rate = learning_rate
+        self.n_features = n_features
+        self.n_trees = len(self.roots)
+        self.max_depth = max_depth
+        self.baseline = baseline  # Constant initial estimate
+        self.init = init  # Initial estimator when it is not a constant
+
+    @classmethod
+    def from_model(cls, model: GradientBoostingRegressor) -> 'CompiledEnsemble':
+        """Export the trees of a fitted model"""
+        trees = [estimator.tree_ for estimator in model.estimators_.ravel()]
+        if not trees:
+            raise ValueError("Model has no fitted trees")
+
+        sizes = np.array([tree.node_count for tree in trees])
+        offsets = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+
+        # Node arrays for all trees back to back, children as global indices
+        feature = np.concatenate([tree.feature for tree in trees]).astype(np.intp)
+        left = np.concatenate([
+            tree.children_left + offset for tree, offset in zip(trees, offsets)
+        ])
+        right = np.concatenate([
+            tree.children_right + offset for tree, offset in zip(trees, offsets)
+        ])
+
+        # Leaves point back at themselves so extra levels are no-ops
+        leaves = np.concatenate([tree.children_left for tree in trees]) == -1
+        nodes = np.arange(len(leaves))
+        feature[leaves] = 0
+
+        arrays = {
+            'roots': offsets.astype(np.intp),
+            'feature': feature,
+            'threshold': np.concatenate([tree.threshold for tree in trees]),
+            'left': np.where(leaves, nodes, left).astype(np.intp),
+            'right': np.where(leaves, nodes, right).astype(np.intp),
+            'value': np.concatenate([tree.value[:, 0, 0] for tree in trees])
+        }
+
+        baseline, init = 0.0, None
+        if hasattr(model.init_, 'constant_'):
+            baseline = float(np.ravel(model.init_.constant_)[0])
+        elif not (isinstance(model.init_, str) and model.init_ == 'zero'):
+            init = model.init_
+
+        return cls(
+            arrays,
+            learning_rate=model.learning_rate,
+            n_features=model.n_features_in_,
+            max_depth=max(tree.max_depth for tree in trees),
+            baseline=baseline,
+            init=init
+        )
+
+    def save(self, directory: str):
+        """Write the arrays as .npy files that can be memory-mapped"""
+        if self.init is not None:
+            raise ValueError("Only models with a constant initial estimate can be saved")
+        os.makedirs(directory, exist_ok=True)
+        for name in ARRAY_NAMES:
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name))
+        with open(os.path.join(directory, PARAMS_FILE), 'w') as f:
+            json.dump({
+                'learning_rate': self.learning_rate,
+                'n_features': self.n_features,
+                'max_depth': self.max_depth,
+                'baseline': self.baseline
+            }, f)
+
+    @classmethod
+    def load(cls, directory: str, mmap_mode: Optional[str] = 'r') -> 'CompiledEnsemble':
+        """Load saved arrays, memory-mapped by default so processes share pages"""
+        with open(os.path.join(directory, PARAMS_FILE)) as f:
+            params = json.load(f)
+        arrays = {
+            name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode)
+            for name in ARRAY_NAMES
+        }
+        return cls(arrays, **params)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Point predictions for every row"""
+        return self.predict_with_contributions(X)[0]
+
+    def predict_with_contributions(self, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Point predictions and the (n_rows, n_trees) raw tree outputs"""
+        X = np.asarray(X)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(
+                f"Expected {self.n_features} features, got shape {X.shape}"
+            )
+        # Trees compare float32 inputs against float64 thresholds
+        X = X.astype(np.float32).astype(np.float64)
+
+        rows = np.arange(X.shape[0])[:, None]
+        nodes = np.broadcast_to(self.roots, (X.shape[0], self.n_trees))
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+
+        contributions = self.value[nodes]
+        return self._baseline(X) + self.learning_rate * contributions.sum(axis=1), contributions
+
+    def _baseline(self, X: np.ndarray) -> np.ndarray:
+        """Initial estimate the boosting stages are added to"""
+        if self.init is not None:
+            return self.init.predict(X).astype(np.float64).ravel()
+        return np.full(X.shape[0], self.baseline)
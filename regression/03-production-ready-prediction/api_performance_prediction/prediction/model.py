@@ -1,43 +1,276 @@
+import asyncio
+import logging
 import pandas as pd
 from sklearn.ensemble import GradientBoostingRegressor
 import joblib
 from datetime import datetime
 import numpy as np
-from typing import List, Optional
-from ..domain.models import PredictionResult
+from typing import Callable, List, Optional, Tuple
+from ..domain.models import PREDICTION_COLUMNS, PredictionBatch, PredictionResult
+from .compiled import CompiledEnsemble
+from .registry import ModelRegistry
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ('sklearn', 'compiled')
+WARMUP_ROWS = 32
+
+class ServedModel:
+    """One model version as served, published and read as a single reference"""
+    
+    def __init__(self, 
+                 version: str,
+                 model: Optional[GradientBoostingRegressor] = None,
+                 compiled: Optional[CompiledEnsemble] = None,
+                 feature_schema: Optional[List[str]] = None,
+                 loader: Optional[Callable[[], GradientBoostingRegressor]] = None,
+                 registry_root: Optional[str] = None):  # Registry the version was opened from
+        self.version = version
+        self.feature_schema = feature_schema
+        self.registry_root = registry_root
+        self._model = model
+        self._compiled = compiled
+        self._loader = loader  # Loads the sklearn model when first needed
+    
+    @property
+    def model(self) -> GradientBoostingRegressor:
+        if self._model is None and self._loader is not None:
+            self._model = self._loader()
+        return self._model
+    
+    @property
+    def compiled(self) -> CompiledEnsemble:
+        """Flat-array export of the model, built on first use"""
+        if self._compiled is None:
+            self._compiled = CompiledEnsemble.from_model(self.model)
+        return self._compiled
+    
+    @property
+    def n_features(self) -> int:
+        if self._compiled is not None:
+            return self._compiled.n_features
+        return self.model.n_features_in_
+    
+    def score(self, X: np.ndarray, columns: List[str], backend: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Point predictions and the (n_rows, n_trees) raw tree outputs"""
+        if backend == 'compiled':
+            return self.compiled.predict_with_contributions(X)
+        return self.model.predict(self.model_input(X, columns)), self.tree_predictions(X)
+    
+    def tree_predictions(self, X: np.ndarray) -> np.ndarray:
+        """Raw output of every tree as an (n_rows, n_trees) matrix"""
+        trees = self.model.estimators_.ravel()
+        tree_preds = np.empty((X.shape[0], len(trees)))
+        for j, tree in enumerate(trees):
+            tree_preds[:, j] = tree.predict(X)
+        return tree_preds
+    
+    def feature_columns(self, features: pd.DataFrame) -> List[str]:
+        """Columns the model was trained on, or every numeric column"""
+        if self.feature_schema is not None:
+            return list(self.feature_schema)
+        names = getattr(self.model, 'feature_names_in_', None)
+        if names is not None:
+            return list(names)
+        return list(features.select_dtypes(include='number').columns)
+    
+    def model_input(self, X: np.ndarray, columns: List[str]):
+        """Keep column names for models that were fitted on a DataFrame"""
+        if getattr(self.model, 'feature_names_in_', None) is not None:
+            return pd.DataFrame(X, columns=columns)
+        return X
 
 class ModelServer:
     """Serves predictions using the latest model"""
     
-    def __init__(self, model_path: Optional[str] = None):
-        self.model = self._load_model(model_path) if model_path else self._create_default_model()
-        self.model_version = datetime.now().strftime("%Y%m%d_%H%M%S")
+    def __init__(self, 
+                 model_path: Optional[str] = None, 
+                 batch: bool = True,
+                 backend: str = 'sklearn',
+                 registry: Optional[ModelRegistry] = None,
+                 version: Optional[str] = None):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend '{backend}', expected one of {BACKENDS}")
+        self.batch = batch  # Score the whole frame at once instead of row by row
+        self.backend = backend  # 'compiled' evaluates the trees from flat arrays
+        self.registry = registry
+        
+        if registry is not None:
+            self._served = self._open_registry_version(version)
+        else:
+            self._served = ServedModel(
+                version=datetime.now().strftime("%Y%m%d_%H%M%S"),
+                model=self._load_model(model_path) if model_path else self._create_default_model()
+            )
+    
+    @property
+    def model(self) -> GradientBoostingRegressor:
+        """Served sklearn model, loaded from the registry on first use"""
+        return self._served.model
+    
+    @model.setter
+    def model(self, model: GradientBoostingRegressor):
+        self._served = ServedModel(
+            version=self._served.version,
+            model=model,
+            feature_schema=self._served.feature_schema
+        )
+    
+    @property
+    def model_version(self) -> str:
+        return self._served.version
+    
+    @property
+    def feature_schema(self) -> Optional[List[str]]:
+        return self._served.feature_schema
+    
+    @property
+    def registry_location(self) -> Optional[Tuple[str, str]]:
+        """Registry root and version of the served model, None if it was not opened from one"""
+        served = self._served
+        if served.registry_root is None:
+            return None
+        return served.registry_root, served.version
+    
+    def feature_columns(self, features: pd.DataFrame) -> List[str]:
+        """Columns of features the served model scores"""
+        return self._served.feature_columns(features)
         
     def predict(self, features: pd.DataFrame) -> List[PredictionResult]:
         """Generate predictions with confidence intervals"""
+        # A swap during this call doesn't affect the batch already in flight
+        served = self._served
+        if self.batch:
+            return self._predict_batch(features, served)
+        return self._predict_rows(features, served)
+    
+    def predict_batch(self, features: pd.DataFrame) -> PredictionBatch:
+        """Predictions as one columnar batch, without per-row objects"""
+        served = self._served
+        if features.empty:
+            # Neither mode can score no rows, sklearn and from_predictions both refuse
+            return PredictionBatch.from_columns(
+                [], served.feature_columns(features), served.version,
+                endpoint_code=[], features=[], **{name: [] for name in PREDICTION_COLUMNS}
+            )
+        if self.batch:
+            return self._score_batch(features, served)
+        return PredictionBatch.from_predictions(self._predict_rows(features, served))
+    
+    async def swap_version(self, version: Optional[str] = None) -> str:
+        """Load and warm a registry version in the background, then serve it"""
+        if self.registry is None:
+            raise ValueError("Swapping by version requires a model registry")
+        loop = asyncio.get_running_loop()
+        served = await loop.run_in_executor(None, self._prepare_version, version)
+        return self._publish(served)
+    
+    async def swap_model(self, 
+                         model: GradientBoostingRegressor, 
+                         version: str,
+                         feature_schema: Optional[List[str]] = None) -> str:
+        """Warm an already fitted model in the background, then serve it"""
+        served = ServedModel(version=version, model=model, feature_schema=feature_schema)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._warm, served)
+        return self._publish(served)
+    
+    def _prepare_version(self, version: Optional[str]) -> ServedModel:
+        served = self._open_registry_version(version)
+        self._warm(served)
+        return served
+    
+    def _warm(self, served: ServedModel):
+        """Score a dummy batch so the first real batch pays no load cost"""
+        X = np.zeros((WARMUP_ROWS, served.n_features))
+        columns = served.feature_schema
+        if columns is None and self.backend != 'compiled':
+            columns = getattr(served.model, 'feature_names_in_', None)
+        if columns is None:
+            columns = [f"f{i}" for i in range(served.n_features)]
+        served.score(X, list(columns), self.backend)
+    
+    def _publish(self, served: ServedModel) -> str:
+        previous, self._served = self._served, served
+        logger.info("Swapped model %s -> %s", previous.version, served.version)
+        return served.version
+    
+    def _score_batch(self, features: pd.DataFrame, served: ServedModel) -> PredictionBatch:
+        """Score all rows with one call per tree instead of one per row"""
+        columns = served.feature_columns(features)
+        X = features[columns].to_numpy(dtype=np.float64)
+        
+        point_preds, tree_preds = served.score(X, columns, self.backend)
+        
+        # Spread of the individual trees gives the standard error per row
+        residuals = tree_preds.std(axis=1)
+        ci_widths = 1.96 * residuals  # 95% confidence interval
+        
+        endpoint_codes, endpoints = pd.factorize(features['endpoint'])
+        return PredictionBatch.from_columns(
+            list(endpoints),
+            columns,
+            served.version,
+            endpoint_code=endpoint_codes,
+            timestamp=pd.to_datetime(features['timestamp']).to_numpy(),
+            predicted_latency=point_preds,
+            lower=point_preds - ci_widths,
+            upper=point_preds + ci_widths,
+            features=X
+        )
+    
+    def _predict_batch(self, features: pd.DataFrame, served: ServedModel) -> List[PredictionResult]:
+        return self._score_batch(features, served).to_predictions()
+    
+    def _predict_rows(self, features: pd.DataFrame, served: ServedModel) -> List[PredictionResult]:
+        """Score one row at a time (reference path for the batch mode)"""
+        columns = served.feature_columns(features)
+        X = features[columns].to_numpy(dtype=np.float64)
+        
         predictions = []
-        for _, row in features.iterrows():
+        for i, (_, row) in enumerate(features.iterrows()):
+            x = X[i].reshape(1, -1)
             # Make prediction with all trees to get confidence interval
-            point_pred = self.model.predict(row.values.reshape(1, -1))[0]
+            point_pred = served.model.predict(served.model_input(x, columns))[0]
             
             # We can get standard error from model's residuals
             residuals = np.std([
-                tree.predict(row.values.reshape(1, -1))[0]
-                for tree in self.model.estimators_
+                tree.predict(x)[0]
+                for tree in served.model.estimators_.ravel()
             ])
             
             ci_width = 1.96 * residuals  # 95% confidence interval
             predictions.append(PredictionResult(
                 timestamp=row['timestamp'],
                 endpoint=row['endpoint'],
-                predicted_latency=point_pred,
-                confidence_interval=(point_pred - ci_width, point_pred + ci_width),
-                features_used={col: row[col] for col in features.columns},
-                model_version=self.model_version
+                predicted_latency=float(point_pred),
+                confidence_interval=(float(point_pred - ci_width), 
+                                     float(point_pred + ci_width)),
+                features_used=dict(zip(columns, X[i].tolist())),
+                model_version=served.version
             ))
             
         return predictions
     
+    def _open_registry_version(self, version: Optional[str]) -> ServedModel:
+        """Take version and schema from the manifest, map arrays lazily"""
+        registry = self.registry
+        manifest = registry.manifest(version)
+        model, compiled = None, None
+        if self.backend == 'compiled' and manifest.compiled:
+            # Only the manifest is read here, tree pages fault in on first use
+            compiled = registry.load_compiled(manifest.version)
+        else:
+            model = registry.load_model(manifest.version)
+        return ServedModel(
+            version=manifest.version,
+            model=model,
+            compiled=compiled,
+            feature_schema=manifest.feature_schema,
+            loader=lambda: registry.load_model(manifest.version),
+            registry_root=registry.root
+        )
+    
     def _create_default_model(self) -> GradientBoostingRegressor:
         """Create a default model with reasonable parameters"""
         return GradientBoostingRegressor(
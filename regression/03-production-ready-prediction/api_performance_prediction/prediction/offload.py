@@ -0,0 +1,190 @@
+import asyncio
+import multiprocessing
+import os
+import pickle
+import shutil
+import tempfile
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+import numpy as np
+from ..domain.models import MetricBatch, PredictionBatch
+from ..monitoring.instrumentation import Instrumentation
+from ..monitoring.monitor import ModelMonitor, MonitoringMetrics
+from .model import ModelServer
+from .registry import ModelRegistry
+from .preprocessor import DataPreprocessor
+
+MODES = ('inline', 'thread', 'process')
+
+def predict_newest(preprocessor: DataPreprocessor,
+                   model_server: ModelServer,
+                   batch: MetricBatch) -> PredictionBatch:
+    """Build features over recent windows and predict on each endpoint's newest row"""
+    return _timed_predict(preprocessor, model_server, batch)[0]
+
+def _timed_predict(preprocessor: DataPreprocessor,
+                   model_server: ModelServer,
+                   batch: MetricBatch) -> Tuple[PredictionBatch, int, int]:
+    """Predictions, then nanoseconds spent preprocessing and predicting"""
+    start = time.perf_counter_ns()
+    features = preprocessor.create_feature_vector(batch)
+    endpoints = features['endpoint'].to_numpy()
+    newest = np.r_[endpoints[1:] != endpoints[:-1], True]
+    features = features[newest]
+    preprocessed = time.perf_counter_ns()
+    predictions = model_server.predict_batch(features)
+    return predictions, preprocessed - start, time.perf_counter_ns() - preprocessed
+
+def evaluate_batch(monitor: ModelMonitor,
+                   predictions: PredictionBatch,
+                   batch: MetricBatch,
+                   horizons: np.ndarray,
+                   tolerances: np.ndarray) -> MonitoringMetrics:
+    """Resolve tracked predictions with the batch's actuals, then track the new ones"""
+    metrics = monitor.evaluate_actuals(batch)
+    monitor.track(predictions, horizons, tolerances)
+    return metrics
+
+def _timed_evaluate(monitor: ModelMonitor,
+                    predictions: PredictionBatch,
+                    batch: MetricBatch,
+                    horizons: np.ndarray,
+                    tolerances: np.ndarray) -> Tuple[MonitoringMetrics, int]:
+    start = time.perf_counter_ns()
+    metrics = evaluate_batch(monitor, predictions, batch, horizons, tolerances)
+    return metrics, time.perf_counter_ns() - start
+
+# Set once per worker process by _init_worker
+_worker_preprocessor: Optional[DataPreprocessor] = None
+_worker_spill_dir: Optional[str] = None
+# Model server per worker process, only the serving version is kept
+_worker_server: Dict[str, ModelServer] = {}
+
+def _init_worker(preprocessor: DataPreprocessor, spill_dir: str):
+    global _worker_preprocessor, _worker_spill_dir
+    _worker_preprocessor = preprocessor
+    _worker_spill_dir = spill_dir
+
+def _open_worker_server(key: str) -> ModelServer:
+    """Open a registry version in place or unpickle a server spilled whole"""
+    with open(os.path.join(_worker_spill_dir, key), 'rb') as f:
+        source = pickle.load(f)
+    if source[0] == 'registry':
+        _, root, version, backend, batch = source
+        return ModelServer(registry=ModelRegistry(root), version=version, backend=backend, batch=batch)
+    return source[1]
+
+def _predict_in_worker(key: str, batch: MetricBatch) -> Tuple[PredictionBatch, int, int]:
+    server = _worker_server.get(key)
+    if server is None:
+        _worker_server.clear()
+        server = _worker_server[key] = _open_worker_server(key)
+    return _timed_predict(_worker_preprocessor, server, batch)
+
+class PredictionStage:
+    """Runs preprocessing, inference and evaluation off the event loop
+
+    'thread' runs feature building and inference on a thread pool, which
+    helps as far as pandas and scikit-learn release the GIL. 'process'
+    runs them on a process pool, which gets the preprocessor once when
+    it starts. Each served version is written once to a spill directory
+    the workers read from, and calls only name it: a registry version as
+    its location, which workers open themselves and map so they share
+    its pages, any other model as a pickled server. Evaluation updates
+    the monitor's state, so it runs on one dedicated thread, in order. 'inline' keeps everything on
+    the loop. Steps are timed where they run and recorded as the
+    'preprocess', 'predict' and 'monitor' stages.
+    """
+
+    def __init__(self,
+                 preprocessor: DataPreprocessor,
+                 model_server: ModelServer,
+                 mode: str = 'thread',
+                 workers: int = 1,  # Threads or processes doing inference
+                 instrumentation: Optional[Instrumentation] = None):
+        if mode not in MODES:
+            raise ValueError(f"Unknown mode '{mode}', expected one of {MODES}")
+        self.preprocessor = preprocessor
+        self.model_server = model_server
+        self.mode = mode
+        self.instrumentation = instrumentation
+        self._executor: Optional[Executor] = None
+        self._monitor_executor: Optional[Executor] = None
+        self._spill_dir: Optional[str] = None  # Served versions as process workers read them
+        self._spilled: Optional[Tuple[str, str]] = None  # Version, file name in _spill_dir
+        self._spills = 0
+        if mode == 'thread':
+            self._executor = ThreadPoolExecutor(workers, thread_name_prefix='predict')
+        elif mode == 'process':
+            self._spill_dir = tempfile.mkdtemp(prefix='prediction-stage-')
+            self._executor = ProcessPoolExecutor(
+                workers, mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker, initargs=(preprocessor, self._spill_dir)
+            )
+        if mode != 'inline':
+            self._monitor_executor = ThreadPoolExecutor(1, thread_name_prefix='monitor')
+
+    async def predict(self, batch: MetricBatch) -> PredictionBatch:
+        """Predictions for the newest row of every endpoint in the batch"""
+        if self.mode == 'inline':
+            result = _timed_predict(self.preprocessor, self.model_server, batch)
+        elif self.mode == 'thread':
+            result = await asyncio.get_running_loop().run_in_executor(
+                self._executor, _timed_predict, self.preprocessor, self.model_server, batch
+            )
+        else:
+            version = self.model_server.model_version
+            if self._spilled is None or self._spilled[0] != version:
+                self._spilled = (version, self._spill())
+            result = await asyncio.get_running_loop().run_in_executor(
+                self._executor, _predict_in_worker, self._spilled[1], batch
+            )
+        predictions, preprocess_ns, predict_ns = result
+        if self.instrumentation is not None:
+            self.instrumentation.stage('preprocess').record_ns(preprocess_ns, len(batch))
+            self.instrumentation.stage('predict').record_ns(predict_ns, len(predictions))
+        return predictions
+
+    async def evaluate(self,
+                       monitor: ModelMonitor,
+                       predictions: PredictionBatch,
+                       batch: MetricBatch,
+                       horizons: np.ndarray,  # Seconds from each prediction to its target
+                       tolerances: np.ndarray) -> MonitoringMetrics:
+        """Join the batch's actuals with earlier predictions, then track these"""
+        args = (monitor, predictions, batch, horizons, tolerances)
+        if self._monitor_executor is None:
+            metrics, duration_ns = _timed_evaluate(*args)
+        else:
+            metrics, duration_ns = await asyncio.get_running_loop().run_in_executor(
+                self._monitor_executor, _timed_evaluate, *args
+            )
+        if self.instrumentation is not None:
+            self.instrumentation.stage('monitor').record_ns(duration_ns, len(predictions))
+        return metrics
+
+    def _spill(self) -> str:
+        """Write how workers get the served version, return the file name"""
+        location = self.model_server.registry_location
+        if location is not None:
+            root, version = location
+            source = ('registry', root, version, self.model_server.backend, self.model_server.batch)
+        else:
+            source = ('pickle', self.model_server)
+        self._spills += 1
+        key = str(self._spills)
+        path = os.path.join(self._spill_dir, key)
+        with open(path + '.tmp', 'wb') as f:
+            pickle.dump(source, f, protocol=pickle.HIGHEST_PROTOCOL)
+        # Kept until shutdown, passes queued before a swap still name the old one
+        os.replace(path + '.tmp', path)
+        return key
+
+    def shutdown(self):
+        """Stop the pools, passes still queued are dropped"""
+        for executor in (self._executor, self._monitor_executor):
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+        if self._spill_dir is not None:
+            shutil.rmtree(self._spill_dir, ignore_errors=True)
@@ -1,20 +1,51 @@
+import numpy as np
 import pandas as pd
-from typing import List
-from ..domain.models import APIMetric
+from typing import List, Union
+from ..domain.models import APIMetric, MetricBatch
+
+ROLLING_COLUMNS = ['latency_ms', 'cpu_usage', 'memory_usage', 'request_count']
+# Model inputs among the columns build_features produces
+FEATURE_COLUMNS = [
+    'latency_ms', 'cpu_usage', 'memory_usage', 'request_count', 'error_rate',
+    'hour', 'day_of_week'
+] + [f'{col}_rolling_mean' for col in ROLLING_COLUMNS]
 
 class DataPreprocessor:
     """Preprocesses raw metrics for model input"""
     
-    def __init__(self, window_size: int = 12):  # 1-hour window with 5-min intervals
+    def __init__(self, 
+                 window_size: int = 12,  # 1-hour window with 5-min intervals
+                 grouped: bool = False):  # Separate rolling windows per endpoint
         self.window_size = window_size
+        self.grouped = grouped
     
-    def create_feature_vector(self, metrics: List[APIMetric]) -> pd.DataFrame:
+    def create_feature_vector(self, 
+                              metrics: Union[List[APIMetric], MetricBatch]) -> pd.DataFrame:
         """Convert raw metrics into feature vectors"""
-        df = pd.DataFrame([self._metric_to_dict(m) for m in metrics])
-
+        if isinstance(metrics, MetricBatch):
+            df = metrics.to_frame()
+        elif self.grouped:
+            # Endpoint codes are assigned in the pass over the metrics, so the
+            # strings are never hashed again to sort by endpoint
+            codes: dict = {}
+            endpoint_codes = [codes.setdefault(m.endpoint, len(codes)) for m in metrics]
+            df = pd.DataFrame([self._metric_to_dict(m) for m in metrics])
+            if len(df):
+                df['endpoint'] = pd.Categorical.from_codes(
+                    endpoint_codes, categories=list(codes)
+                ).reorder_categories(sorted(codes))  # Sorted like factorizing the strings
+        else:
+            df = pd.DataFrame([self._metric_to_dict(m) for m in metrics])
+        return self.build_features(df)
+    
+    def build_features(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Add derived features to a frame of raw metric columns"""
         # Calculate error rate directly from raw counts
         df['error_rate'] = df['error_count'] / df['request_count']
         
+        if self.grouped:
+            return self._add_grouped_features(df)
+        
         # Sort by timestamp
         df.sort_values('timestamp', inplace=True)
         
@@ -23,7 +54,7 @@ class DataPreprocessor:
         df['day_of_week'] = df['timestamp'].dt.dayofweek
         
         # Add rolling means with min_periods=1
-        for col in ['latency_ms', 'cpu_usage', 'memory_usage', 'request_count']:
+        for col in ROLLING_COLUMNS:
             df[f'{col}_rolling_mean'] = df[col].rolling(
             window=self.window_size, 
             min_periods=1
@@ -31,6 +62,69 @@ class DataPreprocessor:
         
         return df
     
+    def _add_grouped_features(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Rolling means per endpoint from segmented cumulative sums"""
+        # Endpoints are factorized once, string ones then move through the
+        # sort as categorical codes instead of objects
+        if isinstance(df['endpoint'].dtype, pd.CategoricalDtype):
+            codes, _ = pd.factorize(df['endpoint'], sort=True)
+        else:
+            # Hashed in first-seen order, then the few uniques are ranked by name
+            codes, uniques = pd.factorize(df['endpoint'].to_numpy())
+            by_name = np.argsort(uniques)
+            rank = np.empty_like(by_name)
+            rank[by_name] = np.arange(len(by_name))
+            codes = rank[codes]
+            df['endpoint'] = pd.Categorical.from_codes(codes, categories=uniques[by_name])
+        # Sort by (endpoint, timestamp) so each endpoint is one contiguous segment,
+        # store windows already come that way
+        timestamps = df['timestamp'].to_numpy()
+        same = codes[1:] == codes[:-1]
+        ordered = ((codes[1:] > codes[:-1]) | (same & (timestamps[1:] >= timestamps[:-1]))).all()
+        if not ordered:
+            order = np.lexsort((timestamps, codes))
+            df = df.take(order)
+            codes = codes[order]
+        df.index = pd.RangeIndex(len(df))
+        
+        df['hour'], df['day_of_week'] = self._time_features(df['timestamp'])
+        
+        # Rows whose window is clipped by the start of their endpoint's segment
+        n, w = len(df), self.window_size
+        idx = np.arange(n)
+        segment_start = np.r_[True, codes[1:] != codes[:-1]]
+        first_in_segment = np.maximum.accumulate(np.where(segment_start, idx, 0))
+        clipped = np.flatnonzero(idx - w + 1 < first_in_segment)
+        counts = np.full(n, w, dtype=np.float64)
+        counts[clipped] = clipped - first_in_segment[clipped] + 1
+        
+        starts = np.flatnonzero(segment_start)
+        for col in ROLLING_COLUMNS:
+            values = df[col].to_numpy(dtype=np.float64)
+            # Take the previous segment's total off each segment's first value,
+            # so the running sum restarts near zero at every endpoint instead of
+            # growing across the fleet and losing precision in the differences
+            restarted = values.copy()
+            restarted[starts[1:]] -= np.add.reduceat(values, starts)[:-1]
+            inclusive = np.cumsum(restarted)  # Sum of the segment up to and including each row
+            exclusive = inclusive - values  # ... and up to the row before, about 0 at segment starts
+            sums = inclusive.copy()
+            if n >= w:
+                sums[w - 1:] -= exclusive[:n - w + 1]
+            sums[clipped] = inclusive[clipped] - exclusive[first_in_segment[clipped]]
+            df[f'{col}_rolling_mean'] = sums / counts
+        
+        return df
+    
+    def _time_features(self, timestamps: pd.Series):
+        """Hour and day of week, computed on the raw epoch values when tz-naive"""
+        if getattr(timestamps.dt, 'tz', None) is not None:
+            return timestamps.dt.hour, timestamps.dt.dayofweek
+        seconds = timestamps.to_numpy().astype('datetime64[s]').astype(np.int64)
+        hour = (seconds // 3600) % 24
+        day_of_week = (seconds // 86400 + 3) % 7  # 1970-01-01 was a Thursday
+        return hour.astype(np.int32), day_of_week.astype(np.int32)
+    
     def _metric_to_dict(self, metric: APIMetric) -> dict:
         """Convert APIMetric to dictionary"""
         return {
@@ -42,4 +136,4 @@ class DataPreprocessor:
             'memory_usage': metric.memory_usage,
             'request_count': metric.request_count,
             'error_count': metric.error_count
-        }
\ No newline at end of file
+        }
@@ -0,0 +1,161 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional, Tuple
+import joblib
+from sklearn.ensemble import GradientBoostingRegressor
+from .compiled import CompiledEnsemble
+
+MODEL_FILE = 'model.joblib'
+MANIFEST_FILE = 'manifest.json'
+COMPILED_DIR = 'compiled'
+LATEST_FILE = 'LATEST'
+
+@dataclass(frozen=True)
+class ModelManifest:
+    """Metadata stored next to every model artifact"""
+    version: str
+    content_hash: str  # sha256 of the model artifact
+    created_at: datetime
+    training_window: Tuple[datetime, datetime]
+    feature_schema: List[str]
+    compiled: bool  # Whether flat arrays were exported for the compiled backend
+
+    def to_dict(self) -> dict:
+        return {
+            'version': self.version,
+            'content_hash': self.content_hash,
+            'created_at': self.created_at.isoformat(),
+            'training_window': [t.isoformat() for t in self.training_window],
+            'feature_schema': list(self.feature_schema),
+            'compiled': self.compiled
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'ModelManifest':
+        start, end = data['training_window']
+        return cls(
+            version=data['version'],
+            content_hash=data['content_hash'],
+            created_at=datetime.fromisoformat(data['created_at']),
+            training_window=(datetime.fromisoformat(start), datetime.fromisoformat(end)),
+            feature_schema=list(data['feature_schema']),
+            compiled=data['compiled']
+        )
+
+class ModelRegistry:
+    """Directory of versioned model artifacts, one subdirectory per version
+
+    Artifacts are written uncompressed and loaded with memory mapping, so
+    worker processes serving the same version share the same pages.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def publish(self,
+                model: GradientBoostingRegressor,
+                training_window: Tuple[datetime, datetime],
+                feature_schema: List[str],
+                version: Optional[str] = None) -> ModelManifest:
+        """Store a fitted model as a new version and mark it as latest"""
+        staging = tempfile.mkdtemp(prefix='.staging-', dir=self.root)
+        try:
+            model_path = os.path.join(staging, MODEL_FILE)
+            joblib.dump(model, model_path)
+            content_hash = self._hash_file(model_path)
+
+            compiled = CompiledEnsemble.from_model(model)
+            exportable = compiled.init is None
+            if exportable:
+                compiled.save(os.path.join(staging, COMPILED_DIR))
+
+            created_at = datetime.now()
+            manifest = ModelManifest(
+                version=version or f"{created_at:%Y%m%d_%H%M%S}_{content_hash[:12]}",
+                content_hash=content_hash,
+                created_at=created_at,
+                training_window=training_window,
+                feature_schema=list(feature_schema),
+                compiled=exportable
+            )
+            with open(os.path.join(staging, MANIFEST_FILE), 'w') as f:
+                json.dump(manifest.to_dict(), f, indent=2)
+
+            # A version directory only ever appears complete
+            os.rename(staging, self._version_dir(manifest.version))
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        self._write_latest(manifest.version)
+        return manifest
+
+    def versions(self) -> List[str]:
+        """All published versions, oldest first"""
+        versions = [
+            name for name in os.listdir(self.root)
+            if os.path.isfile(os.path.join(self.root, name, MANIFEST_FILE))
+        ]
+        return sorted(versions, key=lambda v: self.manifest(v).created_at)
+
+    def latest_version(self) -> str:
+        """Version most recently published"""
+        try:
+            with open(os.path.join(self.root, LATEST_FILE)) as f:
+                return f.read().strip()
+        except FileNotFoundError:
+            raise LookupError(f"No model published in {self.root}")
+
+    def manifest(self, version: Optional[str] = None) -> ModelManifest:
+        """Read the manifest of a version, the latest by default"""
+        version = version or self.latest_version()
+        path = os.path.join(self._version_dir(version), MANIFEST_FILE)
+        try:
+            with open(path) as f:
+                return ModelManifest.from_dict(json.load(f))
+        except FileNotFoundError:
+            raise LookupError(f"Unknown model version '{version}'")
+
+    def load_model(self, version: Optional[str] = None) -> GradientBoostingRegressor:
+        """Load the sklearn model, memory-mapping its arrays"""
+        version = version or self.latest_version()
+        return joblib.load(os.path.join(self._version_dir(version), MODEL_FILE), mmap_mode='r')
+
+    def load_compiled(self, version: Optional[str] = None) -> CompiledEnsemble:
+        """Map the exported tree arrays without reading them into memory"""
+        manifest = self.manifest(version)
+        if not manifest.compiled:
+            raise ValueError(f"Version '{manifest.version}' has no compiled export")
+        return CompiledEnsemble.load(
+            os.path.join(self._version_dir(manifest.version), COMPILED_DIR)
+        )
+
+    def verify(self, version: Optional[str] = None) -> bool:
+        """Check the model artifact against the hash in its manifest"""
+        manifest = self.manifest(version)
+        path = os.path.join(self._version_dir(manifest.version), MODEL_FILE)
+        return self._hash_file(path) == manifest.content_hash
+
+    def _version_dir(self, version: str) -> str:
+        return os.path.join(self.root, version)
+
+    def _write_latest(self, version: str):
+        """Point LATEST at a version with an atomic rename"""
+        tmp_path = os.path.join(self.root, f".{LATEST_FILE}.tmp")
+        with open(tmp_path, 'w') as f:
+            f.write(version)
+        os.replace(tmp_path, os.path.join(self.root, LATEST_FILE))
+
+    @staticmethod
+    def _hash_file(path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
@@ -0,0 +1,214 @@
+import asyncio
+import logging
+import math
+import multiprocessing
+import time
+import tracemalloc
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple, Union
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.ensemble import GradientBoostingRegressor
+from ..domain.models import APIMetric, MetricBatch
+from .model import ModelServer
+from .preprocessor import DataPreprocessor, FEATURE_COLUMNS
+from .registry import ModelRegistry
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class RetrainingReport:
+    """Outcome of one retraining run"""
+    started_at: datetime
+    training_rows: int
+    holdout_rows: int
+    candidate_mape: float
+    current_mape: Optional[float]  # None when the served model is not fitted
+    accepted: bool
+    version: Optional[str]  # Version served after the run if accepted
+    training_seconds: float
+    peak_memory_mb: float
+
+def _mape(y_true: np.ndarray, y_pred: np.ndarray) -> float:
+    """MAPE over the rows with a non-zero actual, NaN if there are none"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        errors = np.abs((y_pred - y_true) / y_true) * 100
+    errors = errors[np.isfinite(errors)]
+    return float(errors.mean()) if len(errors) else float('nan')
+
+def _fit_candidate(model: GradientBoostingRegressor,
+                   current: Optional[GradientBoostingRegressor],
+                   X_train: np.ndarray, y_train: np.ndarray,
+                   X_holdout: np.ndarray, y_holdout: np.ndarray,
+                   X_current: Optional[np.ndarray] = None  # Holdout in the current model's columns
+                   ) -> Tuple[GradientBoostingRegressor, Dict[str, float]]:
+    """Fit and score a candidate, runs inside the worker process"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    training_seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    stats = {
+        'training_seconds': training_seconds,
+        'peak_memory_mb': peak / 2**20,
+        'candidate_mape': _mape(y_holdout, model.predict(X_holdout)),
+        'current_mape': None
+    }
+    if current is not None:
+        stats['current_mape'] = _mape(y_holdout, current.predict(X_current))
+    return model, stats
+
+class ModelRetrainer:
+    """Retrains the model off the event loop and serves it if it wins"""
+
+    def __init__(self,
+                 model_server: ModelServer,
+                 preprocessor: DataPreprocessor,
+                 registry: Optional[ModelRegistry] = None,
+                 holdout_fraction: float = 0.2,  # Most recent share held out
+                 min_samples: int = 100,
+                 horizon: int = 1,  # Predict latency this many samples ahead
+                 executor: Optional[Executor] = None):
+        if not 0 < holdout_fraction < 1:
+            raise ValueError("holdout_fraction must be between 0 and 1")
+        self.model_server = model_server
+        self.preprocessor = preprocessor
+        self.registry = registry
+        self.holdout_fraction = holdout_fraction
+        self.min_samples = min_samples
+        self.horizon = horizon
+        self.executor = executor
+        self.reports: List[RetrainingReport] = []
+        self._running = False
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def build_training_set(self, metrics: Union[List[APIMetric], MetricBatch]) -> pd.DataFrame:
+        """Feature rows paired with the latency observed `horizon` samples later"""
+        df = self.preprocessor.create_feature_vector(metrics)
+        df['target'] = df.groupby('endpoint', observed=True)['latency_ms'].shift(-self.horizon)
+        df = df.replace([np.inf, -np.inf], np.nan)
+        return df.dropna(subset=FEATURE_COLUMNS + ['target'])
+
+    async def retrain(self, metrics: Union[List[APIMetric], MetricBatch]) -> Optional[RetrainingReport]:
+        """Fit a candidate on the metric history and swap it in if it wins
+
+        The served model is scored on the same holdout rows in its own
+        feature columns, which may differ from FEATURE_COLUMNS. An unfitted
+        served model always loses. When its columns are not in the training
+        data it cannot be compared, so nothing is retrained.
+        """
+        if self._running:
+            return None
+        self._running = True
+        try:
+            return await self._retrain(metrics)
+        finally:
+            self._running = False
+
+    async def _retrain(self, metrics: Union[List[APIMetric], MetricBatch]) -> Optional[RetrainingReport]:
+        started_at = datetime.now()
+        loop = asyncio.get_running_loop()
+        data = await loop.run_in_executor(None, self.build_training_set, metrics)
+        current = self._current_model()
+        current_columns = None
+        if current is not None:
+            current_columns = self.model_server.feature_columns(data.drop(columns='target'))
+            if len(current_columns) != current.n_features_in_ or not set(current_columns) <= set(data.columns):
+                logger.warning(
+                    "Skipping retraining: the served model's features %s are not in the training data",
+                    current_columns
+                )
+                return None
+            # Both models are scored on the rows the served one can read
+            data = data.dropna(subset=current_columns)
+        if len(data) < self.min_samples:
+            logger.info("Skipping retraining: %d samples < %d", len(data), self.min_samples)
+            return None
+
+        # Hold out the most recent window so validation looks forward in time
+        data = data.sort_values('timestamp')
+        split = int(len(data) * (1 - self.holdout_fraction))
+        train, holdout = data.iloc[:split], data.iloc[split:]
+
+        # Same hyperparameters as the served model, fitted from scratch
+        candidate = clone(self.model_server.model)
+        X_current = None
+        if current is not None:
+            X_current = holdout[current_columns].astype(np.float64)
+            if getattr(current, 'feature_names_in_', None) is None:
+                X_current = X_current.to_numpy()
+        executor = self.executor or ProcessPoolExecutor(
+            max_workers=1, mp_context=multiprocessing.get_context('spawn')
+        )
+        try:
+            candidate, stats = await loop.run_in_executor(
+                executor, _fit_candidate, candidate, current,
+                train[FEATURE_COLUMNS].to_numpy(dtype=np.float64),
+                train['target'].to_numpy(dtype=np.float64),
+                holdout[FEATURE_COLUMNS].to_numpy(dtype=np.float64),
+                holdout['target'].to_numpy(dtype=np.float64),
+                X_current
+            )
+        finally:
+            if executor is not self.executor:
+                executor.shutdown(wait=False)
+
+        # A candidate that could not be scored never replaces the served model
+        accepted = math.isfinite(stats['candidate_mape']) and (
+            stats['current_mape'] is None or stats['candidate_mape'] < stats['current_mape']
+        )
+        version = None
+        if accepted:
+            window = (train['timestamp'].iloc[0].to_pydatetime(),
+                      train['timestamp'].iloc[-1].to_pydatetime())
+            version = await self._serve(candidate, window)
+
+        report = RetrainingReport(
+            started_at=started_at,
+            training_rows=len(train),
+            holdout_rows=len(holdout),
+            candidate_mape=stats['candidate_mape'],
+            current_mape=stats['current_mape'],
+            accepted=accepted,
+            version=version,
+            training_seconds=stats['training_seconds'],
+            peak_memory_mb=stats['peak_memory_mb']
+        )
+        self.reports.append(report)
+        logger.info(
+            "Retraining %s: candidate MAPE=%.2f%%, current MAPE=%s, "
+            "fit %.2fs, peak memory %.1f MB",
+            "accepted" if accepted else "rejected",
+            report.candidate_mape,
+            "n/a" if report.current_mape is None else f"{report.current_mape:.2f}%",
+            report.training_seconds,
+            report.peak_memory_mb
+        )
+        return report
+
+    def _current_model(self) -> Optional[GradientBoostingRegressor]:
+        """Served model if it is fitted"""
+        model = self.model_server.model
+        return model if hasattr(model, 'estimators_') else None
+
+    async def _serve(self, model: GradientBoostingRegressor,
+                     window: Tuple[datetime, datetime]) -> str:
+        if self.registry is not None:
+            loop = asyncio.get_running_loop()
+            manifest = await loop.run_in_executor(
+                None, self.registry.publish, model, window, FEATURE_COLUMNS
+            )
+            if self.model_server.registry is self.registry:
+                return await self.model_server.swap_version(manifest.version)
+            version = manifest.version
+        else:
+            version = datetime.now().strftime("%Y%m%d_%H%M%S")
+        return await self.model_server.swap_model(model, version, FEATURE_COLUMNS)
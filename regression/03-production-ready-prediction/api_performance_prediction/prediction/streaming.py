@@ -0,0 +1,75 @@
+import math
+import pandas as pd
+from typing import Any, Dict, List, Optional
+from ..domain.models import APIMetric
+from ..domain.rolling import RollingMean
+from .preprocessor import ROLLING_COLUMNS
+
+class StreamingFeatureEngine:
+    """Maintains the latest feature row per endpoint as metrics arrive
+
+    Each endpoint keeps one ring buffer per rolling column, so an update
+    costs the same regardless of history length. Metrics for an endpoint
+    are expected in timestamp order. An endpoint's rows then equal, bit
+    for bit, what the default ``DataPreprocessor.create_feature_vector``
+    gives for that endpoint's metrics alone. Grouped mode sums windows
+    from prefix sums instead, so it agrees with them only to rounding.
+    """
+
+    def __init__(self, window_size: int = 12):  # 1-hour window with 5-min intervals
+        self.window_size = window_size
+        self._rolling: Dict[str, Dict[str, RollingMean]] = {}
+        self._rows: Dict[str, Dict[str, Any]] = {}
+
+    def update(self, metric: APIMetric) -> Dict[str, Any]:
+        """Fold one metric into its endpoint's state and return the new row"""
+        rolling = self._rolling.get(metric.endpoint)
+        if rolling is None:
+            rolling = {col: RollingMean(self.window_size) for col in ROLLING_COLUMNS}
+            self._rolling[metric.endpoint] = rolling
+
+        row = {
+            'timestamp': metric.timestamp,
+            'endpoint': metric.endpoint,
+            'latency_ms': metric.latency_ms,
+            'status_code': metric.status_code,
+            'cpu_usage': metric.cpu_usage,
+            'memory_usage': metric.memory_usage,
+            'request_count': metric.request_count,
+            'error_count': metric.error_count,
+            'error_rate': self._error_rate(metric.error_count, metric.request_count),
+            'hour': metric.timestamp.hour,
+            'day_of_week': metric.timestamp.weekday()
+        }
+        for col in ROLLING_COLUMNS:
+            row[f'{col}_rolling_mean'] = rolling[col].update(float(row[col]))
+
+        self._rows[metric.endpoint] = row
+        return row
+
+    def update_many(self, metrics: List[APIMetric]):
+        for metric in metrics:
+            self.update(metric)
+
+    def current(self, endpoint: str) -> Optional[Dict[str, Any]]:
+        """Latest feature row for an endpoint, None if it has no data yet"""
+        return self._rows.get(endpoint)
+
+    def current_frame(self, endpoints: Optional[List[str]] = None) -> pd.DataFrame:
+        """Latest rows for the given endpoints (all by default) as one frame"""
+        if endpoints is None:
+            endpoints = list(self._rows)
+        return pd.DataFrame([self._rows[e] for e in endpoints if e in self._rows])
+
+    @property
+    def endpoints(self) -> List[str]:
+        return list(self._rows)
+
+    @staticmethod
+    def _error_rate(error_count: int, request_count: int) -> float:
+        """Same result as the pandas division, including zero request counts"""
+        if request_count == 0:
+            if error_count == 0:
+                return math.nan
+            return math.copysign(math.inf, error_count)
+        return error_count / request_count
@@ -0,0 +1,98 @@
+"""Replay recorded latencies with injected shifts through the drift detectors
+
+A seasonal profile (mean latency per endpoint, weekday and hour) fitted on
+the first weeks of api_performance_data.csv plays the model. The rest is
+cut into segments per endpoint, latencies in the second half of each are
+scaled up, and every detector sees the segment's percentage errors from a
+fresh start. Reports false alarms before the shift, detection delay in
+samples after it, and the cost per update, next to the mean-plus-k-sigma
+check ModelMonitor runs without a detector.
+
+Usage: python -m benchmarks.bench_change_detection [--data CSV] [--shift S ...] [--segment N]
+"""
+import argparse
+import time
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+from api_performance_prediction.monitoring.detectors import DETECTORS
+from api_performance_prediction.monitoring.monitor import ModelMonitor
+
+DEFAULT_DATA = Path(__file__).resolve().parents[2] / '01-firefighting-to-forecasting' / 'api_performance_data.csv'
+TRAIN_WEEKS = 4
+
+class KSigma:
+    """ModelMonitor's fleet check applied to one series"""
+
+    def __init__(self):
+        self.monitor = ModelMonitor()
+
+    def update(self, value: float) -> bool:
+        self.monitor.historical_mapes.append(value)
+        return self.monitor._check_drift()
+
+def segments(data: pd.DataFrame, length: int):
+    """Latency and profile prediction of each replayed segment"""
+    data = data.assign(weekday=data['timestamp'].dt.dayofweek, hour=data['timestamp'].dt.hour)
+    split = data['timestamp'].min() + pd.Timedelta(weeks=TRAIN_WEEKS)
+    train, replay = data[data['timestamp'] < split], data[data['timestamp'] >= split]
+    profile = train.groupby(['endpoint', 'weekday', 'hour'])['latency_ms'].mean().rename('predicted')
+    replay = replay.join(profile, on=['endpoint', 'weekday', 'hour'])
+    for _, group in replay.groupby('endpoint', sort=True):
+        latency = group['latency_ms'].to_numpy()
+        predicted = group['predicted'].to_numpy()
+        for start in range(0, len(latency) - length + 1, length):
+            yield latency[start:start + length], predicted[start:start + length]
+
+def replay(factory, series, shift_at: int):
+    """False alarms, delays and nanoseconds per update over the segments"""
+    false_alarms, delays, missed = 0, [], 0
+    elapsed, updates = 0, 0
+    for errors in series:
+        detector = factory()
+        alarm = -1
+        start = time.perf_counter_ns()
+        for i, error in enumerate(errors.tolist()):
+            if detector.update(error):
+                alarm = i
+                break
+        elapsed += time.perf_counter_ns() - start
+        updates += len(errors) if alarm < 0 else alarm + 1
+        if alarm < 0:
+            missed += 1
+        elif alarm < shift_at:
+            false_alarms += 1
+        else:
+            delays.append(alarm - shift_at)
+    return false_alarms, delays, missed, elapsed / max(updates, 1)
+
+def run(path: Path, shifts, length: int):
+    data = pd.read_csv(path, parse_dates=['timestamp'])
+    cuts = list(segments(data, length))
+    shift_at = length // 2
+    detectors = {**DETECTORS, 'k_sigma': KSigma}
+    print(f"{len(cuts)} segments of {length} samples, shift after {shift_at}, "
+          f"profile fitted on {TRAIN_WEEKS} weeks")
+    for shift in shifts:
+        series = []
+        for latency, predicted in cuts:
+            actual = latency.copy()
+            actual[shift_at:] *= 1 + shift
+            series.append(np.abs(predicted - actual) / actual * 100)
+        before = np.mean([errors[:shift_at].mean() for errors in series])
+        after = np.mean([errors[shift_at:].mean() for errors in series])
+        print(f"latency +{shift:.0%}  (MAPE {before:.1f}% before the shift, {after:.1f}% after)")
+        for name, factory in detectors.items():
+            false_alarms, delays, missed, ns = replay(factory, series, shift_at)
+            delay = f"{np.median(delays):6.0f} / {np.percentile(delays, 90):6.0f}" if delays else f"{'-':>6s} / {'-':>6s}"
+            print(f"  {name:13s} false alarms {false_alarms:3d}  missed {missed:3d}  "
+                  f"delay p50/p90 {delay} samples  {ns:7.0f} ns/update")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--data', type=Path, default=DEFAULT_DATA)
+    parser.add_argument('--shift', type=float, nargs='+', default=[0.1, 0.25, 0.5])
+    parser.add_argument('--segment', type=int, default=2000)
+    args = parser.parse_args()
+    run(args.data, args.shift, args.segment)
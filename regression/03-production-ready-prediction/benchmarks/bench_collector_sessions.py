@@ -0,0 +1,113 @@
+"""Benchmark connection reuse in MetricsCollector against local aiohttp servers
+
+Compares a fresh session per cycle (the old behaviour) with the
+collector's pooled session.
+
+Usage: python -m benchmarks.bench_collector_sessions [--endpoints N] [--hosts N] [--cycles N]
+"""
+import argparse
+import asyncio
+import time
+import numpy as np
+import aiohttp
+from aiohttp import web
+
+from api_performance_prediction.collection.collector import MetricsCollector
+
+PAYLOAD = {
+    "latency_ms": 150.0,
+    "cpu_usage": 45.0,
+    "memory_usage": 75.0,
+    "request_count": 1000,
+    "error_count": 5
+}
+
+async def start_servers(n_hosts: int):
+    """One aiohttp server per host"""
+    async def metrics_handler(request):
+        return web.json_response(PAYLOAD)
+
+    app = web.Application()
+    app.router.add_get('/{endpoint}/metrics', metrics_handler)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    ports = []
+    for _ in range(n_hosts):
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        ports.append(site._server.sockets[0].getsockname()[1])
+    return runner, ports
+
+def scrape_tracer(latencies: list, counts: dict) -> aiohttp.TraceConfig:
+    """Record the wall time of every request and new vs reused connections"""
+    async def on_request_start(session, context, params):
+        context.start = time.perf_counter()
+
+    async def on_request_end(session, context, params):
+        latencies.append(time.perf_counter() - context.start)
+
+    async def on_connection_create_end(session, context, params):
+        counts['created'] += 1
+
+    async def on_connection_reuseconn(session, context, params):
+        counts['reused'] += 1
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_request_end.append(on_request_end)
+    trace_config.on_connection_create_end.append(on_connection_create_end)
+    trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+    return trace_config
+
+async def run_mode(endpoints, cycles: int, pooled: bool):
+    latencies = []
+    counts = {'created': 0, 'reused': 0}
+    collector = MetricsCollector(
+        endpoints,
+        connection_limit=100,
+        connection_limit_per_host=10,
+        trace_configs=[scrape_tracer(latencies, counts)]
+    )
+    cycle_times = []
+    for cycle in range(cycles):
+        if cycle == 1:
+            # The first cycle opens the pool in both modes, report steady state
+            latencies.clear()
+            counts.update(created=0, reused=0)
+        start = time.perf_counter()
+        batch = await collector.collect_batch()
+        cycle_times.append(time.perf_counter() - start)
+        assert len(batch) == len(endpoints)
+        if not pooled:
+            await collector.close()
+    await collector.close()
+
+    steady_cycles = cycles - 1
+    label = "pooled session" if pooled else "session per cycle"
+    print(f"  {label}:")
+    print(f"    cycle time      median {np.median(cycle_times[1:]) * 1e3:8.1f} ms")
+    print(f"    scrape latency  p50 {np.percentile(latencies, 50) * 1e3:6.2f} ms, "
+          f"p99 {np.percentile(latencies, 99) * 1e3:6.2f} ms")
+    print(f"    connections per cycle: {counts['created'] / steady_cycles:.0f} new, "
+          f"{counts['reused'] / steady_cycles:.0f} reused")
+
+async def run(n_endpoints: int, n_hosts: int, cycles: int):
+    runner, ports = await start_servers(n_hosts)
+    endpoints = [
+        f"http://127.0.0.1:{ports[i % n_hosts]}/ep{i}" for i in range(n_endpoints)
+    ]
+    print(f"collector sessions: {n_endpoints} endpoints on {n_hosts} hosts, "
+          f"{cycles} cycles")
+    try:
+        await run_mode(endpoints, cycles, pooled=False)
+        await run_mode(endpoints, cycles, pooled=True)
+    finally:
+        await runner.cleanup()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--endpoints', type=int, default=1000)
+    parser.add_argument('--hosts', type=int, default=10)
+    parser.add_argument('--cycles', type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(run(args.endpoints, args.hosts, args.cycles))
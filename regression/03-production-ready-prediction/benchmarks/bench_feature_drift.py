@@ -0,0 +1,49 @@
+"""Benchmark the feature drift monitor next to the feature building it watches
+
+Every pass builds features over the last 24 samples of every endpoint,
+as the prediction loop does, after one new sample per endpoint. The
+monitor is fed the resulting frame and counts only the new rows, then
+scores the endpoints it touched when drifted() is read.
+
+Usage: python -m benchmarks.bench_feature_drift [--endpoints N ...] [--passes P]
+"""
+import argparse
+import time
+import numpy as np
+
+from api_performance_prediction.monitoring.feature_drift import FeatureDriftMonitor
+from api_performance_prediction.prediction.preprocessor import DataPreprocessor
+from .bench_loop_lag import build_store
+
+def run(sizes, passes: int):
+    print(f"feature drift: median of {passes} passes, 24 samples per endpoint each")
+    for n in sizes:
+        store = build_store(n, np.random.default_rng(0))
+        preprocessor = DataPreprocessor(grouped=True)
+        # A short reference, so the passes below run against a full one
+        monitor = FeatureDriftMonitor(n, reference_size=12, live_size=48)
+        monitor.update(preprocessor.create_feature_vector(store.recent(24)))
+        build, update, score = [], [], []
+        for cycle in range(passes):
+            batch = store.recent(24)
+            batch.timestamp[:] += np.timedelta64(5 * (cycle + 1), 'm')  # One newer sample per endpoint
+            start = time.perf_counter()
+            features = preprocessor.create_feature_vector(batch)
+            built = time.perf_counter()
+            monitor.update(features)
+            updated = time.perf_counter()
+            monitor.drifted()
+            build.append(built - start)
+            update.append(updated - built)
+            score.append(time.perf_counter() - updated)
+        build_ms, update_ms, score_ms = (np.median(t) * 1000 for t in (build, update, score))
+        print(f"  {n:>6,} endpoints  create_feature_vector {build_ms:7.2f} ms  "
+              f"update {update_ms:6.2f} ms ({update_ms / build_ms:.0%})  drifted {score_ms:6.2f} ms  "
+              f"state {sum(a.nbytes for a in vars(monitor).values() if isinstance(a, np.ndarray)) / 2**20:5.1f} MiB")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--endpoints', type=int, nargs='+', default=[100, 2000])
+    parser.add_argument('--passes', type=int, default=20)
+    args = parser.parse_args()
+    run(args.endpoints, args.passes)
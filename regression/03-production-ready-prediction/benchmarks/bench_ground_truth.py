@@ -0,0 +1,98 @@
+"""Benchmark joining tracked predictions with a pass of new actuals
+
+Each pass tracks one prediction per endpoint and joins the last 24
+samples of every endpoint, as the orchestrator does. Compares the bulk
+join of PendingPredictions with a dict of pending predictions searched
+one prediction at a time.
+
+Usage: python -m benchmarks.bench_ground_truth [--endpoints N ...] [--passes P]
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+import numpy as np
+
+from api_performance_prediction.collection.store import MetricStore
+from api_performance_prediction.domain.models import MetricBatch, PredictionResult, endpoint_code_dtype
+from api_performance_prediction.monitoring.ground_truth import PendingPredictions
+
+INTERVAL = 300.0
+START = datetime(2024, 1, 1)
+
+def cycle_batch(endpoints, cycle: int, rng) -> MetricBatch:
+    n = len(endpoints)
+    jitter = rng.uniform(-30, 30, n) * 1e6
+    return MetricBatch(
+        timestamp=np.datetime64(START, 'us') + np.timedelta64(int(cycle * INTERVAL * 1e6), 'us')
+        + jitter.astype('timedelta64[us]'),
+        endpoint_code=np.arange(n, dtype=endpoint_code_dtype(n)),
+        latency_ms=rng.uniform(50, 200, n),
+        status_code=np.full(n, 200, dtype=np.int16),
+        cpu_usage=np.full(n, 45.0),
+        memory_usage=np.full(n, 75.0),
+        request_count=np.full(n, 1000, dtype=np.int64),
+        error_count=np.zeros(n, dtype=np.int64),
+        endpoints=tuple(endpoints)
+    )
+
+def predictions_for(endpoints, cycle: int, rng):
+    timestamp = START + timedelta(seconds=cycle * INTERVAL)
+    return [
+        PredictionResult(timestamp, endpoint, float(value), (0.0, 0.0), {}, "bench")
+        for endpoint, value in zip(endpoints, rng.uniform(50, 200, len(endpoints)))
+    ]
+
+def naive_join(pending: dict, batch: MetricBatch) -> list:
+    """Per-prediction search over each endpoint's rows, kept for comparison"""
+    rows = {}
+    for code, timestamp, latency in zip(
+        batch.endpoint_code.tolist(), batch.timestamp.tolist(), batch.latency_ms.tolist()
+    ):
+        rows.setdefault(batch.endpoints[code], []).append((timestamp, latency))
+    tolerance = timedelta(seconds=INTERVAL / 2)
+    errors = []
+    for key in list(pending):
+        endpoint, target = key
+        for timestamp, latency in rows.get(endpoint, ()):
+            if abs(timestamp - target) <= tolerance:
+                errors.append(abs(pending.pop(key) - latency) / latency * 100)
+                break
+    return errors
+
+def run(sizes, passes: int):
+    print(f"ground truth join: {passes} passes over the last 24 samples of every endpoint")
+    for n in sizes:
+        rng = np.random.default_rng(0)
+        endpoints = [f"http://api{i}.example.com" for i in range(n)]
+        store = MetricStore(endpoints, capacity=24)
+        for cycle in range(24):
+            store.append_batch(cycle_batch(endpoints, cycle, rng))
+
+        pending = PendingPredictions()
+        horizons = np.full(n, INTERVAL)
+        bulk, matched = 0.0, 0
+        naive_pending, naive, naive_matched = {}, 0.0, 0
+        for cycle in range(24, 24 + passes):
+            predictions = predictions_for(endpoints, cycle - 1, rng)
+            store.append_batch(cycle_batch(endpoints, cycle, rng))
+            batch = store.recent(24)
+
+            start = time.perf_counter()
+            matched += pending.join(batch).matched
+            pending.add(predictions, horizons, horizons / 2)
+            bulk += time.perf_counter() - start
+
+            start = time.perf_counter()
+            naive_matched += len(naive_join(naive_pending, batch))
+            for p in predictions:
+                naive_pending[(p.endpoint, p.timestamp + timedelta(seconds=INTERVAL))] = p.predicted_latency
+            naive += time.perf_counter() - start
+        print(f"  {n:>6,} endpoints  bulk {bulk / passes * 1000:7.2f} ms/pass ({matched:,} matched)  "
+              f"per-prediction {naive / passes * 1000:7.2f} ms/pass ({naive_matched:,} matched)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--endpoints', type=int, nargs='+', default=[100, 2000])
+    parser.add_argument('--passes', type=int, default=20)
+    args = parser.parse_args()
+    run(args.endpoints, args.passes)
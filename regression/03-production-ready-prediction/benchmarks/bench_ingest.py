@@ -0,0 +1,110 @@
+"""Load test for push ingestion against a local IngestServer
+
+Client processes post pre-encoded batches as fast as the server accepts
+them, backing off on 429, and the server's written sample count gives the
+sustained ingest rate.
+
+Usage: python -m benchmarks.bench_ingest [--format json|binary] [--batch N] [--clients N] [--processes N] [--seconds S]
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import time
+from datetime import datetime, timedelta
+import numpy as np
+import aiohttp
+
+from api_performance_prediction.collection.codec import encode_batch
+from api_performance_prediction.collection.ingest import IngestServer
+from api_performance_prediction.collection.store import MetricStore
+from api_performance_prediction.domain.models import MetricBatch
+
+N_ENDPOINTS = 1000
+
+def make_payload(fmt: str, batch_size: int):
+    rng = np.random.default_rng(0)
+    codes = np.arange(batch_size) % N_ENDPOINTS
+    start = datetime(2024, 1, 1)
+    endpoints = [f"http://10.0.{i // 256}.{i % 256}/api" for i in range(N_ENDPOINTS)]
+    batch = MetricBatch.from_columns(
+        endpoints,
+        endpoint_code=codes,
+        timestamp=[start + timedelta(seconds=int(i)) for i in range(batch_size)],
+        latency_ms=rng.gamma(2.0, 75.0, batch_size),
+        status_code=np.full(batch_size, 200),
+        cpu_usage=rng.uniform(0, 100, batch_size),
+        memory_usage=rng.uniform(0, 100, batch_size),
+        request_count=rng.integers(0, 5000, batch_size),
+        error_count=rng.integers(0, 50, batch_size)
+    )
+    if fmt == 'binary':
+        return encode_batch(batch), 'application/octet-stream', endpoints
+    records = [
+        {**m.__dict__, 'timestamp': m.timestamp.isoformat()}
+        for m in batch.to_metrics()
+    ]
+    return json.dumps(records).encode(), 'application/json', endpoints
+
+async def client_load(url: str, fmt: str, batch_size: int, clients: int, seconds: float):
+    body, content_type, _ = make_payload(fmt, batch_size)
+    latencies, throttled = [], 0
+    deadline = time.perf_counter() + seconds
+
+    async def client(session):
+        nonlocal throttled
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            async with session.post(url, data=body, headers={'Content-Type': content_type}) as response:
+                await response.read()
+                if response.status == 429:
+                    throttled += 1
+                    await asyncio.sleep(0.01)
+                    continue
+                latencies.append(time.perf_counter() - start)
+
+    async with aiohttp.ClientSession() as session:
+        await asyncio.gather(*(client(session) for _ in range(clients)))
+    return latencies, throttled
+
+def client_process(args):
+    return asyncio.run(client_load(*args))
+
+async def run(fmt: str, batch_size: int, clients: int, processes: int, seconds: float):
+    _, _, endpoints = make_payload(fmt, 1)
+    server = IngestServer(MetricStore(endpoints, capacity=1000), port=0)
+    await server.start()
+    port = server._runner.addresses[0][1]
+    url = f"http://127.0.0.1:{port}/ingest"
+
+    loop = asyncio.get_running_loop()
+    ctx = multiprocessing.get_context('spawn')
+    start = time.perf_counter()
+    with ctx.Pool(processes) as pool:
+        results = await loop.run_in_executor(
+            None, pool.map, client_process,
+            [(url, fmt, batch_size, clients, seconds)] * processes
+        )
+    await server.stop()
+    elapsed = time.perf_counter() - start
+
+    latencies = np.concatenate([np.array(r[0]) for r in results]) * 1e3
+    throttled = sum(r[1] for r in results)
+    written = server.stats.written_samples
+    print(f"push ingestion: {fmt}, {batch_size} samples per batch, "
+          f"{processes}x{clients} clients, {seconds:.0f}s")
+    print(f"  sustained ingest  {written / seconds:12,.0f} samples/s "
+          f"({written:,} samples, {elapsed:.1f}s wall incl. startup)")
+    print(f"  batches accepted  {server.stats.accepted_batches:,}, throttled (429) {throttled:,}")
+    print(f"  request latency   p50 {np.percentile(latencies, 50):.2f} ms, "
+          f"p99 {np.percentile(latencies, 99):.2f} ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--format', choices=['json', 'binary'], default='binary')
+    parser.add_argument('--batch', type=int, default=1000)
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--processes', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=5.0)
+    args = parser.parse_args()
+    asyncio.run(run(args.format, args.batch, args.clients, args.processes, args.seconds))
@@ -0,0 +1,84 @@
+"""Benchmark the overhead of stage instrumentation on prediction passes
+
+Times the span and counter primitives, then runs the same inline
+prediction passes with and without an Instrumentation attached.
+
+Usage: python -m benchmarks.bench_instrumentation [--endpoints N] [--passes P]
+"""
+import argparse
+import asyncio
+import time
+import numpy as np
+from sklearn.ensemble import GradientBoostingRegressor
+
+from api_performance_prediction.monitoring.instrumentation import Instrumentation
+from api_performance_prediction.monitoring.monitor import ModelMonitor
+from api_performance_prediction.prediction.model import ModelServer
+from api_performance_prediction.prediction.offload import PredictionStage
+from api_performance_prediction.prediction.preprocessor import DataPreprocessor
+from benchmarks.bench_loop_lag import build_store
+
+def primitive_costs(n: int = 200000):
+    instrumentation = Instrumentation(max_endpoints=1000)
+    start = time.perf_counter()
+    for _ in range(n):
+        with instrumentation.span('stage'):
+            pass
+    span_ns = (time.perf_counter() - start) / n * 1e9
+    codes = np.arange(1000)
+    start = time.perf_counter()
+    for _ in range(n // 100):
+        instrumentation.count('predictions', codes)
+    count_ns = (time.perf_counter() - start) / (n // 100) * 1e9
+    print(f"  span {span_ns:,.0f} ns, count over 1000 endpoints {count_ns:,.0f} ns")
+
+async def run_passes(store, server, passes: int, instrumentation) -> list:
+    stage = PredictionStage(DataPreprocessor(grouped=True), server, 'inline',
+                            instrumentation=instrumentation)
+    monitor = ModelMonitor()
+    codes = np.arange(len(store.endpoints))
+    seconds = []
+    for _ in range(passes):
+        begin = time.perf_counter_ns()
+        batch = store.recent(24)
+        predictions = await stage.predict(batch)
+        horizons = np.full(len(predictions), 300.0)
+        await stage.evaluate(monitor, predictions, batch, horizons, horizons / 2)
+        if instrumentation is not None:
+            instrumentation.count('predictions', codes)
+            instrumentation.stage('pass').record_ns(time.perf_counter_ns() - begin, len(codes))
+        seconds.append((time.perf_counter_ns() - begin) / 1e9)
+    return seconds
+
+def run(n_endpoints: int, passes: int):
+    store = build_store(n_endpoints, np.random.default_rng(0))
+    features = DataPreprocessor(grouped=True).create_feature_vector(store.history())
+    columns = list(features.select_dtypes(include='number').columns)
+    server = ModelServer()
+    server.model = GradientBoostingRegressor(n_estimators=100, random_state=0).fit(
+        features[columns], features['latency_ms']
+    )
+    print(f"instrumentation: {n_endpoints} endpoints, {passes} passes")
+    primitive_costs()
+
+    # Interleave the two runs so drift affects both alike
+    off, on = [], []
+    instrumentation = Instrumentation(store.max_endpoints)
+    for _ in range(5):
+        off += asyncio.run(run_passes(store, server, passes, None))
+        on += asyncio.run(run_passes(store, server, passes, instrumentation))
+    off_s, on_s = np.median(off), np.median(on)
+    print(f"  disabled {off_s * 1000:8.2f} ms/pass median")
+    print(f"  enabled  {on_s * 1000:8.2f} ms/pass median  ({(on_s / off_s - 1) * 100:+.2f}%)")
+    summary = instrumentation.snapshot()['stages']
+    for name in ('preprocess', 'predict', 'monitor', 'pass'):
+        stats = summary[name]
+        print(f"    {name:10s} p50 {stats['p50'] * 1000:7.2f} ms  p99 {stats['p99'] * 1000:7.2f} ms  "
+              f"p999 {stats['p999'] * 1000:7.2f} ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--endpoints', type=int, default=2000)
+    parser.add_argument('--passes', type=int, default=10)
+    args = parser.parse_args()
+    run(args.endpoints, args.passes)
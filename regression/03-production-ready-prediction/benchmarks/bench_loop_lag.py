@@ -0,0 +1,82 @@
+"""Benchmark event loop lag while prediction passes run inline, on threads or on processes
+
+A LoopLagMonitor probe stands in for scrape timers. Each pass builds
+features and predicts for every endpoint while the probe measures how
+late the loop wakes it.
+
+Usage: python -m benchmarks.bench_loop_lag [--endpoints N] [--passes P] [--workers W]
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta
+import numpy as np
+from sklearn.ensemble import GradientBoostingRegressor
+
+from api_performance_prediction.collection.store import MetricStore
+from api_performance_prediction.domain.models import MetricBatch
+from api_performance_prediction.monitoring.loop_lag import LoopLagMonitor
+from api_performance_prediction.monitoring.monitor import ModelMonitor
+from api_performance_prediction.prediction.model import ModelServer
+from api_performance_prediction.prediction.offload import MODES, PredictionStage
+from api_performance_prediction.prediction.preprocessor import DataPreprocessor
+
+def build_store(n_endpoints: int, rng) -> MetricStore:
+    endpoints = [f"http://10.0.{i // 256}.{i % 256}/api" for i in range(n_endpoints)]
+    store = MetricStore(endpoints, capacity=24)
+    start = datetime(2024, 1, 1)
+    for cycle in range(24):
+        store.append_batch(MetricBatch.from_columns(
+            endpoints,
+            endpoint_code=np.arange(n_endpoints),
+            timestamp=np.full(n_endpoints, np.datetime64(start + timedelta(minutes=5 * cycle), 'us')),
+            latency_ms=rng.gamma(2.0, 75.0, n_endpoints),
+            status_code=np.full(n_endpoints, 200),
+            cpu_usage=rng.uniform(0, 100, n_endpoints),
+            memory_usage=rng.uniform(0, 100, n_endpoints),
+            request_count=rng.integers(100, 5000, n_endpoints),
+            error_count=rng.integers(0, 50, n_endpoints)
+        ))
+    return store
+
+async def run_mode(mode: str, store: MetricStore, server: ModelServer, passes: int, workers: int):
+    stage = PredictionStage(DataPreprocessor(grouped=True), server, mode, workers)
+    monitor = ModelMonitor()
+    lag = LoopLagMonitor(interval=0.01, warn_threshold=None)
+    # Warm the pools so worker start-up is not counted
+    await stage.predict(store.recent(24, np.arange(2)))
+    lag.start()
+    start = time.perf_counter()
+    for _ in range(passes):
+        batch = store.recent(24)
+        predictions = await stage.predict(batch)
+        horizons = np.full(len(predictions), 300.0)
+        await stage.evaluate(monitor, predictions, batch, horizons, horizons / 2)
+        await asyncio.sleep(0)  # The orchestrator yields between passes too
+    seconds = time.perf_counter() - start
+    await lag.stop()
+    stage.shutdown()
+    summary = lag.summary()
+    print(f"  {mode:8s} {seconds / passes * 1000:8.1f} ms/pass  loop lag p50 {summary['p50'] * 1000:6.1f} ms"
+          f"  p99 {summary['p99'] * 1000:6.1f} ms  max {summary['max'] * 1000:6.1f} ms")
+
+def run(n_endpoints: int, passes: int, workers: int):
+    store = build_store(n_endpoints, np.random.default_rng(0))
+    preprocessor = DataPreprocessor(grouped=True)
+    features = preprocessor.create_feature_vector(store.history())
+    columns = list(features.select_dtypes(include='number').columns)
+    server = ModelServer()
+    server.model = GradientBoostingRegressor(n_estimators=100, random_state=0).fit(
+        features[columns], features['latency_ms']
+    )
+    print(f"loop lag: {n_endpoints} endpoints x 24 samples per pass, {passes} passes")
+    for mode in MODES:
+        asyncio.run(run_mode(mode, store, server, passes, workers))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--endpoints', type=int, default=2000)
+    parser.add_argument('--passes', type=int, default=10)
+    parser.add_argument('--workers', type=int, default=1)
+    args = parser.parse_args()
+    run(args.endpoints, args.passes, args.workers)
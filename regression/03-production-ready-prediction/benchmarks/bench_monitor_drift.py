@@ -0,0 +1,49 @@
+"""Benchmark the per-evaluation cost of the drift check as history grows
+
+Compares the streaming statistics ModelMonitor keeps with the previous
+mean and std over a growing list of every MAPE.
+
+Usage: python -m benchmarks.bench_monitor_drift [--history N ...] [--calls C]
+"""
+import argparse
+import time
+import numpy as np
+
+from api_performance_prediction.monitoring.monitor import ModelMonitor
+
+def legacy_check(history, window_size, drift_threshold):
+    recent = np.mean(history[-window_size:])
+    baseline = np.mean(history[:-window_size])
+    return recent > baseline + drift_threshold * np.std(history)
+
+def run(sizes, calls: int):
+    rng = np.random.default_rng(0)
+    print(f"drift check: {calls} evaluations after each history size")
+    for size in sizes:
+        mapes = rng.gamma(4.0, 2.0, size + calls).tolist()
+        monitor = ModelMonitor()
+        history = []
+        for mape in mapes[:size]:
+            monitor.historical_mapes.append(mape)
+            history.append(mape)
+
+        start = time.perf_counter()
+        for mape in mapes[size:]:
+            history.append(mape)
+            legacy_check(history, monitor.window_size, monitor.drift_threshold)
+        legacy = (time.perf_counter() - start) / calls
+
+        start = time.perf_counter()
+        for mape in mapes[size:]:
+            monitor.historical_mapes.append(mape)
+            monitor._check_drift()
+        streaming = (time.perf_counter() - start) / calls
+        print(f"  {size:>9,} MAPEs  list {legacy * 1e6:10.1f} us/call  "
+              f"streaming {streaming * 1e6:6.2f} us/call  ({legacy / streaming:,.0f}x)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--history', type=int, nargs='+', default=[1000, 100000, 1000000])
+    parser.add_argument('--calls', type=int, default=200)
+    args = parser.parse_args()
+    run(args.history, args.calls)
@@ -0,0 +1,75 @@
+"""Benchmark per-row PredictionResult lists against a columnar PredictionBatch
+
+ModelServer.predict and predict_batch score the same feature frame, the
+difference is what they hand back. Reports the time per call, the memory
+the result keeps alive and the cost of tracking it for ground truth.
+
+Usage: python -m benchmarks.bench_prediction_batch [--rows N ...] [--features F] [--repeat R]
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import GradientBoostingRegressor
+
+from api_performance_prediction.monitoring.ground_truth import PendingPredictions
+from api_performance_prediction.prediction.model import ModelServer
+
+def build_features(n_rows: int, n_features: int, rng) -> pd.DataFrame:
+    """Newest row of n_rows endpoints, as the prediction loop scores them"""
+    frame = pd.DataFrame(
+        rng.uniform(0, 100, (n_rows, n_features)), columns=[f"f{i}" for i in range(n_features)]
+    )
+    frame.insert(0, 'endpoint', [f"http://10.0.{i // 256}.{i % 256}/api" for i in range(n_rows)])
+    frame.insert(0, 'timestamp', pd.Timestamp('2024-01-01') + pd.to_timedelta(np.arange(n_rows), 's'))
+    return frame
+
+def retained(make) -> float:
+    """MiB still allocated by make()'s result once it returns"""
+    gc.collect()
+    tracemalloc.start()
+    result = make()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size / 2**20
+
+def timed(call, repeat: int) -> float:
+    """Median milliseconds per call"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times)) * 1000
+
+def run(sizes, n_features: int, repeat: int):
+    rng = np.random.default_rng(0)
+    server = ModelServer(backend='compiled')
+    X = rng.uniform(0, 100, (500, n_features))
+    server.model = GradientBoostingRegressor(n_estimators=50, max_depth=3).fit(X, X[:, 0] * 2 + 100)
+    print(f"prediction results: {n_features} features, 50 trees, median of {repeat} calls")
+    for n in sizes:
+        features = build_features(n, n_features, rng)
+        horizons = np.full(n, 300.0)
+        lists = server.predict(features)
+        batch = server.predict_batch(features)
+        results = {
+            'list': (lambda: server.predict(features), lists),
+            'batch': (lambda: server.predict_batch(features), batch)
+        }
+        for name, (predict, predictions) in results.items():
+            predict_ms = timed(predict, repeat)
+            track_ms = timed(lambda: PendingPredictions().add(predictions, horizons, horizons / 2), repeat)
+            print(f"  {n:>7,} rows  {name:5s}  predict {predict_ms:8.2f} ms  "
+                  f"retained {retained(predict):7.2f} MiB  track {track_ms:6.2f} ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, nargs='+', default=[2000, 20000])
+    parser.add_argument('--features', type=int, default=14)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    run(args.rows, args.features, args.repeat)
@@ -0,0 +1,92 @@
+"""Benchmark extracting the mapped families from multi-megabyte Prometheus scrapes
+
+Compares the selective parser, fed whole and in collector-sized chunks,
+with a plain line-by-line parse of every sample.
+
+Usage: python -m benchmarks.bench_prometheus_parser [--series N] [--repeat R]
+"""
+import argparse
+import re
+import time
+import numpy as np
+
+from api_performance_prediction.collection.collector import PROMETHEUS_CHUNK_SIZE
+from api_performance_prediction.collection.prometheus import PrometheusMapper, parse_exposition
+
+SAMPLE = re.compile(rb'^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(.*)\})?\s+(\S+)')
+LABEL = re.compile(rb'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"')
+
+def build_body(n_series: int, rng) -> bytes:
+    """A large exposition, mostly families the mapping does not use"""
+    lines = []
+    for status in ('200', '404', '500', '503'):
+        lines.append(f'http_requests_total{{method="GET",status="{status}"}} {rng.integers(1, 10**6)}')
+    lines += ['http_request_duration_seconds_sum 1234.5', 'http_request_duration_seconds_count 98765',
+              'process_cpu_usage 0.42', 'process_memory_usage 0.73']
+    for family in range(n_series // 100):
+        lines.append(f'# HELP app_family_{family}_seconds Unrelated application metric')
+        lines.append(f'# TYPE app_family_{family}_seconds histogram')
+        for le in range(100):
+            lines.append(f'app_family_{family}_seconds_bucket{{handler="/api/v1/items/{le}",'
+                         f'le="{le * 0.01:.2f}"}} {rng.integers(0, 10**6)}')
+    rng.shuffle(lines)
+    return ('\n'.join(lines) + '\n').encode()
+
+def parse_every_line(body: bytes, selectors):
+    """Baseline: split, match and label-parse every sample line"""
+    totals = {selector: 0.0 for selector in selectors}
+    for line in body.split(b'\n'):
+        if not line or line.startswith(b'#'):
+            continue
+        match = SAMPLE.match(line)
+        if match is None:
+            continue
+        name, labels, value = match.groups()
+        labels = dict(LABEL.findall(labels)) if labels else {}
+        name = name.decode()
+        for selector in selectors:
+            if selector.name == name and all(
+                re.fullmatch(pattern, labels.get(key.encode(), b'').decode())
+                for key, pattern in selector.labels
+            ):
+                totals[selector] += float(value)
+    return totals
+
+def timed(fn, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def run(n_series: int, repeat: int):
+    body = build_body(n_series, np.random.default_rng(0))
+    mb = len(body) / 2**20
+    mapper = PrometheusMapper()
+    lines = body.count(b'\n')
+    print(f"prometheus parser: {mb:.1f} MB body, {lines:,} lines, "
+          f"{len(mapper.selectors)} selectors")
+
+    def chunked():
+        parser = mapper.parser()
+        for start in range(0, len(body), PROMETHEUS_CHUNK_SIZE):
+            parser.feed(body[start:start + PROMETHEUS_CHUNK_SIZE])
+        return parser.close()
+
+    expected = parse_every_line(body, mapper.selectors)
+    assert parse_exposition(body, mapper.selectors) == expected
+    assert chunked() == expected
+
+    for label, fn in [("every line", lambda: parse_every_line(body, mapper.selectors)),
+                      ("selective", lambda: parse_exposition(body, mapper.selectors)),
+                      ("selective, chunked", chunked)]:
+        seconds = timed(fn, repeat)
+        print(f"  {label:20s} {seconds * 1000:8.1f} ms  {mb / seconds:8.0f} MB/s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--series', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    run(args.series, args.repeat)
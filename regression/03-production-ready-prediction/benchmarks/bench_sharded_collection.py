@@ -0,0 +1,90 @@
+"""Benchmark scrape throughput of ShardedCollector as workers are added
+
+Endpoint servers run in their own process, so the collector side is what
+is measured. Throughput can only grow with workers while there are idle
+cores for them to use.
+
+Usage: python -m benchmarks.bench_sharded_collection [--endpoints N] [--hosts N] [--workers 1,2,4] [--seconds S]
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import time
+from aiohttp import web
+
+from api_performance_prediction.collection.collector import MetricsCollector
+from api_performance_prediction.collection.sharding import ShardedCollector
+
+PAYLOAD = {
+    "latency_ms": 150.0,
+    "cpu_usage": 45.0,
+    "memory_usage": 75.0,
+    "request_count": 1000,
+    "error_count": 5
+}
+
+def serve(ports, ready):
+    async def main():
+        async def metrics_handler(request):
+            return web.json_response(PAYLOAD)
+
+        app = web.Application()
+        app.router.add_get('/{endpoint}/metrics', metrics_handler)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        for port in ports:
+            await web.TCPSite(runner, '127.0.0.1', port, reuse_port=True).start()
+        ready.set()
+        await asyncio.Event().wait()
+
+    asyncio.run(main())
+
+async def measure(collector: MetricsCollector, counted: list, seconds: float, warmup: float) -> float:
+    task = asyncio.create_task(collector.start_collection())
+    await asyncio.sleep(warmup)
+    start_samples, start = counted[0], time.perf_counter()
+    await asyncio.sleep(seconds)
+    rate = (counted[0] - start_samples) / (time.perf_counter() - start)
+    await collector.stop()
+    await task
+    return rate
+
+def run(n_endpoints: int, n_hosts: int, workers, seconds: float):
+    ports = list(range(18100, 18100 + n_hosts))
+    ctx = multiprocessing.get_context('spawn')
+    ready = ctx.Event()
+    servers = [ctx.Process(target=serve, args=(ports, ready), daemon=True)
+               for _ in range(max(1, (os.cpu_count() or 1) // 2))]
+    for server in servers:
+        server.start()
+    ready.wait()
+    endpoints = [f"http://127.0.0.1:{ports[i % n_hosts]}/ep{i}" for i in range(n_endpoints)]
+    print(f"sharded collection: {n_endpoints} endpoints on {n_hosts} ports, "
+          f"{os.cpu_count()} cores")
+    try:
+        for n_workers in workers:
+            counted = [0]
+            
+            def count(batch):
+                counted[0] += len(batch)
+            
+            # A short interval keeps the collector saturated, so the rate is its capacity
+            collector = ShardedCollector(
+                endpoints, n_workers, collection_interval=1,
+                history_size=16, request_timeout=30, on_batch=count
+            )
+            rate = asyncio.run(measure(collector, counted, seconds, warmup=3.0))
+            print(f"  {n_workers} workers: {rate:10,.0f} samples/s")
+    finally:
+        for server in servers:
+            server.terminate()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--endpoints', type=int, default=5000)
+    parser.add_argument('--hosts', type=int, default=10)
+    parser.add_argument('--workers', default='1,2,4')
+    parser.add_argument('--seconds', type=float, default=5.0)
+    args = parser.parse_args()
+    run(args.endpoints, args.hosts, [int(w) for w in args.workers.split(',')], args.seconds)
@@ -0,0 +1,74 @@
+"""Benchmark writing a day of collected metrics to the log and replaying it
+
+Usage: python -m benchmarks.bench_wal_replay [--endpoints N] [--interval S] [--hours H] [--dir PATH]
+"""
+import argparse
+import dataclasses
+import shutil
+import tempfile
+import time
+import numpy as np
+
+from api_performance_prediction.collection.store import MetricStore
+from api_performance_prediction.collection.wal import MetricLog
+from api_performance_prediction.domain.models import MetricBatch
+
+def cycle_batch(endpoints, rng) -> MetricBatch:
+    n = len(endpoints)
+    return MetricBatch.from_columns(
+        endpoints,
+        endpoint_code=np.arange(n),
+        timestamp=np.full(n, np.datetime64('2024-01-01T00:00:00', 'us')),
+        latency_ms=rng.gamma(2.0, 75.0, n),
+        status_code=np.full(n, 200),
+        cpu_usage=rng.uniform(0, 100, n),
+        memory_usage=rng.uniform(0, 100, n),
+        request_count=rng.integers(0, 5000, n),
+        error_count=rng.integers(0, 50, n)
+    )
+
+def run(n_endpoints: int, interval: float, hours: float, directory: str):
+    endpoints = [f"http://10.0.{i // 256}.{i % 256}/api" for i in range(n_endpoints)]
+    cycles = int(hours * 3600 / interval)
+    batch = cycle_batch(endpoints, np.random.default_rng(0))
+    step = np.timedelta64(int(interval * 1e6), 'us')
+    print(f"metric log: {n_endpoints} endpoints every {interval:.0f}s for {hours:g}h "
+          f"({cycles * n_endpoints:,} samples)")
+
+    log = MetricLog(directory)
+    append_seconds = sync_seconds = 0.0
+    for cycle in range(cycles):
+        shifted = dataclasses.replace(batch, timestamp=batch.timestamp + cycle * step)
+        start = time.perf_counter()
+        log.append(shifted)
+        append_seconds += time.perf_counter() - start
+        # The periodic sync covers a whole cycle at these intervals
+        start = time.perf_counter()
+        log.sync()
+        sync_seconds += time.perf_counter() - start
+    log.close()
+    size = sum(path.stat().st_size for path in log.segments())
+    print(f"  write   {append_seconds:6.2f}s appending, {sync_seconds:6.2f}s in fsync, "
+          f"{size / 2**20:,.0f} MB in {len(log.segments())} segments "
+          f"({size / (cycles * n_endpoints):.1f} bytes/sample)")
+
+    store = MetricStore(endpoints, capacity=1000)
+    report = MetricLog(directory).replay(store)
+    print(f"  replay  {report.seconds:6.2f}s, {report.samples / report.seconds:,.0f} samples/s, "
+          f"{report.bytes_read / 2**20 / report.seconds:,.0f} MB/s")
+    assert report.samples == cycles * n_endpoints
+    assert len(store) == n_endpoints * min(cycles, 1000)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--endpoints', type=int, default=1000)
+    parser.add_argument('--interval', type=float, default=60.0)
+    parser.add_argument('--hours', type=float, default=24.0)
+    parser.add_argument('--dir', default=None, help="Log directory, a temporary one by default")
+    args = parser.parse_args()
+    directory = args.dir or tempfile.mkdtemp(prefix='metric-log-')
+    try:
+        run(args.endpoints, args.interval, args.hours, directory)
+    finally:
+        if args.dir is None:
+            shutil.rmtree(directory)
@@ -4,6 +4,7 @@ setup(
     name="api_performance_prediction",
     version="0.1",
     packages=find_packages(),
+    python_requires='>=3.10',  # Slotted dataclasses
     install_requires=[
         'pandas',
         'scikit-learn',
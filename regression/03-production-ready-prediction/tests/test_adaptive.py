@@ -0,0 +1,82 @@
+import pytest
+import numpy as np
+from datetime import datetime, timedelta
+
+from api_performance_prediction.collection.adaptive import AdaptiveIntervals
+from api_performance_prediction.collection.store import MetricStore
+from api_performance_prediction.domain.models import APIMetric, PredictionResult
+
+ENDPOINTS = ["http://stable.example.com", "http://volatile.example.com", "http://new.example.com"]
+
+@pytest.fixture
+def store():
+    """Flat latency on the first endpoint, swings on the second, none on the third"""
+    store = MetricStore(ENDPOINTS, capacity=50)
+    for i in range(24):
+        for endpoint, latency in [(ENDPOINTS[0], 100.0 + i % 2),
+                                  (ENDPOINTS[1], 100.0 if i % 2 else 300.0)]:
+            store.append(APIMetric(
+                timestamp=datetime(2024, 1, 1) + timedelta(minutes=5 * i),
+                endpoint=endpoint,
+                latency_ms=latency,
+                status_code=200,
+                cpu_usage=45.0,
+                memory_usage=75.0,
+                request_count=1000,
+                error_count=5
+            ))
+    return store
+
+def prediction(endpoint: str, latency: float) -> PredictionResult:
+    return PredictionResult(
+        timestamp=datetime(2024, 1, 1),
+        endpoint=endpoint,
+        predicted_latency=latency,
+        confidence_interval=(latency - 10, latency + 10),
+        features_used={},
+        model_version="test"
+    )
+
+class TestAdaptiveIntervals:
+    def test_volatility_shortens_interval(self, store):
+        """Test that stable endpoints slow down and volatile or unknown ones speed up"""
+        adaptive = AdaptiveIntervals(min_interval=10, max_interval=300)
+        intervals = adaptive.intervals(ENDPOINTS, store)
+
+        assert intervals[0] > 250
+        assert intervals[1] == pytest.approx(10)
+        assert intervals[2] == pytest.approx(10)
+
+    def test_predicted_risk_shortens_interval(self, store):
+        """Test that a predicted rise over the recent mean raises the score"""
+        adaptive = AdaptiveIntervals(min_interval=10, max_interval=300, risk_ratio=0.5)
+        adaptive.observe_predictions([prediction(ENDPOINTS[0], 100.5 * 1.25)], store)
+
+        # 25% above the recent mean is half of risk_ratio
+        assert adaptive.scores(ENDPOINTS, store)[0] == pytest.approx(0.5)
+        assert adaptive.intervals(ENDPOINTS, store)[0] == pytest.approx(np.sqrt(10 * 300))
+
+        adaptive.observe_predictions([prediction(ENDPOINTS[0], 50.0)], store)
+        assert adaptive.intervals(ENDPOINTS, store)[0] > 250
+
+    def test_budget_is_respected(self, store):
+        """Test that the total rate fits the budget while staying in bounds"""
+        adaptive = AdaptiveIntervals(min_interval=10, max_interval=300,
+                                     max_scrapes_per_second=0.1)
+        intervals = adaptive.intervals(ENDPOINTS, store)
+
+        assert (1 / intervals).sum() == pytest.approx(0.1)
+        assert intervals.min() >= 10
+        assert intervals.max() <= 300
+        # Relative ordering survives the scaling
+        assert intervals[0] > intervals[1]
+
+    def test_budget_below_floor_stretches_everything(self, store):
+        adaptive = AdaptiveIntervals(min_interval=10, max_interval=300,
+                                     max_scrapes_per_second=0.001)
+        intervals = adaptive.intervals(ENDPOINTS, store)
+        assert intervals.tolist() == pytest.approx([3000.0] * 3)
+
+    def test_invalid_bounds(self):
+        with pytest.raises(ValueError):
+            AdaptiveIntervals(min_interval=60, max_interval=10)
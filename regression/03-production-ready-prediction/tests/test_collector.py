@@ -0,0 +1,233 @@
+import pytest
+import asyncio
+import numpy as np
+from aiohttp import web
+
+from api_performance_prediction.collection.adaptive import AdaptiveIntervals
+from api_performance_prediction.collection.collector import MetricsCollector
+from api_performance_prediction.collection.scheduler import (
+    ScrapeScheduler, StaggeredSchedule, stagger_offset
+)
+
+class TestMetricsCollector:
+    @pytest.fixture
+    async def metrics_server(self, unused_tcp_port):
+        """Serve a fixed payload on /metrics and a broken one on /broken/metrics"""
+        async def metrics_handler(request):
+            return web.json_response({
+                "latency_ms": 150.0,
+                "cpu_usage": 45.0,
+                "memory_usage": 75.0,
+                "request_count": 1000,
+                "error_count": 5
+            })
+
+        async def broken_handler(request):
+            return web.json_response({"latency_ms": 150.0})
+
+        app = web.Application()
+        app.router.add_get('/metrics', metrics_handler)
+        app.router.add_get('/broken/metrics', broken_handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, 'localhost', unused_tcp_port)
+        await site.start()
+        
+        yield f'http://localhost:{unused_tcp_port}'
+        
+        await runner.cleanup()
+
+    @pytest.mark.asyncio
+    async def test_collect_batch(self, metrics_server):
+        """Test that a cycle is collected straight into columns"""
+        endpoints = [metrics_server, f"{metrics_server}/broken", metrics_server]
+        collector = MetricsCollector(endpoints)
+        batch = await collector.collect_batch()
+        await collector.stop()
+        
+        # The endpoint with an incomplete payload is skipped
+        assert len(batch) == 2
+        assert batch.endpoint_code.tolist() == [0, 2]
+        assert batch.endpoints == tuple(endpoints)
+        assert batch.latency_ms.tolist() == [150.0, 150.0]
+        assert batch.status_code.tolist() == [200, 200]
+        assert batch.request_count.tolist() == [1000, 1000]
+
+    @pytest.mark.asyncio
+    async def test_session_reused_across_cycles(self, metrics_server):
+        """Test that cycles share one pooled session until stop"""
+        collector = MetricsCollector([metrics_server], connection_limit_per_host=2)
+        await collector.collect_batch()
+        session = collector._session
+        await collector.collect_batch()
+        
+        assert collector._session is session
+        assert session.connector.limit_per_host == 2
+        
+        await collector.stop()
+        assert session.closed
+        assert collector._session is None
+
+    @pytest.mark.asyncio
+    async def test_collection_fills_store(self, metrics_server):
+        """Test that the collection loop appends each cycle to the store"""
+        collector = MetricsCollector([metrics_server], collection_interval=0.01, history_size=3)
+        task = asyncio.create_task(collector.start_collection())
+        while collector.store.count(metrics_server) < 3:
+            await asyncio.sleep(0.01)
+        await collector.stop()
+        await task
+
+        window = collector.store.window(metrics_server)
+        assert len(window) == 3
+        assert window.latency_ms.tolist() == [150.0] * 3
+        assert collector.store.latest(metrics_server).status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_adaptive_intervals_applied(self, metrics_server):
+        """Test that a flat endpoint is slowed down once it has history"""
+        adaptive = AdaptiveIntervals(min_interval=0.02, max_interval=5, update_interval=0.05)
+        collector = MetricsCollector([metrics_server], adaptive=adaptive)
+        task = asyncio.create_task(collector.start_collection())
+        while collector.store.count(metrics_server) < 2:
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.1)
+        await collector.stop()
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        
+        # Constant latency scores 0, so the endpoint moves to max_interval
+        assert collector.schedule.intervals == [5]
+
+class TestScrapeScheduler:
+    @pytest.mark.asyncio
+    async def test_report_classifies_endpoints(self):
+        """Test that results are sorted into succeeded, timed out and failed"""
+        async def scrape(endpoint):
+            if endpoint == "slow":
+                await asyncio.sleep(1)
+            if endpoint == "broken":
+                raise ConnectionError("refused")
+            return endpoint.upper()
+        
+        scheduler = ScrapeScheduler(max_concurrency=2, request_timeout=0.05)
+        results, report = await scheduler.run_cycle(["a", "slow", "broken", "b"], scrape)
+        
+        assert results == {"a": "A", "b": "B"}
+        assert sorted(report.succeeded) == ["a", "b"]
+        assert report.timed_out == ["slow"]
+        assert report.failed == ["broken"]
+        assert "refused" in report.errors["broken"]
+        assert not report.deadline_hit
+
+    @pytest.mark.asyncio
+    async def test_concurrency_is_bounded(self):
+        """Test that no more than max_concurrency scrapes run at once"""
+        running, peak = 0, 0
+        
+        async def scrape(endpoint):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.001)
+            running -= 1
+        
+        scheduler = ScrapeScheduler(max_concurrency=5)
+        _, report = await scheduler.run_cycle([str(i) for i in range(100)], scrape)
+        
+        assert peak == 5
+        assert len(report.succeeded) == 100
+
+    @pytest.mark.asyncio
+    async def test_cycle_deadline_cancels_stragglers(self):
+        """Test that the cycle ends at the deadline whatever is left"""
+        async def scrape(endpoint):
+            await asyncio.sleep(0.01 if endpoint == "fast" else 10)
+        
+        scheduler = ScrapeScheduler(max_concurrency=2, request_timeout=60, cycle_deadline=0.1)
+        endpoints = ["fast"] + [f"slow{i}" for i in range(5)]
+        _, report = await scheduler.run_cycle(endpoints, scrape)
+        
+        assert report.deadline_hit
+        assert report.duration < 1
+        assert report.succeeded == ["fast"]
+        assert sorted(report.timed_out) == sorted(endpoints[1:])
+        assert report.total == len(endpoints)
+
+    @pytest.mark.asyncio
+    async def test_collector_skips_unreachable_endpoints(self, unused_tcp_port):
+        """Test that failed endpoints never reach the metrics list"""
+        collector = MetricsCollector(
+            [f"http://127.0.0.1:{unused_tcp_port}"], request_timeout=1
+        )
+        metrics = await collector._collect_current_metrics()
+        await collector.stop()
+        
+        assert metrics == []
+        assert len(collector.last_report.failed) == 1
+
+class TestStaggeredSchedule:
+    def test_offsets_are_deterministic(self):
+        """Test that an endpoint keeps its phase across schedules"""
+        endpoint = "http://api1.example.com"
+        assert stagger_offset(endpoint, 60) == stagger_offset(endpoint, 60)
+        assert 0 <= stagger_offset(endpoint, 60) < 60
+        
+        # Due times fall on the same wall-clock phase, whatever the start time
+        offset = stagger_offset(endpoint, 60)
+        for now, wall_now in [(0.0, 1000.0), (500.0, 1537.5)]:
+            schedule = StaggeredSchedule([endpoint], [60], now=now, wall_now=wall_now)
+            wall_due = schedule.next_due() - now + wall_now
+            assert wall_due % 60 == pytest.approx(offset)
+            assert 0 <= schedule.next_due() - now < 60
+
+    def test_cadence_does_not_drift(self):
+        """Test that due times advance by the interval, not from pop time"""
+        schedule = StaggeredSchedule(["a"], [10], now=0.0, wall_now=0.0)
+        due = schedule.next_due()
+        for k in range(1, 5):
+            assert schedule.pop_due(schedule.next_due() + 0.3) == [0]
+            assert schedule.next_due() == pytest.approx(due + 10 * k)
+        assert schedule.skipped == 0
+
+    def test_missed_slots_are_skipped(self):
+        """Test that a stalled loop does not fire a burst afterwards"""
+        schedule = StaggeredSchedule(["a"], [10], now=0.0, wall_now=0.0)
+        due = schedule.next_due()
+        assert schedule.pop_due(due + 35) == [0]
+        assert schedule.pop_due(due + 35) == []
+        assert schedule.skipped == 3
+        assert schedule.next_due() == pytest.approx(due + 40)
+
+    def test_per_endpoint_intervals(self):
+        """Test that each endpoint fires at its own rate"""
+        schedule = StaggeredSchedule(["fast", "slow"], [1, 4], now=0.0, wall_now=0.0)
+        fired = []
+        for step in range(1, 81):
+            fired.extend(schedule.pop_due(step * 0.1))
+        assert fired.count(0) == 8
+        assert fired.count(1) == 2
+
+    def test_set_intervals_moves_changed_endpoints(self):
+        """Test that a shortened interval takes effect before the old due time"""
+        schedule = StaggeredSchedule(["a", "b"], [100, 100], now=0.0, wall_now=0.0)
+        schedule.set_intervals([5, 100], now=0.0, wall_now=0.0)
+        
+        assert schedule.intervals == [5, 100]
+        assert schedule.next_due() == pytest.approx(stagger_offset("a", 5))
+        fired = []
+        for step in range(1, 201):
+            fired.extend(schedule.pop_due(step * 0.5))
+        assert fired.count(0) == 20
+        assert fired.count(1) == 1
+
+    def test_large_fleet_is_spread_evenly(self):
+        """Test that 10k endpoints give a flat request rate over the interval"""
+        endpoints = [f"http://10.0.{i // 256}.{i % 256}/api" for i in range(10000)]
+        schedule = StaggeredSchedule(endpoints, [60] * len(endpoints), now=0.0, wall_now=0.0)
+        per_second = [len(schedule.pop_due(float(second))) for second in range(1, 61)]
+        
+        assert sum(per_second) == len(endpoints)
+        # Every second sees close to the mean of ~167 requests
+        assert max(per_second) < 1.3 * np.mean(per_second)
+        assert min(per_second) > 0.7 * np.mean(per_second)
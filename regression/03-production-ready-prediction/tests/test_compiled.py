@@ -0,0 +1,85 @@
+import pytest
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import GradientBoostingRegressor
+
+from api_performance_prediction.prediction.compiled import CompiledEnsemble
+from api_performance_prediction.prediction.model import ModelServer
+
+class TestCompiledEnsemble:
+    @pytest.fixture
+    def training_data(self):
+        """Create a small regression problem"""
+        rng = np.random.default_rng(42)
+        X = rng.uniform(0, 100, size=(300, 6))
+        y = 50 + 2 * X[:, 0] - X[:, 1] + 10 * np.sin(X[:, 2]) + rng.normal(0, 5, 300)
+        return X, y
+
+    @pytest.fixture
+    def fitted_model(self, training_data):
+        """Fit a gradient boosting model on the training data"""
+        X, y = training_data
+        return GradientBoostingRegressor(
+            n_estimators=50, max_depth=4, random_state=42
+        ).fit(X, y)
+
+    def test_predictions_match_sklearn(self, fitted_model, training_data):
+        """Test that point predictions equal the sklearn model's"""
+        X, _ = training_data
+        compiled = CompiledEnsemble.from_model(fitted_model)
+        
+        np.testing.assert_allclose(
+            compiled.predict(X), fitted_model.predict(X), rtol=1e-10
+        )
+
+    def test_contributions_match_trees(self, fitted_model, training_data):
+        """Test that per-tree contributions equal each tree's raw output"""
+        X, _ = training_data
+        compiled = CompiledEnsemble.from_model(fitted_model)
+        _, contributions = compiled.predict_with_contributions(X)
+        
+        expected = np.column_stack([
+            tree.predict(X) for tree in fitted_model.estimators_.ravel()
+        ])
+        assert contributions.shape == (len(X), fitted_model.n_estimators_)
+        np.testing.assert_array_equal(contributions, expected)
+
+    def test_zero_init(self, training_data):
+        """Test models boosted from a zero initial estimate"""
+        X, y = training_data
+        model = GradientBoostingRegressor(
+            n_estimators=10, init='zero', random_state=0
+        ).fit(X, y)
+        
+        np.testing.assert_allclose(
+            CompiledEnsemble.from_model(model).predict(X), model.predict(X), rtol=1e-10
+        )
+
+    def test_feature_count_validation(self, fitted_model):
+        """Test that inputs with the wrong width are rejected"""
+        with pytest.raises(ValueError):
+            CompiledEnsemble.from_model(fitted_model).predict(np.zeros((3, 2)))
+
+    def test_model_server_backend(self, fitted_model, training_data):
+        """Test that the compiled backend serves the same predictions"""
+        X, _ = training_data
+        features = pd.DataFrame(X, columns=[f"f{i}" for i in range(X.shape[1])])
+        features.insert(0, 'endpoint', 'http://api.example.com')
+        features.insert(0, 'timestamp', pd.Timestamp('2024-01-01'))
+        
+        sklearn_server = ModelServer(backend='sklearn')
+        compiled_server = ModelServer(backend='compiled')
+        sklearn_server.model = compiled_server.model = fitted_model
+        
+        expected = sklearn_server.predict(features)
+        actual = compiled_server.predict(features)
+        for exp, act in zip(expected, actual):
+            assert np.isclose(act.predicted_latency, exp.predicted_latency, rtol=1e-10)
+            np.testing.assert_allclose(
+                act.confidence_interval, exp.confidence_interval, rtol=1e-10
+            )
+
+    def test_unknown_backend(self):
+        """Test that an unknown backend name is rejected"""
+        with pytest.raises(ValueError):
+            ModelServer(backend='onnx')
@@ -0,0 +1,90 @@
+import pytest
+import numpy as np
+from api_performance_prediction.monitoring.detectors import (
+    DETECTORS, Adwin, ChangeDetector, Cusum, PageHinkley, detector_factory
+)
+from api_performance_prediction.monitoring.monitor import ModelMonitor
+
+def first_alarm(detector, values) -> int:
+    """Index of the first value reported as a change, -1 if none"""
+    for i, value in enumerate(values):
+        if detector.update(value):
+            return i
+    return -1
+
+def shifted_errors(seed: int, before: int = 1000, after: int = 500, shift: float = 8.0) -> np.ndarray:
+    """Percentage errors that go up by shift after `before` values"""
+    rng = np.random.default_rng(seed)
+    return np.concatenate([rng.gamma(4.0, 2.0, before), rng.gamma(4.0, 2.0, after) + shift])
+
+class TestDetectors:
+    @pytest.mark.parametrize('name', sorted(DETECTORS))
+    def test_detects_a_shift_soon(self, name):
+        errors = shifted_errors(seed=0)
+        alarm = first_alarm(detector_factory(name)(), errors)
+        assert 1000 <= alarm < 1100
+
+    @pytest.mark.parametrize('name', sorted(DETECTORS))
+    def test_quiet_on_a_stationary_series(self, name):
+        rng = np.random.default_rng(1)
+        assert first_alarm(detector_factory(name)(), rng.gamma(4.0, 2.0, 3000)) == -1
+
+    @pytest.mark.parametrize('name', sorted(DETECTORS))
+    def test_ignores_a_decrease(self, name):
+        errors = shifted_errors(seed=2, shift=0.0)
+        errors[:1000] += 8.0
+        detector = detector_factory(name)()
+        assert first_alarm(detector, errors) == -1
+
+    def test_page_hinkley_restarts(self):
+        detector = PageHinkley(threshold=10.0, min_samples=1)
+        assert first_alarm(detector, [0.0] * 10 + [20.0]) == 10
+        assert detector.count == 0
+
+    def test_cusum_needs_a_warmup(self):
+        with pytest.raises(ValueError):
+            Cusum(warmup=1)
+        detector = Cusum(warmup=5)
+        assert first_alarm(detector, [1.0, 2.0, 1.0, 2.0, 100.0]) == -1
+
+    def test_adwin_window_statistics(self):
+        """Test that the bucket histogram keeps the window's exact mean and variance"""
+        rng = np.random.default_rng(3)
+        values = rng.normal(10.0, 2.0, 5000)
+        detector = Adwin(max_window=1000)
+        for value in values:
+            detector.update(value)
+        window = values[-detector.width:]
+        assert 1000 - 2 ** (len(detector._levels) - 1) < detector.width <= 1000
+        assert detector.mean == pytest.approx(window.mean())
+        assert detector.variance / detector.width == pytest.approx(window.var(), rel=1e-6)
+
+    def test_adwin_drops_the_old_regime(self):
+        detector = Adwin()
+        for value in shifted_errors(seed=4):
+            detector.update(value)
+        assert detector.width < 600
+        assert detector.mean == pytest.approx(16.0, abs=1.0)
+
+    def test_detectors_must_implement_reset(self):
+        class NoReset(ChangeDetector):
+            def update(self, value: float) -> bool:
+                return False
+
+        with pytest.raises(TypeError):
+            NoReset()
+
+    def test_unknown_detector(self):
+        with pytest.raises(ValueError):
+            detector_factory('kalman')
+        assert detector_factory(Cusum) is Cusum
+
+class TestMonitorDetectors:
+    def test_changes_are_reported_per_endpoint(self):
+        monitor = ModelMonitor(detector=lambda: PageHinkley(threshold=20.0, min_samples=5))
+        for _ in range(10):
+            assert monitor._detect_changes({'a': 5.0, 'b': 5.0}) == []
+        changed = [monitor._detect_changes({'a': 5.0, 'b': 30.0}) for _ in range(3)]
+        assert ['b'] in changed
+        assert all('a' not in endpoints for endpoints in changed)
+        assert set(monitor.detectors) == {'a', 'b'}
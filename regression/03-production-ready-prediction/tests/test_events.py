@@ -0,0 +1,93 @@
+import pytest
+import asyncio
+import numpy as np
+from datetime import datetime, timedelta
+from sklearn.ensemble import GradientBoostingRegressor
+
+from api_performance_prediction.collection.events import SampleEvents
+from api_performance_prediction.domain.models import APIMetric
+from api_performance_prediction.orchestrator import PredictionSystem
+
+ENDPOINTS = ["http://api1.example.com", "http://api2.example.com", "http://api3.example.com"]
+
+def make_metric(endpoint: str, i: int) -> APIMetric:
+    return APIMetric(
+        timestamp=datetime(2024, 1, 1) + timedelta(minutes=5 * i),
+        endpoint=endpoint,
+        latency_ms=150.0 + i % 7,
+        status_code=200,
+        cpu_usage=45.0,
+        memory_usage=75.0,
+        request_count=1000,
+        error_count=5
+    )
+
+class TestSampleEvents:
+    @pytest.mark.asyncio
+    async def test_publishes_coalesce(self):
+        """Test that everything published before a take comes out once"""
+        events = SampleEvents(4)
+        events.publish(np.array([2]))
+        events.publish(np.array([0, 2]))
+        await asyncio.wait_for(events.wait(), 1)
+
+        codes, published = events.take()
+        assert codes.tolist() == [0, 2]
+        assert published is not None
+        assert events.take()[0].tolist() == []
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(events.wait(), 0.05)
+
+    @pytest.mark.asyncio
+    async def test_close_wakes_the_consumer(self):
+        events = SampleEvents(4)
+        waiter = asyncio.create_task(events.wait())
+        await asyncio.sleep(0)
+        events.close()
+        await asyncio.wait_for(waiter, 1)
+        assert events.closed
+
+class TestEventDrivenPrediction:
+    @pytest.mark.asyncio
+    async def test_predicts_only_endpoints_with_new_data(self):
+        """Test that a pass follows new samples and covers just their endpoints"""
+        system = PredictionSystem(ENDPOINTS, coalesce_window=0.01)
+        store = system.collector.store
+        for i in range(30):
+            for endpoint in ENDPOINTS[:2]:
+                store.append(make_metric(endpoint, i))
+        features = system.preprocessor.create_feature_vector(store.history())
+        columns = list(features.select_dtypes(include='number').columns)
+        system.model_server.model = GradientBoostingRegressor(n_estimators=5).fit(
+            features[columns], features['latency_ms']
+        )
+        predicted = []
+        predict_batch = system.model_server.predict_batch
+        system.model_server.predict_batch = lambda frame: predicted.append(
+            frame['endpoint'].astype(str).tolist()
+        ) or predict_batch(frame)
+
+        system._running = True
+        task = asyncio.create_task(system._prediction_loop())
+        # Samples held before the loop started are predicted on first
+        for _ in range(100):
+            if predicted:
+                break
+            await asyncio.sleep(0.01)
+        assert predicted == [ENDPOINTS[:2]]
+
+        store.append(make_metric(ENDPOINTS[1], 30))
+        store.append(make_metric(ENDPOINTS[1], 31))
+        for _ in range(100):
+            if len(predicted) > 1:
+                break
+            await asyncio.sleep(0.01)
+        assert predicted[1] == [ENDPOINTS[1]]
+        assert system.last_prediction_lag < 1.0
+
+        await system.stop()
+        await asyncio.wait_for(task, 1)
+        assert len(predicted) == 2
+        # The second pass resolved the first one's prediction for the endpoint it saw again
+        assert len(system.monitor.historical_mapes) == 1
+        assert len(system.monitor.pending) == 2
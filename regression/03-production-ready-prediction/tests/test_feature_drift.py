@@ -0,0 +1,177 @@
+import pytest
+import numpy as np
+from api_performance_prediction.domain.models import MetricBatch, endpoint_code_dtype
+from api_performance_prediction.monitoring.feature_drift import (
+    FEATURES, FeatureDriftMonitor, sketch_bucket, sketch_value
+)
+from api_performance_prediction.monitoring.monitor import ModelMonitor
+from api_performance_prediction.prediction.preprocessor import DataPreprocessor
+
+ENDPOINTS = ("http://api1.example.com", "http://api2.example.com")
+START = np.datetime64('2024-01-01T00:00:00', 'us')
+STEP = np.timedelta64(5 * 60 * 1_000_000, 'us')
+
+def make_batch(first: int, count: int, seed: int, latency_scale: float = 1.0,
+               endpoints=ENDPOINTS) -> MetricBatch:
+    """Samples first .. first + count - 1 of every endpoint, grouped per endpoint"""
+    rng = np.random.default_rng(seed)
+    n = len(endpoints) * count
+    steps = np.tile(np.arange(first, first + count), len(endpoints))
+    return MetricBatch(
+        timestamp=START + steps * STEP,
+        endpoint_code=np.repeat(np.arange(len(endpoints)), count).astype(endpoint_code_dtype(len(endpoints))),
+        latency_ms=rng.gamma(9.0, 15.0, n) * latency_scale,
+        status_code=np.full(n, 200, dtype=np.int16),
+        cpu_usage=rng.uniform(20, 80, n),
+        memory_usage=rng.uniform(40, 90, n),
+        request_count=rng.poisson(1000, n).astype(np.int64),
+        error_count=rng.poisson(5, n).astype(np.int64),
+        endpoints=tuple(endpoints)
+    )
+
+@pytest.fixture
+def monitor():
+    monitor = FeatureDriftMonitor(max_endpoints=4, reference_size=600, live_size=300)
+    monitor.update_batch(make_batch(0, 600, seed=0))
+    return monitor
+
+class TestSketch:
+    def test_relative_error(self):
+        values = np.geomspace(1e-4, 1e9, 10000)
+        approx = sketch_value(sketch_bucket(values))
+        assert np.all(np.abs(approx - values) / values < 0.13)
+        assert np.all(np.diff(sketch_bucket(values)) >= 0)
+
+    def test_zero_and_nan(self):
+        assert sketch_bucket(np.array([0.0, -1.0]))[0] == 0
+        assert sketch_value(np.array([0]))[0] == 0.0
+        sketch_bucket(np.array([np.nan]))  # No warning, masked by callers
+
+class TestFeatureDriftMonitor:
+    def test_reference_fills_first(self, monitor):
+        assert monitor.reference_count[:2].tolist() == [600, 600]
+        assert monitor.live_bins.sum() == 0
+        # Quantile bins split the reference about evenly, as far as sketch buckets allow
+        shares = monitor.reference_bins[0, 0] / 600
+        assert shares.max() < 0.25
+        assert monitor.report(ENDPOINTS[0]) is None
+
+    def test_stationary_live_window(self, monitor):
+        monitor.update_batch(make_batch(600, 200, seed=1))
+        report = monitor.report(ENDPOINTS[0])
+        assert all(report[name]['psi'] < 0.1 for name in FEATURES[:5])
+        assert monitor.drifted() == {}
+
+    def test_stationary_fleet_is_not_flagged(self):
+        """Test that sampling noise flags no endpoint as soon as endpoints are scored"""
+        endpoints = [f"http://api{i}.example.com" for i in range(300)]
+        monitor = FeatureDriftMonitor(max_endpoints=len(endpoints), reference_size=600)
+        monitor.update_batch(make_batch(0, 600, seed=0, endpoints=endpoints))
+        monitor.update_batch(make_batch(600, monitor.min_live, seed=1, endpoints=endpoints))
+        report = monitor.report(endpoints[0])
+        # Up to nine degrees of freedom, fewer where sketch buckets merge bins
+        assert 0 < report['latency_ms']['psi_floor'] <= 9 * (1 / 200 + 1 / 600) + 1e-12
+        assert monitor.drifted() == {}
+
+    def test_shift_is_flagged(self, monitor):
+        monitor.update_batch(make_batch(600, 200, seed=1, latency_scale=1.5))
+        report = monitor.report(ENDPOINTS[1])
+        assert report['latency_ms']['psi'] > 0.25
+        assert report['latency_ms']['ks'] > 0.2
+        assert monitor.drifted() == {endpoint: ['latency_ms'] for endpoint in ENDPOINTS}
+
+    def test_drift_is_reported_on_transition(self, monitor):
+        """Test that a drifting feature is reported once, and again after it recovers"""
+        monitor.update_batch(make_batch(600, 200, seed=1, latency_scale=1.5))
+        assert monitor.drifted() == {endpoint: ['latency_ms'] for endpoint in ENDPOINTS}
+        monitor.update_batch(make_batch(800, 50, seed=2, latency_scale=1.5))
+        assert monitor.drifted() == {}
+        assert monitor.flagged[:2, FEATURES.index('latency_ms')].all()
+        # Two panes of unshifted samples replace the live window
+        monitor.update_batch(make_batch(850, 300, seed=3))
+        assert monitor.drifted() == {}
+        monitor.update_batch(make_batch(1150, 300, seed=4, latency_scale=1.5))
+        assert monitor.drifted() == {endpoint: ['latency_ms'] for endpoint in ENDPOINTS}
+
+    def test_sketches_grow_with_endpoints(self):
+        monitor = FeatureDriftMonitor(max_endpoints=10_000, reference_size=600)
+        assert monitor.reference_sketch.nbytes == 0
+        monitor.update_batch(make_batch(0, 10, seed=0))
+        assert len(monitor.reference_sketch) == 64
+        endpoints = [f"http://api{i}.example.com" for i in range(100)]
+        monitor.update_batch(make_batch(0, 10, seed=0, endpoints=endpoints))
+        assert len(monitor.reference_sketch) == 2 * 64
+        assert monitor.reference_count[monitor.register(endpoints[99])] == 10
+
+    def test_overlapping_windows_count_once(self, monitor):
+        batch = make_batch(600, 100, seed=1)
+        monitor.update_batch(batch)
+        counts = monitor.live_bins.copy()
+        monitor.update_batch(batch)
+        monitor.update_batch(make_batch(690, 20, seed=2))
+        assert monitor.live_bins[:, :2].sum() == counts[:, :2].sum() + 2 * 10 * 5
+
+    def test_live_window_is_bounded(self, monitor):
+        for i in range(10):
+            monitor.update_batch(make_batch(600 + 100 * i, 100, seed=i))
+        live = monitor.live_categories['hour'][:, 0].sum()
+        assert 150 < live <= 300
+        # One call spanning several panes keeps only the newest ones
+        monitor.update_batch(make_batch(1600, 1000, seed=11))
+        assert monitor.pane_count[0] == 2000 % 150
+        assert monitor.live_categories['hour'][:, 0].sum() == 150 + 2000 % 150
+
+    def test_hour_needs_a_day_of_live_samples(self):
+        monitor = FeatureDriftMonitor(max_endpoints=4, reference_size=600, live_size=600, min_live=100)
+        monitor.update_batch(make_batch(0, 600, seed=0))
+        monitor.update_batch(make_batch(600, 100, seed=1))
+        assert np.isnan(monitor.report(ENDPOINTS[0])['hour']['psi'])
+        for i in range(1, 4):
+            monitor.update_batch(make_batch(600 + 100 * i, 100, seed=1 + i))
+        hour = monitor.report(ENDPOINTS[0])['hour']
+        # About what sampling noise gives over 24 bins and a few hundred samples
+        assert hour['psi'] < 0.25
+        assert np.isnan(monitor.report(ENDPOINTS[0])['day_of_week']['psi'])
+
+    def test_feature_frames_match_batches(self, monitor):
+        """Test that create_feature_vector output and raw batches give the same counts"""
+        other = FeatureDriftMonitor(max_endpoints=4, reference_size=600, live_size=300)
+        features = DataPreprocessor(grouped=True).create_feature_vector(make_batch(0, 600, seed=0))
+        other.update(features)
+        batch = make_batch(600, 200, seed=1)
+        other.update(DataPreprocessor(grouped=True).create_feature_vector(batch))
+        monitor.update_batch(batch)
+        assert other.drifted() == monitor.drifted()
+        np.testing.assert_array_equal(other.reference_sketch, monitor.reference_sketch)
+        np.testing.assert_array_equal(other.live_bins, monitor.live_bins)
+        np.testing.assert_allclose(other.psi, monitor.psi, equal_nan=True)
+
+    def test_merge_adds_references(self):
+        whole = FeatureDriftMonitor(max_endpoints=4, reference_size=600)
+        whole.update_batch(make_batch(0, 300, seed=0))
+        whole.update_batch(make_batch(300, 300, seed=1))
+        first = FeatureDriftMonitor(max_endpoints=4, reference_size=600)
+        first.update_batch(make_batch(0, 300, seed=0))
+        second = FeatureDriftMonitor(max_endpoints=4, reference_size=600)
+        second.update_batch(make_batch(300, 300, seed=1))
+        first.merge(second)
+        np.testing.assert_array_equal(first.reference_sketch, whole.reference_sketch)
+        np.testing.assert_array_equal(first.edges, whole.edges)
+        assert first.last_seen[0] == whole.last_seen[0]
+
+    def test_full_monitor(self):
+        monitor = FeatureDriftMonitor(max_endpoints=1)
+        with pytest.raises(ValueError):
+            monitor.update_batch(make_batch(0, 1, seed=0))
+
+class TestMonitorFeatureDrift:
+    def test_alerts_without_ground_truth(self):
+        monitor = ModelMonitor(
+            feature_drift=FeatureDriftMonitor(max_endpoints=4, reference_size=600, live_size=300, min_live=100)
+        )
+        monitor.evaluate_actuals(make_batch(0, 600, seed=0))
+        metrics = monitor.evaluate_actuals(make_batch(600, 100, seed=1, latency_scale=2.0))
+        assert metrics.prediction_count == 0
+        assert metrics.drifted_features == {endpoint: ['latency_ms'] for endpoint in ENDPOINTS}
+        assert any("Input features drifted" in alert for alert in metrics.alerts_triggered)
+        assert not metrics.drift_detected
@@ -0,0 +1,154 @@
+import pytest
+import math
+from datetime import datetime, timedelta
+import numpy as np
+from api_performance_prediction.domain.models import APIMetric, MetricBatch, PredictionResult
+from api_performance_prediction.monitoring.ground_truth import PendingPredictions
+from api_performance_prediction.monitoring.monitor import ModelMonitor
+
+START = datetime(2024, 1, 1)
+ENDPOINTS = ["http://api1.example.com", "http://api2.example.com"]
+
+def prediction(endpoint: str, minute: float, latency: float) -> PredictionResult:
+    return PredictionResult(
+        timestamp=START + timedelta(minutes=minute),
+        endpoint=endpoint,
+        predicted_latency=latency,
+        confidence_interval=(latency - 10, latency + 10),
+        features_used={},
+        model_version="test"
+    )
+
+def actuals(*rows) -> MetricBatch:
+    """Batch from (endpoint, minute, latency) rows"""
+    return MetricBatch.from_metrics([
+        APIMetric(
+            timestamp=START + timedelta(minutes=minute),
+            endpoint=endpoint,
+            latency_ms=latency,
+            status_code=200,
+            cpu_usage=45.0,
+            memory_usage=75.0,
+            request_count=1000,
+            error_count=5
+        )
+        for endpoint, minute, latency in rows
+    ])
+
+def track(pending: PendingPredictions, predictions, interval: float = 300.0):
+    pending.add(predictions, np.full(len(predictions), interval), np.full(len(predictions), interval / 2))
+
+class TestPendingPredictions:
+    def test_joins_by_endpoint_and_target_time(self):
+        """Test that each prediction meets the actual of its own endpoint at its target"""
+        pending = PendingPredictions()
+        track(pending, [prediction(ENDPOINTS[0], 0, 110.0), prediction(ENDPOINTS[1], 0, 150.0)])
+        # Listed in another order and with scrape jitter, the other endpoint first
+        report = pending.join(actuals(
+            (ENDPOINTS[1], 5.5, 200.0), (ENDPOINTS[0], 0, 999.0), (ENDPOINTS[0], 4.8, 100.0)
+        ))
+        assert report.matched == 2
+        assert report.endpoint_mapes == pytest.approx({ENDPOINTS[0]: 10.0, ENDPOINTS[1]: 25.0})
+        assert report.mape == pytest.approx(17.5)
+        assert report.pending == 0
+        assert len(pending) == 0
+
+    def test_waits_for_the_actual(self):
+        pending = PendingPredictions()
+        track(pending, [prediction(ENDPOINTS[0], 0, 110.0)])
+        report = pending.join(actuals((ENDPOINTS[0], 0, 100.0)))
+        assert report.matched == 0
+        assert math.isnan(report.mape)
+        assert report.pending == 1
+
+        report = pending.join(actuals((ENDPOINTS[0], 5, 100.0)))
+        assert report.matched == 1
+        assert report.mape == pytest.approx(10.0)
+
+    def test_missed_window_is_evicted(self):
+        """Test that a prediction whose window a later actual passed is dropped"""
+        pending = PendingPredictions()
+        track(pending, [prediction(ENDPOINTS[0], 0, 110.0)])
+        report = pending.join(actuals((ENDPOINTS[0], 10, 100.0)))
+        assert report.matched == 0
+        assert report.expired == 1
+        assert len(pending) == 0
+
+    def test_ttl_evicts_quiet_endpoints(self):
+        pending = PendingPredictions(ttl=600)
+        track(pending, [prediction(ENDPOINTS[0], 0, 110.0)])
+        assert pending.join(actuals((ENDPOINTS[1], 10, 100.0))).pending == 1
+        report = pending.join(actuals((ENDPOINTS[1], 20, 100.0)))
+        assert report.expired == 1
+        assert report.pending == 0
+
+    def test_max_pending_drops_oldest(self):
+        pending = PendingPredictions(max_pending=3)
+        track(pending, [prediction(ENDPOINTS[0], minute, 100.0) for minute in range(5)])
+        pending.join(actuals((ENDPOINTS[1], 0, 100.0)))
+        assert len(pending) == 3
+        assert pending.dropped == 2
+
+    def test_matches_a_vectorized_reference(self):
+        """Test the bulk join against a per-prediction search over many endpoints"""
+        rng = np.random.default_rng(3)
+        endpoints = [f"http://api{i}.example.com" for i in range(50)]
+        pending = PendingPredictions()
+        predictions = [
+            prediction(endpoint, 5 * step, float(rng.uniform(50, 200)))
+            for step in range(10) for endpoint in endpoints
+        ]
+        track(pending, predictions)
+        rows = [
+            (endpoint, 5 * step + float(rng.uniform(-1, 1)), float(rng.uniform(50, 200)))
+            for step in range(1, 11) for endpoint in endpoints
+        ]
+        report = pending.join(actuals(*rows))
+
+        errors = {}
+        for p in predictions:
+            target = (p.timestamp - START).total_seconds() / 60 + 5
+            actual = min(
+                (minute, latency) for endpoint, minute, latency in rows
+                if endpoint == p.endpoint and minute >= target - 2.5
+            )[1]
+            errors.setdefault(p.endpoint, []).append(abs(p.predicted_latency - actual) / actual * 100)
+        assert report.matched == len(predictions)
+        assert report.endpoint_mapes == pytest.approx(
+            {endpoint: np.mean(values) for endpoint, values in errors.items()}
+        )
+        assert report.mape == pytest.approx(np.mean([e for values in errors.values() for e in values]))
+
+class TestModelMonitorGroundTruth:
+    def test_evaluate_actuals(self):
+        monitor = ModelMonitor(mape_threshold=15.0, window_size=5)
+        horizons = np.full(2, 300.0)
+        monitor.track(
+            [prediction(ENDPOINTS[0], 0, 200.0), prediction(ENDPOINTS[1], 0, 100.0)],
+            horizons, horizons / 2
+        )
+        metrics = monitor.evaluate_actuals(actuals((ENDPOINTS[0], 1, 100.0)))
+        assert metrics.prediction_count == 0
+        assert len(monitor.historical_mapes) == 0
+        assert not metrics.alerts_triggered
+
+        metrics = monitor.evaluate_actuals(actuals((ENDPOINTS[0], 5, 100.0), (ENDPOINTS[1], 5, 100.0)))
+        assert metrics.prediction_count == 2
+        assert metrics.endpoint_mapes == pytest.approx({ENDPOINTS[0]: 100.0, ENDPOINTS[1]: 0.0})
+        assert metrics.mape == pytest.approx(50.0)
+        assert len(monitor.historical_mapes) == 1
+        assert any("High prediction error" in alert for alert in metrics.alerts_triggered)
+
+    def test_unresolved_batch_repeats_no_drift(self):
+        """Test that a drift verdict isn't raised again by actuals that resolve nothing"""
+        monitor = ModelMonitor(window_size=5)
+        for mape in [5.0] * 20 + [50.0] * 5:
+            monitor.historical_mapes.append(mape)
+        assert monitor._check_drift()
+
+        for minute in (1, 2, 3):
+            metrics = monitor.evaluate_actuals(actuals((ENDPOINTS[0], minute, 100.0)))
+            assert metrics.prediction_count == 0
+            assert not metrics.drift_detected
+            assert not metrics.alerts_triggered
+        assert len(monitor.historical_mapes) == 25
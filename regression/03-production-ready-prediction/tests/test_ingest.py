@@ -0,0 +1,202 @@
+import pytest
+import asyncio
+from datetime import datetime, timedelta
+import aiohttp
+import numpy as np
+
+from api_performance_prediction.collection.codec import RECORD_DTYPE, decode_batch, encode_batch
+from api_performance_prediction.collection.ingest import IngestServer, parse_json_metrics
+from api_performance_prediction.collection.store import MetricStore
+from api_performance_prediction.domain.models import APIMetric, MetricBatch
+
+ENDPOINTS = ["http://api1.example.com", "http://api2.example.com"]
+
+def make_metrics(n: int):
+    return [
+        APIMetric(
+            timestamp=datetime(2024, 1, 1, 12, 0) + timedelta(minutes=5 * i),
+            endpoint=ENDPOINTS[i % 2],
+            latency_ms=100.0 + i,
+            status_code=200,
+            cpu_usage=45.5,
+            memory_usage=75.25,
+            request_count=1000 + i,
+            error_count=i
+        )
+        for i in range(n)
+    ]
+
+def to_json(metric: APIMetric) -> dict:
+    record = dict(metric.__dict__)
+    record['timestamp'] = metric.timestamp.isoformat()
+    return record
+
+class TestCodec:
+    def test_round_trip(self):
+        """Test that a frame decodes to the batch it was encoded from"""
+        metrics = make_metrics(10)
+        data = encode_batch(MetricBatch.from_metrics(metrics))
+        batch, end = decode_batch(data)
+
+        assert end == len(data)
+        assert batch.to_metrics() == metrics
+        assert RECORD_DTYPE.itemsize == 52
+
+    def test_rejects_bad_frames(self):
+        """Test that truncated or foreign data is refused"""
+        data = encode_batch(MetricBatch.from_metrics(make_metrics(3)))
+        with pytest.raises(ValueError):
+            decode_batch(data[:-1])
+        with pytest.raises(ValueError):
+            decode_batch(b'XXXX' + data[4:])
+
+class TestParseJsonMetrics:
+    def test_valid_records(self):
+        """Test that JSON records become a batch with their own endpoint table"""
+        metrics = make_metrics(4)
+        batch = parse_json_metrics([to_json(m) for m in metrics])
+        assert batch.to_metrics() == metrics
+
+    @pytest.mark.parametrize("field,value", [
+        ('latency_ms', "fast"),
+        ('latency_ms', float('nan')),
+        ('status_code', 200.5),
+        ('request_count', -1),
+        ('error_count', True),
+        ('timestamp', "yesterday"),
+        ('endpoint', ""),
+    ])
+    def test_invalid_records(self, field, value):
+        """Test that a bad field is reported with its record index"""
+        records = [to_json(m) for m in make_metrics(2)]
+        records[1][field] = value
+        with pytest.raises(ValueError, match="Metric 1"):
+            parse_json_metrics(records)
+
+    def test_missing_fields(self):
+        record = to_json(make_metrics(1)[0])
+        del record['cpu_usage']
+        with pytest.raises(ValueError, match="cpu_usage"):
+            parse_json_metrics([record])
+
+class TestIngestServer:
+    @pytest.fixture
+    async def server(self, unused_tcp_port):
+        server = IngestServer(MetricStore([], capacity=100, max_endpoints=2), port=unused_tcp_port)
+        await server.start()
+        yield server
+        await server.stop()
+
+    @pytest.mark.asyncio
+    async def test_json_and_binary_pushes(self, server):
+        """Test that both payload forms end up in the store"""
+        metrics = make_metrics(6)
+        url = f"http://127.0.0.1:{server.port}/ingest"
+        async with aiohttp.ClientSession() as session:
+            async with session.post(url, json=[to_json(m) for m in metrics[:3]]) as response:
+                assert response.status == 202
+                assert (await response.json())['accepted'] == 3
+            async with session.post(
+                url,
+                data=encode_batch(MetricBatch.from_metrics(metrics[3:])),
+                headers={'Content-Type': 'application/octet-stream'}
+            ) as response:
+                assert response.status == 202
+        await server._queue.join()
+
+        assert server.stats.written_samples == 6
+        assert server.store.history().to_metrics() == sorted(
+            metrics, key=lambda m: ENDPOINTS.index(m.endpoint)
+        )
+
+    @pytest.mark.asyncio
+    async def test_invalid_pushes(self, server):
+        """Test that malformed payloads and unknown endpoints are refused"""
+        url = f"http://127.0.0.1:{server.port}/ingest"
+        extra = to_json(make_metrics(1)[0])
+        extra['endpoint'] = "http://api3.example.com"
+        async with aiohttp.ClientSession() as session:
+            async with session.post(url, data=b'{not json') as response:
+                assert response.status == 400
+            async with session.post(url, json=[to_json(m) for m in make_metrics(2)]) as response:
+                assert response.status == 202
+            # The store only has room for two endpoints
+            async with session.post(url, json=[extra]) as response:
+                assert response.status == 422
+        assert server.stats.invalid_batches == 2
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('field, value', [
+        ('latency_ms', np.nan), ('cpu_usage', np.inf), ('request_count', -1), ('error_count', -5)
+    ])
+    async def test_invalid_binary_pushes(self, server, field, value):
+        """Test that binary frames get the same value checks as JSON"""
+        batch = MetricBatch.from_metrics(make_metrics(2))
+        getattr(batch, field)[1] = value
+        url = f"http://127.0.0.1:{server.port}/ingest"
+        async with aiohttp.ClientSession() as session:
+            async with session.post(
+                url, data=encode_batch(batch), headers={'Content-Type': 'application/octet-stream'}
+            ) as response:
+                assert response.status == 400
+                assert field in (await response.json())['error']
+        assert len(server.store) == 0
+
+    @pytest.mark.asyncio
+    async def test_empty_binary_endpoint(self, server):
+        """Test that a frame naming an empty endpoint is refused"""
+        valid = MetricBatch.from_metrics(make_metrics(2))
+        batch = MetricBatch.from_columns(
+            ["", ENDPOINTS[1]],
+            endpoint_code=valid.endpoint_code,
+            **{name: getattr(valid, name) for name in RECORD_DTYPE.names[1:]}
+        )
+        url = f"http://127.0.0.1:{server.port}/ingest"
+        async with aiohttp.ClientSession() as session:
+            async with session.post(
+                url, data=encode_batch(batch), headers={'Content-Type': 'application/octet-stream'}
+            ) as response:
+                assert response.status == 400
+        assert server.store.endpoints == []
+
+    @pytest.mark.asyncio
+    async def test_full_queue_answers_429(self, unused_tcp_port):
+        """Test that pushes are refused rather than buffered once the queue is full"""
+        server = IngestServer(MetricStore(ENDPOINTS), port=unused_tcp_port, max_pending=1)
+        await server.start()
+        # Park the writer so nothing drains the queue
+        writer, server._writer = server._writer, None
+        writer.cancel()
+        await asyncio.gather(writer, return_exceptions=True)
+        server._queue.put_nowait(MetricBatch.from_metrics(make_metrics(1)))
+
+        url = f"http://127.0.0.1:{unused_tcp_port}/ingest"
+        async with aiohttp.ClientSession() as session:
+            async with session.post(url, json=[to_json(m) for m in make_metrics(2)]) as response:
+                assert response.status == 429
+                assert response.headers['Retry-After'] == '1'
+        await server.stop()
+
+        assert server.stats.rejected_batches == 1
+        assert server.stats.accepted_samples == 0
+
+    @pytest.mark.asyncio
+    async def test_rejected_pushes_take_no_store_slots(self, unused_tcp_port):
+        """Test that endpoints of a batch answered 429 are not registered"""
+        store = MetricStore(ENDPOINTS[:1], max_endpoints=2)
+        server = IngestServer(store, port=unused_tcp_port, max_pending=1)
+        await server.start()
+        writer, server._writer = server._writer, None
+        writer.cancel()
+        await asyncio.gather(writer, return_exceptions=True)
+        server._queue.put_nowait(MetricBatch.from_metrics(make_metrics(1)))
+
+        url = f"http://127.0.0.1:{unused_tcp_port}/ingest"
+        async with aiohttp.ClientSession() as session:
+            async with session.post(url, json=[to_json(m) for m in make_metrics(2)]) as response:
+                assert response.status == 429
+        server._queue.get_nowait()
+        server._queue.task_done()
+        await server.stop()
+
+        assert store.endpoints == ENDPOINTS[:1]
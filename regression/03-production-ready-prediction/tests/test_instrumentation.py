@@ -0,0 +1,97 @@
+import pytest
+import time
+import aiohttp
+import numpy as np
+from aiohttp import web
+
+from api_performance_prediction.collection.collector import MetricsCollector
+from api_performance_prediction.monitoring.instrumentation import (
+    Instrumentation, InstrumentationServer, LatencyHistogram, bucket_index, bucket_value
+)
+
+class TestLatencyHistogram:
+    def test_buckets_are_monotonic_and_tight(self):
+        """Test that bucket midpoints stay within 1% of the values they hold"""
+        values = np.unique(np.geomspace(1, 1e12, 5000).astype(np.int64))
+        indices = [bucket_index(int(v)) for v in values]
+        assert indices == sorted(indices)
+        for value, index in zip(values.tolist(), indices):
+            assert abs(bucket_value(index) - value) <= 0.01 * value + 0.5
+
+    def test_percentiles_match_exact(self):
+        rng = np.random.default_rng(0)
+        durations = rng.lognormal(mean=13, sigma=1.5, size=20000).astype(np.int64)
+        histogram = LatencyHistogram()
+        for duration in durations.tolist():
+            histogram.record_ns(duration)
+
+        p50, p99, p999 = histogram.percentiles([0.5, 0.99, 0.999])
+        exact = np.percentile(durations, [50, 99, 99.9]) / 1e9
+        np.testing.assert_allclose([p50, p99, p999], exact, rtol=0.02)
+        assert histogram.max_ns == durations.max()
+
+    def test_merge(self):
+        a, b = LatencyHistogram(), LatencyHistogram()
+        a.record_ns(1000)
+        b.record_ns(3000)
+        a.merge(b)
+        assert a.count == 2
+        assert a.percentiles([1.0])[0] == pytest.approx(3e-6, rel=0.01)
+
+class TestInstrumentation:
+    def test_spans_and_counters(self):
+        instrumentation = Instrumentation(max_endpoints=3)
+        with instrumentation.span('preprocess') as span:
+            time.sleep(0.01)
+            span.items = 24
+        instrumentation.count('predictions', np.array([0, 2, 2]))
+
+        snapshot = instrumentation.snapshot(['a', 'b', 'c'])
+        stage = snapshot['stages']['preprocess']
+        assert stage['spans'] == 1
+        assert stage['items'] == 24
+        assert 0.01 <= stage['p50'] < 0.1
+        assert snapshot['counters']['predictions'] == {'a': 1, 'c': 2}
+        assert instrumentation.snapshot()['counters']['predictions'] == 3
+
+@pytest.mark.asyncio
+async def test_collector_and_metrics_endpoint(unused_tcp_port_factory):
+    """Test that collection is timed and counted and served over HTTP"""
+    async def metrics_handler(request):
+        return web.json_response({
+            "latency_ms": 150.0, "cpu_usage": 45.0, "memory_usage": 75.0,
+            "request_count": 1000, "error_count": 5
+        })
+
+    app = web.Application()
+    app.router.add_get('/{endpoint}/metrics', metrics_handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    port = unused_tcp_port_factory()
+    await web.TCPSite(runner, '127.0.0.1', port).start()
+
+    good = f'http://127.0.0.1:{port}/ep'
+    bad = f'http://127.0.0.1:{port}'  # /metrics is not served there
+    collector = MetricsCollector([good, bad])
+    instrumentation = Instrumentation(collector.store.max_endpoints)
+    collector.instrumentation = instrumentation
+    server = InstrumentationServer(
+        lambda: instrumentation.snapshot(collector.store.endpoints), port=unused_tcp_port_factory()
+    )
+    await server.start()
+    try:
+        for _ in range(2):
+            collector.record(await collector.collect_batch())
+        async with aiohttp.ClientSession() as session:
+            async with session.get(f'http://127.0.0.1:{server.port}/internal/metrics') as response:
+                snapshot = await response.json()
+    finally:
+        await server.stop()
+        await collector.stop()
+        await runner.cleanup()
+
+    assert snapshot['stages']['collect']['spans'] == 2
+    assert snapshot['stages']['collect']['items'] == 4
+    assert snapshot['stages']['record']['items'] == 2
+    assert snapshot['counters']['samples'] == {good: 2}
+    assert snapshot['counters']['scrape_errors'] == {bad: 2}
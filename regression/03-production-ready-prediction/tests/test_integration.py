@@ -53,10 +53,10 @@ class TestPredictionSystem:
         await task
         
         # Verify that metrics were collected
-        assert len(system.collector._metrics_buffer) > 0
+        assert len(system.collector.store) > 0
         
         # Verify that predictions were made
-        latest_metrics = system.collector._metrics_buffer[-1]
+        latest_metrics = system.collector.store.latest(metrics_server)
         assert latest_metrics is not None
         assert latest_metrics.latency_ms > 0
         assert latest_metrics.cpu_usage > 0
@@ -82,7 +82,7 @@ class TestPredictionSystem:
         await task
         
         # System should continue running despite errors
-        assert len(system.collector._metrics_buffer) > 0
+        assert len(system.collector.store) > 0
 
     @pytest.mark.asyncio
     async def test_monitoring_integration(self, metrics_server):
@@ -127,4 +127,4 @@ class TestPredictionSystem:
         await task
         
         # Verify that buffer size is managed
-        assert len(system.collector._metrics_buffer) <= 1000
\ No newline at end of file
+        assert system.collector.store.count(metrics_server) <= system.collector.store.capacity
\ No newline at end of file
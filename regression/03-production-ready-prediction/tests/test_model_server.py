@@ -47,6 +47,31 @@ class TestModelServer:
         # Cleanup after tests
         os.unlink(tmp.name)
 
+    @pytest.fixture
+    def batch_features(self):
+        """Create a multi-row feature frame for batch scoring"""
+        rng = np.random.default_rng(0)
+        n = 50
+        return pd.DataFrame({
+            'timestamp': pd.date_range('2024-01-01', periods=n, freq='5min'),
+            'endpoint': ['http://api.example.com'] * n,
+            'cpu_usage': rng.uniform(20, 90, n),
+            'memory_usage': rng.uniform(40, 95, n),
+            'request_count': rng.integers(500, 2000, n),
+            'error_rate': rng.uniform(0, 0.05, n),
+            'hour': rng.integers(0, 24, n)
+        })
+
+    @pytest.fixture
+    def fitted_server(self, batch_features):
+        """Create a model server with a model fitted on the batch features"""
+        server = ModelServer()
+        X = batch_features.select_dtypes(include='number')
+        y = 100 + 2 * X['cpu_usage'] + np.random.default_rng(1).normal(0, 5, len(X))
+        server.model.set_params(n_estimators=20)
+        server.model.fit(X.to_numpy(), y)
+        return server
+
     def test_model_creation(self):
         """Test that model server creates a default model correctly"""
         server = ModelServer()
@@ -114,4 +139,75 @@ class TestModelServer:
         # Check that feature values match
         for column in sample_features.columns:
             if isinstance(sample_features[column].iloc[0], (int, float)):
-                assert prediction.features_used[column] == sample_features[column].iloc[0]
\ No newline at end of file
+                assert prediction.features_used[column] == sample_features[column].iloc[0]
+
+    def test_batch_matches_row_predictions(self, fitted_server, batch_features):
+        """Test that batch scoring reproduces the row-by-row output"""
+        fitted_server.batch = True
+        batch_predictions = fitted_server.predict(batch_features)
+        fitted_server.batch = False
+        row_predictions = fitted_server.predict(batch_features)
+        
+        assert len(batch_predictions) == len(row_predictions) == len(batch_features)
+        for batch_pred, row_pred in zip(batch_predictions, row_predictions):
+            assert batch_pred == row_pred
+
+    def test_predict_batch_matches_predict(self, fitted_server, batch_features):
+        """Test that the columnar batch holds what predict returns per row"""
+        batch = fitted_server.predict_batch(batch_features)
+        predictions = fitted_server.predict(batch_features)
+
+        assert len(batch) == len(batch_features)
+        assert batch.to_predictions() == predictions
+        assert list(batch.feature_names) == list(predictions[0].features_used)
+        fitted_server.batch = False
+        rows = fitted_server.predict_batch(batch_features)
+        np.testing.assert_allclose(rows.predicted_latency, batch.predicted_latency)
+
+    @pytest.mark.parametrize('batch', [True, False])
+    def test_predict_batch_of_no_rows(self, fitted_server, batch_features, batch):
+        """Test that an empty frame gives an empty batch in both modes"""
+        fitted_server.batch = batch
+        predictions = fitted_server.predict_batch(batch_features.iloc[:0])
+
+        assert len(predictions) == 0
+        assert predictions.features.shape == (0, 5)
+        assert predictions.model_version == fitted_server.model_version
+        assert predictions.to_predictions() == []
+
+    @pytest.mark.asyncio
+    async def test_swap_model(self, fitted_server, batch_features):
+        """Test that a swapped-in model serves the next batch"""
+        old_version = fitted_server.model_version
+        old_predictions = fitted_server.predict(batch_features)
+        
+        X = batch_features.select_dtypes(include='number').to_numpy()
+        new_model = GradientBoostingRegressor(n_estimators=5).fit(X, np.full(len(X), 42.0))
+        version = await fitted_server.swap_model(new_model, version="v2")
+        
+        assert version == "v2"
+        assert fitted_server.model_version == "v2"
+        assert fitted_server.model is new_model
+        new_predictions = fitted_server.predict(batch_features)
+        assert all(p.model_version == "v2" for p in new_predictions)
+        assert all(np.isclose(p.predicted_latency, 42.0) for p in new_predictions)
+        assert all(p.model_version == old_version for p in old_predictions)
+
+    @pytest.mark.asyncio
+    async def test_in_flight_batch_keeps_model(self, fitted_server, batch_features):
+        """Test that a batch started before a swap finishes on the old model"""
+        served = fitted_server._served
+        X = batch_features.select_dtypes(include='number').to_numpy()
+        await fitted_server.swap_model(
+            GradientBoostingRegressor(n_estimators=5).fit(X, np.zeros(len(X))), 
+            version="v2"
+        )
+        
+        predictions = fitted_server._predict_batch(batch_features, served)
+        assert all(p.model_version == served.version for p in predictions)
+
+    @pytest.mark.asyncio
+    async def test_swap_version_requires_registry(self, fitted_server):
+        """Test that swapping by version without a registry is rejected"""
+        with pytest.raises(ValueError):
+            await fitted_server.swap_version("v2")
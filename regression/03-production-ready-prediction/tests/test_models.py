@@ -1,6 +1,9 @@
 import pytest
-from datetime import datetime
-from api_performance_prediction.domain.models import APIMetric, PredictionResult
+from datetime import datetime, timedelta
+import numpy as np
+from api_performance_prediction.domain.models import (
+    APIMetric, CompactAPIMetric, CompactPredictionResult, MetricBatch, PredictionBatch, PredictionResult
+)
 
 class TestAPIMetric:
     def test_valid_metric_creation(self):
@@ -84,4 +87,148 @@ class TestPredictionResult:
                 confidence_interval=(160.0, 190.0),
                 features_used={"cpu_usage": "invalid"},  # Invalid: string instead of float
                 model_version="20231217_001"
-            )
\ No newline at end of file
+            )
+
+class TestMetricBatch:
+    @pytest.fixture
+    def sample_metrics(self):
+        """Create metrics for two endpoints"""
+        base_time = datetime(2024, 1, 1, 12, 0)
+        return [
+            APIMetric(
+                timestamp=base_time + timedelta(minutes=5 * i),
+                endpoint=f"http://api{i % 2}.example.com",
+                latency_ms=100.0 + i,
+                status_code=200 if i % 3 else 503,
+                cpu_usage=40.0 + i,
+                memory_usage=70.0 + i,
+                request_count=1000 + i,
+                error_count=i
+            )
+            for i in range(6)
+        ]
+
+    def test_round_trip(self, sample_metrics):
+        """Test that metrics survive conversion to columns and back"""
+        batch = MetricBatch.from_metrics(sample_metrics)
+        
+        assert len(batch) == len(sample_metrics)
+        assert batch.endpoints == ("http://api0.example.com", "http://api1.example.com")
+        assert batch.endpoint_code.tolist() == [0, 1, 0, 1, 0, 1]
+        assert batch.to_metrics() == sample_metrics
+
+    def test_frame_shares_memory(self, sample_metrics):
+        """Test that the DataFrame is a view over the batch arrays"""
+        batch = MetricBatch.from_metrics(sample_metrics)
+        df = batch.to_frame()
+        
+        for name in ['timestamp', 'latency_ms', 'status_code', 'cpu_usage',
+                     'memory_usage', 'request_count', 'error_count']:
+            assert np.shares_memory(df[name].to_numpy(), getattr(batch, name))
+        assert np.shares_memory(df['endpoint'].array.codes, batch.endpoint_code)
+        assert df['endpoint'].tolist() == [m.endpoint for m in sample_metrics]
+
+    def test_column_validation(self, sample_metrics):
+        """Test that mistyped or ragged columns are rejected"""
+        batch = MetricBatch.from_metrics(sample_metrics)
+        columns = {name: getattr(batch, name) for name in batch.__dataclass_fields__}
+        
+        with pytest.raises(TypeError):
+            MetricBatch(**{**columns, 'latency_ms': batch.latency_ms.astype(np.float32)})
+        with pytest.raises(ValueError):
+            MetricBatch(**{**columns, 'cpu_usage': batch.cpu_usage[:-1]})
+
+    def test_empty_batch(self):
+        """Test that an empty batch converts to an empty frame"""
+        batch = MetricBatch.empty(["http://api.example.com"])
+        assert len(batch) == 0
+        assert batch.to_frame().empty
+
+    def test_compact_metrics(self):
+        """Test that compact metrics carry the same values without a __dict__"""
+        metric = APIMetric(datetime(2024, 1, 1), "http://api.example.com", 150.5, 200, 45.2, 78.1, 1000, 5)
+        batch = MetricBatch.from_metrics([metric])
+        compact = batch.to_metrics(compact=True)[0]
+
+        assert isinstance(compact, CompactAPIMetric)
+        assert not hasattr(compact, '__dict__')
+        assert MetricBatch.from_metrics([compact]).to_metrics() == [metric]
+
+class TestPredictionBatch:
+    @pytest.fixture
+    def batch(self):
+        """Create a batch of four predictions over two endpoints"""
+        return PredictionBatch.from_columns(
+            ["http://api0.example.com", "http://api1.example.com"],
+            ["cpu_usage", "request_count"],
+            "20231217_001",
+            endpoint_code=[0, 1, 0, 1],
+            timestamp=np.arange(4) * np.timedelta64(5, 'm') + np.datetime64('2024-01-01T12:00'),
+            predicted_latency=[100.0, 110.0, 120.0, 130.0],
+            lower=[90.0, 100.0, 110.0, 120.0],
+            upper=[110.0, 120.0, 130.0, 140.0],
+            features=[[40.0, 1000], [41.0, 1001], [42.0, 1002], [43.0, 1003]]
+        )
+
+    def test_rows_are_compact_views(self, batch):
+        """Test that rows read from the arrays and share the feature matrix"""
+        row = batch[2]
+
+        assert isinstance(row, CompactPredictionResult)
+        assert not hasattr(row, '__dict__')
+        assert row.timestamp == datetime(2024, 1, 1, 12, 10)
+        assert row.endpoint == "http://api0.example.com"
+        assert row.confidence_interval == (110.0, 130.0)
+        assert row.features_used == {"cpu_usage": 42.0, "request_count": 1002.0}
+        assert np.shares_memory(row.features, batch.features)
+        assert [p.predicted_latency for p in batch] == [100.0, 110.0, 120.0, 130.0]
+        assert batch.endpoint_names() == ["http://api0.example.com", "http://api1.example.com"] * 2
+
+    def test_rows_skip_per_row_validation(self, batch, monkeypatch):
+        """Test that row views rely on the batch's checks, direct instances don't"""
+        def refuse(self):
+            raise AssertionError("row validated again")
+        monkeypatch.setattr(CompactPredictionResult, '__post_init__', refuse)
+
+        assert [row.confidence_interval for row in batch][0] == (90.0, 110.0)
+        row = batch[1]
+        assert (row.timestamp, row.endpoint, row.predicted_latency, row.model_version) == (
+            datetime(2024, 1, 1, 12, 5), "http://api1.example.com", 110.0, "20231217_001"
+        )
+        monkeypatch.undo()
+        with pytest.raises(ValueError):
+            CompactPredictionResult(
+                datetime(2024, 1, 1), "http://api0.example.com", 100.0, (110.0, 90.0),
+                batch.features[0], batch.feature_names, "20231217_001"
+            )
+
+    def test_round_trip(self, batch):
+        """Test that materialized predictions convert back to the same batch"""
+        predictions = batch.to_predictions()
+        again = PredictionBatch.from_predictions(predictions)
+
+        assert predictions[1].features_used == {"cpu_usage": 41.0, "request_count": 1001.0}
+        assert predictions[1].model_version == "20231217_001"
+        assert again.to_predictions() == predictions
+        np.testing.assert_array_equal(again.features, batch.features)
+
+    def test_vectorized_validation(self, batch):
+        """Test that one inverted interval or a non-numeric matrix rejects the batch"""
+        columns = {name: getattr(batch, name) for name in batch.__dataclass_fields__}
+        lower = batch.lower.copy()
+        lower[3] = 150.0
+
+        with pytest.raises(ValueError):
+            PredictionBatch(**{**columns, 'lower': lower})
+        with pytest.raises(TypeError):
+            PredictionBatch(**{**columns, 'features': batch.features.astype(str)})
+        with pytest.raises(ValueError):
+            PredictionBatch(**{**columns, 'features': batch.features[:, :1]})
+
+    def test_frame(self, batch):
+        """Test that the frame has one column per field and feature"""
+        df = batch.to_frame()
+        assert list(df.columns) == [
+            'timestamp', 'endpoint', 'predicted_latency', 'lower', 'upper', 'cpu_usage', 'request_count'
+        ]
+        assert df['endpoint'].tolist() == batch.endpoint_names()
@@ -2,6 +2,7 @@ import pytest
 from datetime import datetime
 import numpy as np
 from api_performance_prediction.monitoring.monitor import ModelMonitor
+from api_performance_prediction.monitoring.statistics import MapeHistory, RunningStats
 from api_performance_prediction.domain.models import PredictionResult, APIMetric
 
 class TestModelMonitor:
@@ -179,4 +180,58 @@ class TestModelMonitor:
         
         metrics = monitor.evaluate_predictions(predictions, actuals)
         # Should have zero MAPE as no endpoints match
-        assert metrics.mape == 0.0
\ No newline at end of file
+        assert metrics.mape == 0.0
+
+def legacy_drift(history, window_size, drift_threshold):
+    """The list-based check the streaming statistics replace"""
+    if len(history) < window_size or len(history) == window_size:
+        return False
+    recent = np.mean(history[-window_size:])
+    baseline = np.mean(history[:-window_size])
+    return recent > baseline + drift_threshold * np.std(history)
+
+class TestStreamingStatistics:
+    def test_running_stats_match_numpy(self):
+        rng = np.random.default_rng(1)
+        values = rng.gamma(2.0, 5.0, 5000)
+        stats = RunningStats()
+        for value in values:
+            stats.update(value)
+        assert stats.mean == pytest.approx(values.mean(), rel=1e-12)
+        assert stats.std == pytest.approx(values.std(), rel=1e-9)
+
+    def test_half_life_forgets_old_regime(self):
+        """Test that a decayed baseline follows a level shift"""
+        decayed, full = RunningStats(half_life=50), RunningStats()
+        for value in [5.0] * 1000 + [20.0] * 500:
+            decayed.update(value)
+            full.update(value)
+        assert decayed.mean == pytest.approx(20.0, abs=0.02)  # Old regime weighs 2 ** -10
+        assert full.mean == pytest.approx(10.0)
+
+    def test_history_is_bounded(self):
+        history = MapeHistory(window_size=5)
+        for i in range(1000):
+            history.append(float(i))
+        assert len(history) == 1000
+        assert list(history) == [995.0, 996.0, 997.0, 998.0, 999.0]
+        assert history.recent_mean == pytest.approx(997.0)
+        assert history.baseline.count == 995
+        assert history.baseline.mean == pytest.approx(497.0)
+
+    def test_replay_alerts_like_full_history(self):
+        """Test that drift flags match the list-based check on a replayed history"""
+        rng = np.random.default_rng(7)
+        mapes = np.concatenate([
+            rng.gamma(4.0, 2.0, 600), rng.gamma(4.0, 6.0, 150), rng.gamma(4.0, 2.0, 300)
+        ])
+        monitor = ModelMonitor(window_size=50)
+        history = []
+        flags, expected = [], []
+        for mape in mapes.tolist():
+            monitor.historical_mapes.append(mape)
+            history.append(mape)
+            flags.append(monitor._check_drift())
+            expected.append(legacy_drift(history, 50, monitor.drift_threshold))
+        assert flags == expected
+        assert any(flags)
@@ -0,0 +1,191 @@
+import pytest
+import asyncio
+import os
+import pickle
+import time
+import numpy as np
+from datetime import datetime, timedelta
+from sklearn.ensemble import GradientBoostingRegressor
+
+from api_performance_prediction.collection.store import MetricStore
+from api_performance_prediction.domain.models import APIMetric
+from api_performance_prediction.monitoring.instrumentation import Instrumentation
+from api_performance_prediction.monitoring.loop_lag import LoopLagMonitor
+from api_performance_prediction.monitoring.monitor import ModelMonitor
+from api_performance_prediction.orchestrator import PredictionSystem
+from api_performance_prediction.prediction.model import ModelServer
+from api_performance_prediction.prediction.offload import PredictionStage, predict_newest
+from api_performance_prediction.prediction.preprocessor import DataPreprocessor
+from api_performance_prediction.prediction.registry import ModelRegistry
+
+ENDPOINTS = [f"http://api{i}.example.com" for i in range(4)]
+
+@pytest.fixture
+def recent_batch():
+    store = MetricStore(ENDPOINTS, capacity=50)
+    for i in range(30):
+        for j, endpoint in enumerate(ENDPOINTS):
+            store.append(APIMetric(
+                timestamp=datetime(2024, 1, 1) + timedelta(minutes=5 * i),
+                endpoint=endpoint,
+                latency_ms=100.0 + 10 * j + i % 5,
+                status_code=200,
+                cpu_usage=40.0 + j,
+                memory_usage=70.0,
+                request_count=1000,
+                error_count=5
+            ))
+    return store.recent(24)
+
+@pytest.fixture
+def model_server(recent_batch):
+    features = DataPreprocessor(grouped=True).create_feature_vector(recent_batch)
+    columns = list(features.select_dtypes(include='number').columns)
+    server = ModelServer()
+    server.model = GradientBoostingRegressor(n_estimators=10, random_state=0).fit(
+        features[columns], features['latency_ms']
+    )
+    return server
+
+class TestPredictionStage:
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('mode', ['inline', 'thread', 'process'])
+    async def test_modes_agree(self, mode, recent_batch, model_server):
+        """Test that every mode predicts the same newest rows"""
+        preprocessor = DataPreprocessor(grouped=True)
+        expected = predict_newest(preprocessor, model_server, recent_batch)
+        instrumentation = Instrumentation(len(ENDPOINTS))
+        stage = PredictionStage(preprocessor, model_server, mode, instrumentation=instrumentation)
+        try:
+            predictions = await stage.predict(recent_batch)
+            monitor = ModelMonitor()
+            horizons = np.full(len(predictions), 300.0)
+            monitoring = await stage.evaluate(
+                monitor, predictions, recent_batch, horizons, horizons / 2
+            )
+        finally:
+            stage.shutdown()
+
+        assert [p.endpoint for p in predictions] == ENDPOINTS
+        assert [p.predicted_latency for p in predictions] == pytest.approx(
+            [p.predicted_latency for p in expected]
+        )
+        # Nothing was tracked yet, these wait for the next samples
+        assert monitoring.prediction_count == 0
+        assert len(monitor.pending) == len(ENDPOINTS)
+        stages = instrumentation.snapshot()['stages']
+        assert stages['preprocess']['items'] == len(recent_batch)
+        assert stages['predict']['items'] == len(ENDPOINTS)
+        assert stages['monitor']['spans'] == 1
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('backend', ['sklearn', 'compiled'])
+    async def test_process_mode_opens_registry_versions(self, backend, tmp_path,
+                                                       recent_batch, model_server):
+        """Test that workers open a registry-backed server's version themselves"""
+        registry = ModelRegistry(str(tmp_path / "models"))
+        model = model_server.model
+        registry.publish(model, (datetime(2024, 1, 1), datetime(2024, 1, 2)),
+                         list(model.feature_names_in_), version="v1")
+        server = ModelServer(registry=registry, backend=backend)
+        preprocessor = DataPreprocessor(grouped=True)
+        expected = predict_newest(preprocessor, server, recent_batch)
+        stage = PredictionStage(preprocessor, server, 'process')
+        try:
+            predictions = await stage.predict(recent_batch)
+        finally:
+            stage.shutdown()
+
+        assert server.registry_location == (registry.root, "v1")
+        assert [p.model_version for p in predictions] == ["v1"] * len(ENDPOINTS)
+        assert [p.predicted_latency for p in predictions] == pytest.approx(
+            [p.predicted_latency for p in expected]
+        )
+
+    @pytest.mark.asyncio
+    async def test_process_mode_ships_each_version_once(self, recent_batch, model_server):
+        """Test that calls send a version's name, not the model or preprocessor"""
+        preprocessor = DataPreprocessor(grouped=True)
+        stage = PredictionStage(preprocessor, model_server, 'process')
+        sent = []
+        submit = stage._executor.submit
+        stage._executor.submit = lambda fn, *args: sent.append(pickle.dumps(args)) or submit(fn, *args)
+        try:
+            for _ in range(3):
+                await stage.predict(recent_batch)
+            await model_server.swap_model(model_server.model, "v2")
+            predictions = await stage.predict(recent_batch)
+            spilled = sorted(os.listdir(stage._spill_dir))
+        finally:
+            stage.shutdown()
+
+        assert len(sent) == 4
+        assert max(len(args) for args in sent) < len(pickle.dumps(recent_batch)) + 200
+        assert spilled == ['1', '2']
+        assert [p.model_version for p in predictions] == ["v2"] * len(ENDPOINTS)
+        assert not os.path.exists(stage._spill_dir)
+
+    def test_unknown_mode(self, model_server):
+        with pytest.raises(ValueError):
+            PredictionStage(DataPreprocessor(), model_server, 'gpu')
+
+    @pytest.mark.asyncio
+    async def test_thread_mode_keeps_the_loop_free(self, recent_batch, model_server):
+        """Test that a slow inference call doesn't block the loop"""
+        predict_batch = model_server.predict_batch
+        model_server.predict_batch = lambda features: time.sleep(0.3) or predict_batch(features)
+        stage = PredictionStage(DataPreprocessor(grouped=True), model_server, 'thread')
+        lag = LoopLagMonitor(interval=0.01)
+        lag.start()
+        try:
+            await stage.predict(recent_batch)
+        finally:
+            await lag.stop()
+            stage.shutdown()
+        assert lag.summary()['samples'] > 5
+        assert lag.max_lag < 0.2
+
+@pytest.mark.asyncio
+async def test_loop_lag_records_blocking():
+    """Test that blocking the loop shows up as lag"""
+    lag = LoopLagMonitor(interval=0.01, warn_threshold=None)
+    lag.start()
+    await asyncio.sleep(0.05)
+    time.sleep(0.2)
+    await asyncio.sleep(0.05)
+    await lag.stop()
+
+    summary = lag.summary()
+    assert summary['max'] >= 0.15
+    assert summary['p50'] < 0.05
+
+@pytest.mark.asyncio
+async def test_busy_slots_coalesce_new_samples(recent_batch, model_server):
+    """Test that samples arriving during a pass wait and share the next one"""
+    system = PredictionSystem(ENDPOINTS, coalesce_window=0.01, max_inflight=1)
+    system.model_server.model = model_server.model
+    for metric in recent_batch.to_metrics():
+        system.collector.store.append(metric)
+    passes = []
+    predict_batch = system.model_server.predict_batch
+
+    def slow_predict(features):
+        passes.append(sorted(features['endpoint'].astype(str)))
+        time.sleep(0.2)
+        return predict_batch(features)
+
+    system.model_server.predict_batch = slow_predict
+    system._running = True
+    task = asyncio.create_task(system._prediction_loop())
+    await asyncio.sleep(0.1)
+    store = system.collector.store
+    for endpoint in ENDPOINTS[1:3]:
+        store.append(store.latest(endpoint))
+    for _ in range(100):
+        if len(passes) > 1:
+            break
+        await asyncio.sleep(0.02)
+    await system.stop()
+    await asyncio.wait_for(task, 2)
+
+    assert passes == [ENDPOINTS, ENDPOINTS[1:3]]
@@ -3,7 +3,7 @@ from datetime import datetime, timedelta
 import pandas as pd
 import numpy as np
 from api_performance_prediction.prediction.preprocessor import DataPreprocessor
-from api_performance_prediction.domain.models import APIMetric
+from api_performance_prediction.domain.models import APIMetric, MetricBatch
 
 class TestDataPreprocessor:
     @pytest.fixture
@@ -85,4 +85,106 @@ class TestDataPreprocessor:
         assert all(0 <= dow <= 6 for dow in df['day_of_week'])
         
         # Check that the hour matches the input timestamp
-        assert df['hour'].iloc[0] == sample_metrics[0].timestamp.hour
\ No newline at end of file
+        assert df['hour'].iloc[0] == sample_metrics[0].timestamp.hour
+
+    def test_metric_batch_input(self, preprocessor, sample_metrics):
+        """Test that a columnar batch gives the same features as the list"""
+        batch = MetricBatch.from_metrics(sample_metrics)
+        latencies = batch.latency_ms.copy()
+        from_list = preprocessor.create_feature_vector(sample_metrics)
+        from_batch = preprocessor.create_feature_vector(batch)
+        
+        numeric = from_list.select_dtypes(include='number').columns
+        pd.testing.assert_frame_equal(
+            from_batch[numeric].astype(float), from_list[numeric].astype(float)
+        )
+        assert list(from_batch['endpoint']) == list(from_list['endpoint'])
+        # The batch's own arrays are left untouched
+        np.testing.assert_array_equal(batch.latency_ms, latencies)
+
+
+class TestGroupedFeatures:
+    @pytest.fixture
+    def interleaved_metrics(self):
+        """Create metrics for three endpoints collected in the same cycles"""
+        rng = np.random.default_rng(5)
+        base_time = datetime(2024, 3, 9, 22, 0)
+        metrics = []
+        for i in range(40):
+            for endpoint in ("http://api1.example.com", "http://api2.example.com",
+                             "http://api3.example.com"):
+                metrics.append(APIMetric(
+                    timestamp=base_time + timedelta(minutes=5 * i),
+                    endpoint=endpoint,
+                    latency_ms=float(rng.uniform(50, 500)),
+                    status_code=200,
+                    cpu_usage=float(rng.uniform(0, 100)),
+                    memory_usage=float(rng.uniform(0, 100)),
+                    request_count=int(rng.integers(100, 2000)),
+                    error_count=int(rng.integers(0, 20))
+                ))
+        return metrics
+
+    def test_rolling_means_per_endpoint(self, interleaved_metrics):
+        """Test that rolling windows never mix endpoints"""
+        df = DataPreprocessor(window_size=4, grouped=True).create_feature_vector(
+            interleaved_metrics
+        )
+        
+        for endpoint, group in df.groupby('endpoint'):
+            assert group['timestamp'].is_monotonic_increasing
+            for col in ['latency_ms', 'cpu_usage', 'memory_usage', 'request_count']:
+                expected = group[col].astype(float).rolling(4, min_periods=1).mean()
+                np.testing.assert_allclose(
+                    group[f'{col}_rolling_mean'], expected, rtol=1e-12
+                )
+
+    def test_sorted_by_endpoint_then_time(self, interleaved_metrics):
+        """Test that grouped output is ordered by (endpoint, timestamp)"""
+        df = DataPreprocessor(grouped=True).create_feature_vector(interleaved_metrics[::-1])
+        
+        assert list(df.index) == list(range(len(interleaved_metrics)))
+        keys = list(zip(df['endpoint'], df['timestamp']))
+        assert keys == sorted(keys)
+
+    def test_time_features_match_datetime_accessor(self, interleaved_metrics):
+        """Test that epoch arithmetic gives the same hour and weekday"""
+        df = DataPreprocessor(grouped=True).create_feature_vector(interleaved_metrics)
+        
+        assert (df['hour'] == df['timestamp'].dt.hour).all()
+        assert (df['day_of_week'] == df['timestamp'].dt.dayofweek).all()
+
+    def test_timezone_aware_timestamps(self, interleaved_metrics):
+        """Test that local hours are kept for timezone-aware timestamps"""
+        df = pd.DataFrame([DataPreprocessor()._metric_to_dict(m) for m in interleaved_metrics])
+        df['timestamp'] = df['timestamp'].dt.tz_localize('US/Pacific')
+        features = DataPreprocessor(grouped=True).build_features(df)
+        
+        assert (features['hour'] == features['timestamp'].dt.hour).all()
+
+    def test_fewer_rows_than_window(self, interleaved_metrics):
+        """Test that a frame shorter than the window gives expanding means"""
+        metrics = [m for m in interleaved_metrics if m.endpoint == "http://api1.example.com"][:8]
+        df = DataPreprocessor(window_size=12, grouped=True).create_feature_vector(metrics)
+        
+        expected = np.cumsum([m.latency_ms for m in metrics]) / np.arange(1, 9)
+        np.testing.assert_allclose(df['latency_ms_rolling_mean'], expected, rtol=1e-12)
+
+    def test_window_sums_restart_per_endpoint(self):
+        """Test that a large earlier endpoint doesn't cost a later one precision"""
+        n = 200_000
+        rng = np.random.default_rng(6)
+        df = pd.DataFrame({
+            'timestamp': np.tile(pd.date_range('2024-01-01', periods=n, freq='5min'), 2),
+            'endpoint': ["http://a.example.com"] * n + ["http://b.example.com"] * n,
+            'latency_ms': np.r_[np.full(n, 1e10), rng.uniform(0, 1, n)],
+            'cpu_usage': 50.0,
+            'memory_usage': 50.0,
+            'request_count': 1000,
+            'error_count': 0
+        })
+        features = DataPreprocessor(window_size=4, grouped=True).build_features(df)
+        
+        small = features[features['endpoint'] == "http://b.example.com"]
+        expected = small['latency_ms'].rolling(4, min_periods=1).mean()
+        np.testing.assert_allclose(small['latency_ms_rolling_mean'], expected, rtol=1e-9)
@@ -0,0 +1,163 @@
+import pytest
+from datetime import datetime
+from aiohttp import web
+
+from api_performance_prediction.collection.collector import MetricsCollector
+from api_performance_prediction.collection.prometheus import (
+    FieldRule, PrometheusMapper, PrometheusParser, Selector, parse_exposition
+)
+
+def exposition(requests: int, errors: int, duration_sum: float, cpu: float = 0.45) -> bytes:
+    return f"""# HELP http_requests_total Requests handled
+# TYPE http_requests_total counter
+http_requests_total{{method="GET",status="200"}} {requests - errors}
+{f'http_requests_total{{method="GET",status="503"}} {errors}' if errors else ''}
+http_requests_total_created{{method="GET",status="200"}} 1.7e9
+# TYPE http_request_duration_seconds summary
+http_request_duration_seconds_sum {duration_sum}
+http_request_duration_seconds_count {requests}
+# TYPE jvm_threads gauge
+jvm_threads{{state="runnable"}} 12
+process_cpu_usage {cpu}
+process_memory_usage 0.75
+""".encode()
+
+class TestPrometheusParser:
+    def test_sums_matching_samples(self):
+        """Test that only selected names and matching labels are summed"""
+        total = Selector.of('http_requests_total')
+        errors = Selector.of('http_requests_total', status='5..')
+        totals = parse_exposition(exposition(1000, 5, 150.0), [total, errors])
+
+        assert totals[total] == 1000
+        assert totals[errors] == 5
+
+    def test_labels_and_values(self):
+        """Test escaped label values, special values and timestamps"""
+        body = (b'up{path="/a\\"b\\\\",note="x,y=z"} 1 1700000000000\n'
+                b'up{path="/c"} +Inf\n'
+                b'up {} 2\n')
+        quoted = Selector.of('up', path='/a"b\\\\')
+        totals = parse_exposition(body, [quoted, Selector.of('up', path='/c')])
+
+        assert totals[quoted] == 1
+        assert totals[Selector.of('up', path='/c')] == float('inf')
+
+    def test_feeding_in_chunks(self):
+        """Test that lines split across chunks parse the same as a whole body"""
+        body = exposition(1000, 5, 150.0) * 50
+        selectors = [Selector.of('http_requests_total', status='5..'),
+                     Selector.of('http_request_duration_seconds_sum')]
+        whole = parse_exposition(body, selectors)
+        for size in (1, 7, 64, 4096):
+            parser = PrometheusParser(selectors)
+            for start in range(0, len(body), size):
+                parser.feed(body[start:start + size])
+            assert parser.close() == whole
+
+    def test_prefix_names_are_not_matched(self):
+        """Test that longer names starting with a selected one are skipped"""
+        body = b'requests 1\nrequests_total 10\nrequests{a="b"} 2\n'
+        assert parse_exposition(body, [Selector.of('requests')])[Selector.of('requests')] == 3
+
+class TestPrometheusMapper:
+    def test_counters_use_changes_between_scrapes(self):
+        """Test that the first scrape is a baseline and later ones are rates"""
+        mapper = PrometheusMapper()
+
+        def scrape(*args, **kwargs):
+            parser = mapper.parser()
+            parser.feed(exposition(*args, **kwargs))
+            return mapper.to_metric('ep', datetime(2024, 1, 1), 200, parser)
+
+        assert scrape(1000, 5, 150.0) is None
+        metric = scrape(1400, 9, 210.0, cpu=0.5)
+        assert metric.request_count == 400
+        assert metric.error_count == 4
+        assert metric.latency_ms == pytest.approx(150.0)  # 60s over 400 requests
+        assert metric.cpu_usage == pytest.approx(50.0)
+        assert metric.memory_usage == pytest.approx(75.0)
+
+        # An idle interval keeps the cumulative latency, a restart the new counts
+        assert scrape(1400, 9, 210.0).latency_ms == pytest.approx(150.0)
+        assert scrape(100, 1, 20.0).request_count == 100
+
+    def test_missing_metrics(self):
+        mapper = PrometheusMapper()
+        parser = mapper.parser()
+        parser.feed(b'process_cpu_usage 0.5\n')
+        with pytest.raises(KeyError):
+            mapper.payload('ep', parser)
+
+    def test_no_matching_labels_is_zero(self):
+        """Test that a healthy target exposing only 2xx series has no errors"""
+        mapper = PrometheusMapper()
+        for requests in (1000, 1400):
+            parser = mapper.parser()
+            parser.feed(exposition(requests, 0, requests * 0.15))
+            payload = mapper.payload('ep', parser)
+        assert payload['request_count'] == 400
+        assert payload['error_count'] == 0
+
+    def test_custom_rules_must_cover_payload(self):
+        with pytest.raises(ValueError):
+            MetricsCollector(['ep'], prometheus=PrometheusMapper(
+                {'cpu_usage': FieldRule(Selector.of('cpu'))}
+            ))
+
+@pytest.fixture
+async def prometheus_server(unused_tcp_port, request):
+    scrapes = {'count': 0}
+    errors = getattr(request, 'param', 5)  # 5xx responses per scrape
+
+    async def metrics_handler(request):
+        scrapes['count'] += 1
+        n = scrapes['count']
+        return web.Response(
+            body=exposition(1000 * n, errors * n, 150.0 * n),
+            content_type='text/plain', charset='utf-8'
+        )
+
+    app = web.Application()
+    app.router.add_get('/{endpoint}/metrics', metrics_handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', unused_tcp_port)
+    await site.start()
+
+    yield f'http://127.0.0.1:{unused_tcp_port}'
+
+    await runner.cleanup()
+
+@pytest.mark.asyncio
+async def test_collector_scrapes_prometheus_text(prometheus_server):
+    """Test that text expositions are collected once counters have a baseline"""
+    endpoint = f'{prometheus_server}/ep'
+    collector = MetricsCollector([endpoint])
+    try:
+        assert len(await collector.collect_batch()) == 0
+        batch = await collector.collect_batch()
+    finally:
+        await collector.stop()
+
+    assert len(batch) == 1
+    assert batch.request_count[0] == 1000
+    assert batch.error_count[0] == 5
+    assert batch.latency_ms[0] == pytest.approx(150.0)
+    assert collector.last_report.failed == []
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('prometheus_server', [0], indirect=True)
+async def test_collector_scrapes_target_without_errors(prometheus_server):
+    """Test that a target with only 2xx series is collected, not failed"""
+    endpoint = f'{prometheus_server}/ep'
+    collector = MetricsCollector([endpoint])
+    try:
+        await collector.collect_batch()
+        batch = await collector.collect_batch()
+    finally:
+        await collector.stop()
+
+    assert collector.last_report.failed == []
+    assert batch.request_count.tolist() == [1000]
+    assert batch.error_count.tolist() == [0]
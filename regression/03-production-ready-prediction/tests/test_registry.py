@@ -0,0 +1,121 @@
+import pytest
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+from sklearn.ensemble import GradientBoostingRegressor
+
+from api_performance_prediction.prediction.registry import ModelRegistry
+from api_performance_prediction.prediction.model import ModelServer
+
+FEATURES = ['cpu_usage', 'memory_usage', 'request_count', 'error_rate']
+
+class TestModelRegistry:
+    @pytest.fixture
+    def features(self):
+        """Create a feature frame with the registry's feature schema"""
+        rng = np.random.default_rng(7)
+        n = 40
+        frame = pd.DataFrame({
+            'timestamp': pd.date_range('2024-01-01', periods=n, freq='5min'),
+            'endpoint': ['http://api.example.com'] * n,
+            'cpu_usage': rng.uniform(20, 90, n),
+            'memory_usage': rng.uniform(40, 95, n),
+            'request_count': rng.integers(500, 2000, n),
+            'error_rate': rng.uniform(0, 0.05, n)
+        })
+        return frame
+
+    @pytest.fixture
+    def fitted_model(self, features):
+        """Fit a small model on the schema columns"""
+        X = features[FEATURES].to_numpy()
+        y = 100 + 2 * X[:, 0] + np.random.default_rng(3).normal(0, 5, len(X))
+        return GradientBoostingRegressor(n_estimators=15, random_state=0).fit(X, y)
+
+    @pytest.fixture
+    def registry(self, tmp_path):
+        return ModelRegistry(str(tmp_path / "models"))
+
+    @pytest.fixture
+    def window(self):
+        end = datetime(2024, 1, 8)
+        return (end - timedelta(days=7), end)
+
+    def test_publish_writes_manifest(self, registry, fitted_model, window):
+        """Test that publishing records hash, window and schema"""
+        manifest = registry.publish(fitted_model, window, FEATURES)
+        
+        assert registry.latest_version() == manifest.version
+        assert registry.versions() == [manifest.version]
+        assert manifest.content_hash[:12] in manifest.version
+        assert registry.manifest() == manifest
+        assert manifest.training_window == window
+        assert manifest.feature_schema == FEATURES
+        assert manifest.compiled
+        assert registry.verify(manifest.version)
+
+    def test_latest_follows_publish(self, registry, fitted_model, window):
+        """Test that the newest publish becomes the latest version"""
+        first = registry.publish(fitted_model, window, FEATURES, version="v1")
+        second = registry.publish(fitted_model, window, FEATURES, version="v2")
+        
+        assert registry.versions() == [first.version, second.version]
+        assert registry.latest_version() == "v2"
+
+    def test_unknown_version(self, registry, fitted_model, window):
+        """Test that missing versions raise LookupError"""
+        with pytest.raises(LookupError):
+            registry.latest_version()
+        registry.publish(fitted_model, window, FEATURES)
+        with pytest.raises(LookupError):
+            registry.manifest("does-not-exist")
+
+    def test_tampered_artifact_fails_verification(self, registry, fitted_model, window):
+        """Test that hash verification detects a modified artifact"""
+        manifest = registry.publish(fitted_model, window, FEATURES)
+        with open(f"{registry.root}/{manifest.version}/model.joblib", 'ab') as f:
+            f.write(b"garbage")
+        
+        assert not registry.verify(manifest.version)
+
+    def test_compiled_arrays_are_memory_mapped(self, registry, fitted_model, window):
+        """Test that the compiled export is served from memory maps"""
+        registry.publish(fitted_model, window, FEATURES)
+        compiled = registry.load_compiled()
+        
+        assert isinstance(compiled.threshold, np.memmap)
+        assert isinstance(compiled.value, np.memmap)
+
+    @pytest.mark.parametrize("backend", ['sklearn', 'compiled'])
+    def test_model_server_from_registry(self, registry, fitted_model, window, 
+                                        features, backend):
+        """Test that the server takes its version from the manifest"""
+        manifest = registry.publish(fitted_model, window, FEATURES)
+        server = ModelServer(backend=backend, registry=registry)
+        
+        assert server.model_version == manifest.version
+        predictions = server.predict(features)
+        expected = fitted_model.predict(features[FEATURES].to_numpy())
+        
+        np.testing.assert_allclose(
+            [p.predicted_latency for p in predictions], expected, rtol=1e-10
+        )
+        assert all(p.model_version == manifest.version for p in predictions)
+        assert set(predictions[0].features_used) == set(FEATURES)
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("backend", ['sklearn', 'compiled'])
+    async def test_swap_version(self, registry, fitted_model, window, features, backend):
+        """Test that a newly published version is swapped in warm"""
+        first = registry.publish(fitted_model, window, FEATURES, version="v1")
+        server = ModelServer(backend=backend, registry=registry)
+        
+        X = features[FEATURES].to_numpy()
+        retrained = GradientBoostingRegressor(n_estimators=5).fit(X, np.full(len(X), 7.0))
+        registry.publish(retrained, window, FEATURES, version="v2")
+        
+        assert server.model_version == first.version
+        assert await server.swap_version() == "v2"
+        predictions = server.predict(features)
+        assert all(p.model_version == "v2" for p in predictions)
+        assert all(np.isclose(p.predicted_latency, 7.0) for p in predictions)
@@ -0,0 +1,164 @@
+import pytest
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from datetime import datetime, timedelta
+from sklearn.ensemble import GradientBoostingRegressor
+
+from api_performance_prediction.domain.models import APIMetric
+from api_performance_prediction.prediction.model import ModelServer
+from api_performance_prediction.prediction.preprocessor import DataPreprocessor
+from api_performance_prediction.prediction.registry import ModelRegistry
+from api_performance_prediction.prediction.retraining import (
+    FEATURE_COLUMNS, ModelRetrainer, _mape
+)
+
+class TestModelRetrainer:
+    @pytest.fixture
+    def history(self):
+        """Create two endpoints' worth of metrics where latency follows CPU"""
+        rng = np.random.default_rng(11)
+        base_time = datetime(2024, 1, 1)
+        metrics = []
+        for endpoint in ("http://api1.example.com", "http://api2.example.com"):
+            cpu = 50.0
+            for i in range(150):
+                cpu = float(np.clip(cpu + rng.normal(0, 5), 5, 95))
+                metrics.append(APIMetric(
+                    timestamp=base_time + timedelta(minutes=5 * i),
+                    endpoint=endpoint,
+                    latency_ms=100 + 2 * cpu + rng.normal(0, 3),
+                    status_code=200,
+                    cpu_usage=cpu,
+                    memory_usage=70 + rng.normal(0, 2),
+                    request_count=int(1000 + rng.integers(0, 200)),
+                    error_count=int(rng.integers(0, 10))
+                ))
+        return metrics
+
+    @pytest.fixture
+    def server(self):
+        server = ModelServer()
+        server.model.set_params(n_estimators=20)
+        return server
+
+    def test_training_set_targets_next_sample(self, server, history):
+        """Test that each row's target is the endpoint's next latency"""
+        retrainer = ModelRetrainer(server, DataPreprocessor())
+        data = retrainer.build_training_set(history)
+        
+        # The last sample of each endpoint has no future value
+        assert len(data) == len(history) - 2
+        first = data[data['endpoint'] == "http://api1.example.com"].iloc[0]
+        assert first['target'] == history[1].latency_ms
+        assert not data[FEATURE_COLUMNS].isna().any().any()
+
+    @pytest.mark.asyncio
+    async def test_retrain_replaces_unfitted_model(self, server, history):
+        """Test that a candidate is always served over an unfitted model"""
+        retrainer = ModelRetrainer(server, DataPreprocessor())
+        report = await retrainer.retrain(history)
+        
+        assert report.accepted
+        assert report.current_mape is None
+        assert report.training_rows + report.holdout_rows == len(history) - 2
+        assert report.training_seconds > 0
+        assert report.peak_memory_mb > 0
+        assert server.model_version == report.version
+        assert server.feature_schema == FEATURE_COLUMNS
+        assert not retrainer.running
+
+    @pytest.mark.asyncio
+    async def test_retrain_keeps_better_model(self, server, history):
+        """Test that a candidate losing on the holdout window is rejected"""
+        retrainer = ModelRetrainer(
+            server, DataPreprocessor(), executor=ThreadPoolExecutor(max_workers=1)
+        )
+        # A model that has seen the holdout window beats any fair candidate
+        data = retrainer.build_training_set(history)
+        oracle = GradientBoostingRegressor(n_estimators=300, max_depth=6).fit(
+            data[FEATURE_COLUMNS].to_numpy(), data['target'].to_numpy()
+        )
+        await server.swap_model(oracle, "oracle", FEATURE_COLUMNS)
+        
+        report = await retrainer.retrain(history)
+        
+        assert not report.accepted
+        assert report.current_mape < report.candidate_mape
+        assert server.model_version == "oracle"
+
+    @pytest.mark.asyncio
+    async def test_current_model_scored_on_its_own_columns(self, server, history):
+        """Test that a served model with another schema is compared, not replaced blindly"""
+        retrainer = ModelRetrainer(
+            server, DataPreprocessor(), executor=ThreadPoolExecutor(max_workers=1)
+        )
+        data = retrainer.build_training_set(history)
+        columns = ['cpu_usage', 'latency_ms']
+        oracle = GradientBoostingRegressor(n_estimators=300, max_depth=6).fit(
+            data[columns].to_numpy(), data['target'].to_numpy()
+        )
+        await server.swap_model(oracle, "oracle", columns)
+        
+        report = await retrainer.retrain(history)
+        
+        assert report.current_mape is not None
+        assert not report.accepted
+        assert server.model_version == "oracle"
+
+    @pytest.mark.asyncio
+    async def test_unknown_current_columns_refuse(self, server, history):
+        """Test that nothing is swapped when the served model can't be scored"""
+        retrainer = ModelRetrainer(server, DataPreprocessor())
+        model = GradientBoostingRegressor(n_estimators=5).fit(np.zeros((10, 2)), np.arange(10.0))
+        await server.swap_model(model, "foreign", ['cpu_usage', 'gpu_usage'])
+        
+        assert await retrainer.retrain(history) is None
+        assert server.model_version == "foreign"
+
+    @pytest.mark.asyncio
+    async def test_unscored_candidate_is_rejected(self, server, history):
+        """Test that a NaN candidate MAPE never replaces even an unfitted model"""
+        # Zero actuals throughout the holdout window leave nothing to score
+        history = [
+            m if m.timestamp < datetime(2024, 1, 1, 8) else replace(m, latency_ms=0.0)
+            for m in history
+        ]
+        retrainer = ModelRetrainer(
+            server, DataPreprocessor(), executor=ThreadPoolExecutor(max_workers=1)
+        )
+        report = await retrainer.retrain(history)
+        
+        assert np.isnan(report.candidate_mape)
+        assert not report.accepted
+        assert report.version is None
+        assert not hasattr(server.model, 'estimators_')
+
+    def test_mape_skips_zero_actuals(self):
+        """Test that zero actuals don't turn the comparison into inf or NaN"""
+        assert _mape(np.array([0.0, 100.0]), np.array([5.0, 110.0])) == pytest.approx(10.0)
+        assert np.isnan(_mape(np.array([0.0]), np.array([5.0])))
+
+    @pytest.mark.asyncio
+    async def test_retrain_publishes_to_registry(self, tmp_path, history):
+        """Test that an accepted model is published and served by version"""
+        registry = ModelRegistry(str(tmp_path / "models"))
+        server = ModelServer()
+        server.model.set_params(n_estimators=20)
+        retrainer = ModelRetrainer(
+            server, DataPreprocessor(), registry=registry,
+            executor=ThreadPoolExecutor(max_workers=1)
+        )
+        report = await retrainer.retrain(history)
+        
+        assert report.accepted
+        manifest = registry.manifest()
+        assert manifest.version == report.version == server.model_version
+        assert manifest.feature_schema == FEATURE_COLUMNS
+        assert manifest.training_window[0] == history[0].timestamp
+
+    @pytest.mark.asyncio
+    async def test_too_little_history(self, server, history):
+        """Test that retraining is skipped without enough samples"""
+        retrainer = ModelRetrainer(server, DataPreprocessor(), min_samples=1000)
+        assert await retrainer.retrain(history) is None
@@ -0,0 +1,79 @@
+import pytest
+import asyncio
+from aiohttp import web
+
+from api_performance_prediction.collection.sharding import HashRing, ShardedCollector
+from api_performance_prediction.collection.store import MetricStore
+from api_performance_prediction.collection.wal import MetricLog
+
+KEYS = [f"http://10.0.{i // 256}.{i % 256}/api" for i in range(10000)]
+
+class TestHashRing:
+    def test_assignment_is_balanced(self):
+        """Test that virtual nodes spread keys roughly evenly"""
+        ring = HashRing([f"shard-{i}" for i in range(4)])
+        sizes = [len(keys) for keys in ring.assign(KEYS).values()]
+        assert sum(sizes) == len(KEYS)
+        assert max(sizes) < 1.25 * len(KEYS) / 4
+        assert min(sizes) > 0.75 * len(KEYS) / 4
+
+    def test_adding_a_shard_moves_few_keys(self):
+        """Test that a new shard only takes keys, about its fair share"""
+        before = HashRing([f"shard-{i}" for i in range(4)])
+        after = HashRing([f"shard-{i}" for i in range(5)])
+        moved = [key for key in KEYS if before.shard_for(key) != after.shard_for(key)]
+
+        assert all(after.shard_for(key) == "shard-4" for key in moved)
+        assert 0.1 < len(moved) / len(KEYS) < 0.3
+
+    def test_assignment_is_deterministic(self):
+        ring = HashRing(["a", "b", "c"])
+        assert ring.assign(KEYS[:100]) == HashRing(["a", "b", "c"]).assign(KEYS[:100])
+
+class TestShardedCollector:
+    @pytest.fixture
+    async def metrics_server(self, unused_tcp_port):
+        async def metrics_handler(request):
+            return web.json_response({
+                "latency_ms": 150.0,
+                "cpu_usage": 45.0,
+                "memory_usage": 75.0,
+                "request_count": 1000,
+                "error_count": 5
+            })
+
+        app = web.Application()
+        app.router.add_get('/{endpoint}/metrics', metrics_handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', unused_tcp_port)
+        await site.start()
+
+        yield f'http://127.0.0.1:{unused_tcp_port}'
+
+        await runner.cleanup()
+
+    @pytest.mark.asyncio
+    async def test_workers_fill_parent_store(self, metrics_server, tmp_path):
+        """Test that every shard's batches reach the parent's store and log"""
+        endpoints = [f"{metrics_server}/ep{i}" for i in range(8)]
+        collector = ShardedCollector(
+            endpoints, workers=2, collection_interval=0.2, wal=MetricLog(tmp_path)
+        )
+        assert sorted(sum(collector.shards.values(), [])) == sorted(endpoints)
+
+        task = asyncio.create_task(collector.start_collection())
+        for _ in range(300):
+            if all(collector.store.count(e) >= 2 for e in endpoints):
+                break
+            await asyncio.sleep(0.1)
+        await collector.stop()
+        await task
+
+        assert all(collector.store.count(e) >= 2 for e in endpoints)
+        latest = collector.store.latest(endpoints[3])
+        assert latest.latency_ms == 150.0
+        assert latest.status_code == 200
+        # Everything the parent stored was logged first
+        replayed = MetricLog(tmp_path).replay(MetricStore(endpoints))
+        assert replayed.samples == len(collector.store)
@@ -0,0 +1,105 @@
+import pytest
+import numpy as np
+from datetime import datetime, timedelta
+
+from api_performance_prediction.collection.store import MetricStore
+from api_performance_prediction.domain.models import APIMetric, MetricBatch
+
+ENDPOINTS = ["http://api1.example.com", "http://api2.example.com"]
+
+def make_metric(endpoint: str, i: int) -> APIMetric:
+    return APIMetric(
+        timestamp=datetime(2024, 1, 1) + timedelta(minutes=5 * i),
+        endpoint=endpoint,
+        latency_ms=float(i),
+        status_code=200,
+        cpu_usage=45.0,
+        memory_usage=75.0,
+        request_count=1000 + i,
+        error_count=5
+    )
+
+class TestMetricStore:
+    def test_window_keeps_last_samples(self):
+        """Test that a full ring keeps the most recent samples in order"""
+        store = MetricStore(ENDPOINTS, capacity=5)
+        for i in range(12):
+            store.append(make_metric(ENDPOINTS[0], i))
+
+        window = store.window(ENDPOINTS[0])
+        assert len(window) == 5
+        assert window.latency_ms.tolist() == [7.0, 8.0, 9.0, 10.0, 11.0]
+        assert store.window(ENDPOINTS[0], 2).latency_ms.tolist() == [10.0, 11.0]
+        assert store.count(ENDPOINTS[1]) == 0
+        assert store.latest(ENDPOINTS[0]) == make_metric(ENDPOINTS[0], 11)
+        assert store.latest(ENDPOINTS[1]) is None
+
+    def test_window_is_a_view(self):
+        """Test that windows share memory with the store"""
+        store = MetricStore(ENDPOINTS, capacity=4)
+        for i in range(6):
+            store.append(make_metric(ENDPOINTS[1], i))
+
+        window = store.window(ENDPOINTS[1], 3)
+        assert np.shares_memory(window.latency_ms, store._columns['latency_ms'])
+        assert not window.endpoint_code.flags.owndata
+        assert [m.endpoint for m in window.to_metrics()] == [ENDPOINTS[1]] * 3
+
+    def test_append_batch_matches_append(self):
+        """Test that a batch, including repeated endpoints, lands like single appends"""
+        metrics = [make_metric(ENDPOINTS[i % 2], i) for i in range(23)]
+        single = MetricStore(ENDPOINTS, capacity=6)
+        for metric in metrics:
+            single.append(metric)
+        batched = MetricStore(ENDPOINTS, capacity=6)
+        batched.append_batch(MetricBatch.from_metrics(metrics[:3]))
+        batched.append_batch(MetricBatch.from_metrics(metrics[3:]))
+
+        assert single.history().to_metrics() == batched.history().to_metrics()
+        assert len(batched) == 12
+
+    def test_recent_groups_by_endpoint(self):
+        """Test that recent returns the last samples of each endpoint"""
+        store = MetricStore(ENDPOINTS, capacity=10)
+        for i in range(6):
+            store.append(make_metric(ENDPOINTS[1], i))
+        store.append(make_metric(ENDPOINTS[0], 100))
+
+        recent = store.recent(3)
+        assert recent.endpoint_code.tolist() == [0, 1, 1, 1]
+        assert recent.latency_ms.tolist() == [100.0, 3.0, 4.0, 5.0]
+        assert recent.endpoints == tuple(ENDPOINTS)
+
+        only = store.recent(2, codes=np.array([1]))
+        assert only.endpoint_code.tolist() == [1, 1]
+        assert only.latency_ms.tolist() == [4.0, 5.0]
+
+    def test_listeners_see_appended_codes(self):
+        """Test that subscribers get the codes of every append"""
+        store = MetricStore(ENDPOINTS, capacity=4)
+        seen = []
+        store.subscribe(lambda codes: seen.append(codes.tolist()))
+        store.append(make_metric(ENDPOINTS[1], 0))
+        store.append_batch(MetricBatch.from_metrics(
+            [make_metric(ENDPOINTS[1], 1), make_metric(ENDPOINTS[1], 2)]
+        ))
+        assert seen == [[1], [1]]
+
+    def test_fixed_memory(self):
+        """Test that appending never grows the buffers"""
+        store = MetricStore(ENDPOINTS, capacity=8)
+        nbytes = store.nbytes
+        for i in range(50):
+            store.append(make_metric(ENDPOINTS[i % 2], i))
+        assert store.nbytes == nbytes
+        assert len(store) == 16
+
+    def test_register_limit(self):
+        """Test that unknown endpoints are added until the store is full"""
+        store = MetricStore(ENDPOINTS[:1], capacity=4, max_endpoints=2)
+        store.append(make_metric(ENDPOINTS[1], 0))
+        assert store.endpoints == ENDPOINTS
+        with pytest.raises(ValueError):
+            store.append(make_metric("http://api3.example.com", 0))
+        with pytest.raises(KeyError):
+            store.window("http://api3.example.com")
@@ -0,0 +1,118 @@
+import pytest
+import math
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+
+from api_performance_prediction.domain.models import APIMetric
+from api_performance_prediction.domain.rolling import RollingMean
+from api_performance_prediction.prediction.preprocessor import DataPreprocessor
+from api_performance_prediction.prediction.streaming import StreamingFeatureEngine
+
+FEATURE_COLUMNS = [
+    'latency_ms', 'status_code', 'cpu_usage', 'memory_usage', 'request_count',
+    'error_count', 'error_rate', 'hour', 'day_of_week',
+    'latency_ms_rolling_mean', 'cpu_usage_rolling_mean',
+    'memory_usage_rolling_mean', 'request_count_rolling_mean'
+]
+
+def make_metrics(endpoint, n, seed):
+    """Random metrics for one endpoint, with runs of repeated values"""
+    rng = np.random.default_rng(seed)
+    base_time = datetime(2024, 1, 1, 23, 0)
+    metrics = []
+    for i in range(n):
+        metrics.append(APIMetric(
+            timestamp=base_time + timedelta(minutes=5 * i, seconds=seed),
+            endpoint=endpoint,
+            latency_ms=float(rng.choice([150.0, rng.uniform(50, 500)])),
+            status_code=200,
+            cpu_usage=float(rng.uniform(0, 100)),
+            memory_usage=float(rng.uniform(0, 100)),
+            request_count=int(rng.integers(0, 3) * 1000),
+            error_count=int(rng.integers(0, 20))
+        ))
+    return metrics
+
+class TestStreamingFeatureEngine:
+    @pytest.mark.parametrize("window", [1, 3, 12])
+    def test_matches_batch_path(self, window):
+        """Test that every streamed row equals the batch feature row"""
+        metrics = make_metrics("http://api.example.com", 200, seed=1)
+        expected = DataPreprocessor(window_size=window).create_feature_vector(metrics)
+        
+        engine = StreamingFeatureEngine(window_size=window)
+        rows = pd.DataFrame([engine.update(m) for m in metrics])
+        
+        pd.testing.assert_frame_equal(
+            rows[FEATURE_COLUMNS].astype(float).reset_index(drop=True),
+            expected[FEATURE_COLUMNS].astype(float).reset_index(drop=True),
+            check_exact=True
+        )
+
+    def test_endpoints_are_independent(self):
+        """Test that interleaved endpoints keep separate windows"""
+        first = make_metrics("http://api1.example.com", 50, seed=2)
+        second = make_metrics("http://api2.example.com", 50, seed=3)
+        engine = StreamingFeatureEngine(window_size=12)
+        for a, b in zip(first, second):
+            engine.update(a)
+            engine.update(b)
+        
+        for metrics in (first, second):
+            endpoint = metrics[0].endpoint
+            expected = DataPreprocessor(window_size=12).create_feature_vector(metrics)
+            current = engine.current(endpoint)
+            for col in FEATURE_COLUMNS:
+                actual, exp = current[col], expected[col].iloc[-1]
+                assert actual == exp or (math.isnan(actual) and math.isnan(exp))
+        
+        frame = engine.current_frame()
+        assert list(frame['endpoint']) == [first[0].endpoint, second[0].endpoint]
+
+    def test_unknown_endpoint(self):
+        """Test that endpoints without data have no current row"""
+        engine = StreamingFeatureEngine()
+        assert engine.current("http://api.example.com") is None
+        assert engine.current_frame().empty
+
+    def test_rolling_mean_window(self):
+        """Test that the ring buffer drops the oldest value"""
+        rolling = RollingMean(window=3)
+        assert [rolling.update(v) for v in [3.0, 6.0, 9.0, 12.0]] == [3.0, 4.5, 6.0, 9.0]
+        assert list(rolling) == [6.0, 9.0, 12.0]
+        assert rolling.oldest == 6.0
+        assert RollingMean(window=3).oldest is None
+
+    def test_interleaved_rows_match_per_endpoint_batches(self):
+        """Test that every streamed row of interleaved endpoints is exact"""
+        per_endpoint = [make_metrics(f"http://api{i}.example.com", 80, seed=6 + i) for i in range(3)]
+        engine = StreamingFeatureEngine(window_size=12)
+        rows = pd.DataFrame([engine.update(m) for batch in zip(*per_endpoint) for m in batch])
+        
+        for metrics in per_endpoint:
+            expected = DataPreprocessor(window_size=12).create_feature_vector(metrics)
+            streamed = rows[rows['endpoint'] == metrics[0].endpoint]
+            pd.testing.assert_frame_equal(
+                streamed[FEATURE_COLUMNS].astype(float).reset_index(drop=True),
+                expected[FEATURE_COLUMNS].astype(float).reset_index(drop=True),
+                check_exact=True
+            )
+
+    def test_matches_grouped_batch_path(self):
+        """Test that streamed rows agree with grouped rows to rounding"""
+        metrics = [
+            m for pair in zip(make_metrics("http://api1.example.com", 60, seed=4),
+                              make_metrics("http://api2.example.com", 60, seed=5))
+            for m in pair
+        ]
+        engine = StreamingFeatureEngine(window_size=12)
+        rows = pd.DataFrame([engine.update(m) for m in metrics])
+        rows = rows.sort_values(['endpoint', 'timestamp']).reset_index(drop=True)
+        expected = DataPreprocessor(window_size=12, grouped=True).create_feature_vector(metrics)
+        
+        np.testing.assert_allclose(
+            rows[FEATURE_COLUMNS].astype(float), 
+            expected[FEATURE_COLUMNS].astype(float), 
+            rtol=1e-12
+        )
@@ -0,0 +1,180 @@
+import pytest
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from api_performance_prediction.collection.collector import MetricsCollector
+from api_performance_prediction.collection.store import MetricStore
+from api_performance_prediction.collection.wal import MetricLog
+from api_performance_prediction.domain.models import APIMetric, MetricBatch
+
+ENDPOINTS = ["http://api1.example.com", "http://api2.example.com", "http://api3.example.com"]
+
+def make_batches(n_batches: int, endpoints=ENDPOINTS):
+    """One batch per cycle with a sample for every endpoint"""
+    start = datetime(2024, 1, 1)
+    return [
+        MetricBatch.from_metrics([
+            APIMetric(
+                timestamp=start + timedelta(minutes=5 * cycle),
+                endpoint=endpoint,
+                latency_ms=100.0 + cycle + i / 10,
+                status_code=200,
+                cpu_usage=45.0,
+                memory_usage=75.0,
+                request_count=1000 + cycle,
+                error_count=i
+            )
+            for i, endpoint in enumerate(endpoints)
+        ], endpoints=endpoints)
+        for cycle in range(n_batches)
+    ]
+
+def filled_store(batches, capacity=100):
+    store = MetricStore(ENDPOINTS, capacity=capacity)
+    for batch in batches:
+        store.append_batch(batch)
+    return store
+
+class TestMetricLog:
+    def test_replay_rebuilds_store(self, tmp_path):
+        """Test that replaying the log gives the store the collector had"""
+        batches = make_batches(20)
+        log = MetricLog(tmp_path)
+        for batch in batches:
+            log.append(batch)
+        log.close()
+
+        restored = MetricStore(ENDPOINTS, capacity=8)
+        report = MetricLog(tmp_path).replay(restored)
+
+        assert report.samples == 60
+        assert report.corrupt_segments == 0
+        expected = filled_store(batches, capacity=8)
+        assert restored.history().to_metrics() == expected.history().to_metrics()
+
+    def test_segments_rotate(self, tmp_path):
+        """Test that each segment restates its endpoints and replays on its own"""
+        batches = make_batches(30)
+        log = MetricLog(tmp_path, segment_size=1024)
+        for batch in batches:
+            log.append(batch)
+        log.close()
+
+        segments = log.segments()
+        assert len(segments) > 3
+        assert all(path.stat().st_size < 2048 for path in segments)
+
+        restored = MetricStore([], max_endpoints=3)
+        report = MetricLog(tmp_path).replay(restored)
+        assert report.segments == len(segments)
+        assert restored.history().to_metrics() == filled_store(batches).history().to_metrics()
+
+    def test_new_endpoints_are_declared(self, tmp_path):
+        """Test that endpoints first seen mid-segment replay correctly"""
+        first = make_batches(2, ENDPOINTS[:1])
+        later = make_batches(2, ENDPOINTS[::-1])
+        log = MetricLog(tmp_path)
+        for batch in first + later:
+            log.append(batch)
+        log.close()
+
+        restored = MetricStore(ENDPOINTS)
+        MetricLog(tmp_path).replay(restored)
+        assert restored.count(ENDPOINTS[0]) == 4
+        assert restored.count(ENDPOINTS[2]) == 2
+        assert restored.latest(ENDPOINTS[2]) == later[-1].to_metrics()[0]
+
+    def test_torn_tail_is_ignored(self, tmp_path):
+        """Test that a crash mid-write loses only the partial entry"""
+        batches = make_batches(5)
+        log = MetricLog(tmp_path)
+        for batch in batches:
+            log.append(batch)
+        log.close()
+        segment = log.segments()[-1]
+        with open(segment, 'r+b') as f:
+            f.truncate(segment.stat().st_size - 10)
+
+        restored = MetricStore(ENDPOINTS)
+        report = MetricLog(tmp_path).replay(restored)
+        assert report.corrupt_segments == 1
+        assert report.samples == 12
+        assert restored.history().to_metrics() == filled_store(batches[:4]).history().to_metrics()
+
+    def test_restart_opens_new_segment(self, tmp_path):
+        """Test that a restarted log never appends to an old segment"""
+        log = MetricLog(tmp_path)
+        log.append(make_batches(1)[0])
+        log.sync()
+        # Simulate a crash, the first instance is never closed
+        restarted = MetricLog(tmp_path)
+        restarted.append(make_batches(1)[0])
+        restarted.close()
+
+        assert len(restarted.segments()) == 2
+        assert MetricLog(tmp_path).replay(MetricStore(ENDPOINTS)).samples == 6
+
+    def test_retention_drops_old_segments(self, tmp_path):
+        log = MetricLog(tmp_path, segment_size=1, retention=3600)
+        log.append(make_batches(1)[0])
+        log.close()
+        old = log.segments()[0]
+        os.utime(old, (time.time() - 7200, time.time() - 7200))
+        log.append(make_batches(1)[0])
+        log.close()  # Waits for the writer thread to prune
+
+        assert old not in log.segments()
+        assert len(log.segments()) == 1
+
+    def test_rotation_syncs_off_the_appending_thread(self, tmp_path, monkeypatch):
+        """Test that full segments are fsynced and closed on the writer thread"""
+        synced_on = []
+        fsync = os.fsync
+        def record_thread(fd):
+            synced_on.append(threading.current_thread().name)
+            fsync(fd)
+        monkeypatch.setattr(os, 'fsync', record_thread)
+
+        batches = make_batches(10)
+        log = MetricLog(tmp_path, segment_size=1)
+        for batch in batches:
+            log.append(batch)
+        log.close()
+
+        assert len(synced_on) == 10
+        assert all(name.startswith('wal-writer') for name in synced_on)
+        restored = MetricStore(ENDPOINTS)
+        assert MetricLog(tmp_path).replay(restored).samples == 30
+        assert restored.history().to_metrics() == filled_store(batches).history().to_metrics()
+
+    def test_replay_skips_endpoints_beyond_capacity(self, tmp_path):
+        """Test that a smaller store keeps the endpoints it has room for"""
+        batches = make_batches(5)
+        log = MetricLog(tmp_path)
+        for batch in batches:
+            log.append(batch)
+        log.close()
+
+        restored = MetricStore(ENDPOINTS[:1], max_endpoints=2)
+        report = MetricLog(tmp_path).replay(restored)
+
+        assert report.skipped_endpoints == 1
+        assert report.samples == 10
+        assert restored.endpoints == ENDPOINTS[:2]
+        assert restored.count(ENDPOINTS[1]) == 5
+
+    @pytest.mark.asyncio
+    async def test_collector_restores_from_log(self, tmp_path):
+        """Test that a new collector picks up the history of the previous one"""
+        batches = make_batches(10)
+        collector = MetricsCollector(ENDPOINTS, wal=MetricLog(tmp_path))
+        for batch in batches:
+            collector.record(batch)
+        await collector.stop()
+
+        restarted = MetricsCollector(ENDPOINTS, wal=MetricLog(tmp_path))
+        report = restarted.restore()
+        assert report.samples == 30
+        assert restarted.store.history().to_metrics() == collector.store.history().to_metrics()